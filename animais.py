@@ -0,0 +1,100 @@
+from collections.abc import MutableMapping
+import numpy as np
+
+ESPECIES = ("ratos", "gatos", "cachorros")
+PROBABILIDADES = {"ratos": 0.5, "gatos": 0.25, "cachorros": 0.1}
+
+_rng_padrao = None
+
+
+def _rng(rng):
+    """O gerador dado ou o padrão do módulo, criado só no primeiro sorteio (numpy.random é pesado de importar)."""
+    global _rng_padrao
+    if rng is not None:
+        return rng
+    if _rng_padrao is None:
+        _rng_padrao = np.random.default_rng()
+    return _rng_padrao
+
+
+class PopulacaoAnimais:
+    """Populações de ratos, gatos e cachorros em três arrays indexados pelo id do ponto."""
+
+    def __init__(self, num_pontos):
+        self.ratos = np.zeros(num_pontos, dtype=np.int64)
+        self.gatos = np.zeros(num_pontos, dtype=np.int64)
+        self.cachorros = np.zeros(num_pontos, dtype=np.int64)
+
+    def __getitem__(self, especie):
+        return getattr(self, especie)
+
+    def visao(self, ponto_id):
+        return VisaoAnimais(self, ponto_id)
+
+    def total(self):
+        return self.ratos + self.gatos + self.cachorros
+
+    def sortear(self, rng=None, pontos=None):
+        """Versão em lote de atualizar_animais: presença de cada espécie por sorteio (nos pontos dados, ou em todos)."""
+        rng = _rng(rng)
+        alvo = slice(None) if pontos is None else pontos
+        quantidade = len(self.ratos) if pontos is None else len(pontos)
+        for especie in ESPECIES:
+            self[especie][alvo] = rng.random(quantidade) < PROBABILIDADES[especie]
+
+    def fugir(self, grafo, especie, mascara, rng=None):
+        """Todos os animais da espécie nos pontos da máscara fogem para vizinhos sorteados.
+
+        Pontos sem vizinhos ficam fora da fuga. Retorna (origens, destinos) com
+        um elemento por animal que fugiu.
+        """
+        rng = _rng(rng)
+        populacao = self[especie]
+        pontos = np.flatnonzero(mascara & (populacao > 0) & (np.diff(grafo.indptr) > 0))
+        origens = np.repeat(pontos, populacao[pontos])
+        destinos = grafo.sortear_vizinhos(origens, rng)
+        populacao[pontos] = 0
+        np.add.at(populacao, destinos, 1)
+        return origens, destinos
+
+    def espalhar_lixo(self, rng=None, minimo=1, maximo=3):
+        """Sorteia em lote quanto lixo os animais espalham em cada ponto ocupado.
+
+        Retorna (pontos, acrescimos); quem guarda o lixo em array aplica com
+        lixo[pontos] += acrescimos.
+        """
+        rng = _rng(rng)
+        pontos = np.flatnonzero(self.total() > 0)
+        return pontos, rng.integers(minimo, maximo + 1, size=len(pontos))
+
+
+class VisaoAnimais(MutableMapping):
+    """Acesso de um único ponto à PopulacaoAnimais, com a mesma interface do antigo dicionário."""
+
+    __slots__ = ("_populacao", "_ponto")
+
+    def __init__(self, populacao, ponto_id):
+        self._populacao = populacao
+        self._ponto = ponto_id
+
+    def __getitem__(self, especie):
+        if especie not in ESPECIES:
+            raise KeyError(especie)
+        return int(self._populacao[especie][self._ponto])
+
+    def __setitem__(self, especie, quantidade):
+        if especie not in ESPECIES:
+            raise KeyError(especie)
+        self._populacao[especie][self._ponto] = quantidade
+
+    def __delitem__(self, especie):
+        raise TypeError("As espécies de um ponto não podem ser removidas.")
+
+    def __iter__(self):
+        return iter(ESPECIES)
+
+    def __len__(self):
+        return len(ESPECIES)
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,314 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from animais import PopulacaoAnimais
+from distancias import InstalacoesProximas, TabelaDistancias
+from grafo import GrafoCSR, dijkstra
+from leitor import ler_entrada
+from dimensionamento import frota_minima
+from main import (MODELOS_EVENTOS, calcular_carrocinhas, criar_caminhoes, criar_carrocinhas, criar_pontos,
+                  executar_coleta_simultanea, movimentar_animais, tempos_de_coleta)
+from registro import RegistroEventos
+from roteamento import planejar_rotas
+
+GERADORES = ("grade", "geometrico", "livre_de_escala")
+TAMANHOS = (10**2, 10**3, 10**4, 10**5, 10**6)
+LIMITE_ROTEAMENTO = 10**5  # Planejamento das viagens e dimensionamento: Dijkstras locais por ponto
+LIMITE_SIMULACAO = 1000  # A simulação faz um Dijkstra completo a cada nova posição de veículo
+LIMITE_ALOCACAO = 10**5  # SistemaColeta.alocar_caminhoes percorre listas de objetos em Python
+
+
+# ------------------- Geradores de bairros -------------------
+
+def gerar_grade(num_pontos, rng, custo_maximo=15):
+    """Ruas em grade (quarteirões): lado x lado pontos ligados aos vizinhos de cima, baixo e lados."""
+    lado = max(2, int(round(np.sqrt(num_pontos))))
+    ids = np.arange(lado * lado).reshape(lado, lado)
+    origens = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    destinos = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    custos = rng.integers(1, custo_maximo + 1, size=len(origens))
+    return lado * lado, origens, destinos, custos
+
+
+def gerar_geometrico(num_pontos, rng, grau_medio=6, custo_maximo=15):
+    """Pontos sorteados no quadrado unitário, ligados aos que estão a menos de um raio.
+
+    A busca de pares usa células de lado igual ao raio, de modo que cada ponto
+    só é comparado com as células vizinhas. Uma corrente pelos pontos em ordem
+    de célula garante que o bairro fique conexo. O custo é proporcional à
+    distância euclidiana.
+    """
+    raio = np.sqrt(grau_medio / (np.pi * num_pontos))
+    x, y = rng.random(num_pontos), rng.random(num_pontos)
+    celulas = int(np.ceil(1 / raio))
+    cx = np.minimum((x / raio).astype(np.int64), celulas - 1)
+    cy = np.minimum((y / raio).astype(np.int64), celulas - 1)
+    celula = cx * celulas + cy
+    ordem = np.argsort(celula, kind="stable")
+    contagem = np.bincount(celula, minlength=celulas * celulas)
+    inicio = np.concatenate([[0], np.cumsum(contagem)[:-1]])
+
+    origens, destinos = [], []
+    # Metade da vizinhança de 3x3 células: cada par de células é visitado uma única vez
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        nx, ny = cx + dx, cy + dy
+        validos = np.flatnonzero((nx < celulas) & (ny >= 0) & (ny < celulas))
+        vizinha = nx[validos] * celulas + ny[validos]
+        quantos = contagem[vizinha]
+        i = np.repeat(validos, quantos)
+        deslocamento = np.arange(quantos.sum()) - np.repeat(np.cumsum(quantos) - quantos, quantos)
+        j = ordem[np.repeat(inicio[vizinha], quantos) + deslocamento]
+        perto = np.hypot(x[i] - x[j], y[i] - y[j]) <= raio
+        if dx == 0 and dy == 0:
+            perto &= i < j
+        origens.append(i[perto])
+        destinos.append(j[perto])
+    origens.append(ordem[:-1])
+    destinos.append(ordem[1:])
+
+    origens, destinos = np.concatenate(origens), np.concatenate(destinos)
+    pares = np.unique(np.stack([np.minimum(origens, destinos), np.maximum(origens, destinos)], axis=1), axis=0)
+    origens, destinos = pares[:, 0], pares[:, 1]
+    distancia = np.hypot(x[origens] - x[destinos], y[origens] - y[destinos])
+    custos = np.clip(np.ceil(distancia / raio * custo_maximo), 1, None).astype(np.int64)
+    return num_pontos, origens, destinos, custos
+
+
+def gerar_livre_de_escala(num_pontos, rng, arestas_por_ponto=2, custo_maximo=20):
+    """Modelo de Barabási-Albert: cada ponto novo liga-se a pontos já existentes
+    com probabilidade proporcional ao grau (poucos cruzamentos muito movimentados)."""
+    m = arestas_por_ponto
+    # Cada aresta entra duas vezes nesta lista; sortear uma posição é sortear proporcionalmente ao grau.
+    pontas = np.empty(2 * m * num_pontos, dtype=np.int64)
+    origens = np.empty(m * num_pontos, dtype=np.int64)
+    destinos = np.empty(m * num_pontos, dtype=np.int64)
+    sorteios = rng.random((num_pontos, m)).tolist()
+    # Núcleo inicial: uma corrente com os m + 1 primeiros pontos
+    total = 0
+    for u in range(1, m + 1):
+        origens[total], destinos[total] = u, u - 1
+        pontas[2 * total], pontas[2 * total + 1] = u, u - 1
+        total += 1
+    for u in range(m + 1, num_pontos):
+        preenchidas = 2 * total
+        for s in sorteios[u]:
+            origens[total] = u
+            destinos[total] = pontas[int(s * preenchidas)]
+            pontas[2 * total], pontas[2 * total + 1] = u, destinos[total]
+            total += 1
+    origens, destinos = origens[:total], destinos[:total]
+    pares = np.unique(np.stack([np.minimum(origens, destinos), np.maximum(origens, destinos)], axis=1), axis=0)
+    custos = rng.integers(1, custo_maximo + 1, size=len(pares))
+    return num_pontos, pares[:, 0], pares[:, 1], custos
+
+
+def gerar_bairro(gerador, num_pontos, semente):
+    """Gera um bairro completo: grafo simétrico, lixo por ponto, aterro e centro de zoonoses."""
+    rng = np.random.default_rng(semente)
+    num_pontos, origens, destinos, custos = globals()[f"gerar_{gerador}"](num_pontos, rng)
+    grafo = GrafoCSR.de_arestas(num_pontos, origens, destinos, custos, simetrico=True)
+    lixo = rng.integers(5, 31, size=num_pontos)
+    aterro_id, zoonoses_id = rng.choice(num_pontos, size=2, replace=False).tolist()
+    lixo[[aterro_id, zoonoses_id]] = 0
+    return grafo, lixo, aterro_id, zoonoses_id
+
+
+def escrever_entrada(caminho, grafo, lixo, aterro_id, zoonoses_id):
+    """Grava o bairro no formato de entrada.txt (uma linha por ponto: lixo vizinho custo ...)."""
+    pares = np.empty(2 * grafo.num_arestas, dtype=np.int64)
+    pares[0::2] = grafo.indices
+    pares[1::2] = grafo.pesos
+    tokens = list(map(str, pares.tolist()))
+    limites = (2 * grafo.indptr).tolist()
+    lixo = lixo.tolist()
+    with open(caminho, "w") as f:
+        f.write(f"{grafo.num_pontos}\n{aterro_id}\n{zoonoses_id}\n")
+        f.writelines(" ".join([str(lixo[u])] + tokens[limites[u]:limites[u + 1]]) + "\n"
+                     for u in range(grafo.num_pontos))
+
+
+# ------------------- Medição -------------------
+
+class Medidor:
+    """Mede tempo e pico de memória (tracemalloc) de cada fase e acumula os resultados."""
+
+    def __init__(self, memoria=True):
+        self.memoria = memoria
+        self.resultados = []
+
+    @contextlib.contextmanager
+    def fase(self, nome, **caso):
+        """Mede o bloco; o registro da fase é entregue ao bloco, que pode completá-lo."""
+        resultado = dict(caso, fase=nome)
+        if self.memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        except Exception as erro:
+            resultado["erro"] = f"{type(erro).__name__}: {erro}"
+            raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = None
+            if self.memoria:
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            resultado.update(segundos=segundos, pico_bytes=pico)
+            self.resultados.append(resultado)
+
+
+def executar_caso(medidor, gerador, num_pontos, semente, diretorio, limite_roteamento, limite_simulacao,
+                  limite_alocacao):
+    """Roda num bairro sintético as fases que escalam até o tamanho dele."""
+    caso = {"gerador": gerador, "pontos_pedidos": num_pontos, "semente": semente}
+
+    with medidor.fase("gerar", **caso) as resultado:
+        grafo, lixo, aterro_id, zoonoses_id = gerar_bairro(gerador, num_pontos, semente)
+        # A grade arredonda o tamanho pedido para um quadrado
+        caso.update(pontos=grafo.num_pontos, arestas=grafo.num_arestas)
+        resultado.update(caso)
+
+    caminho = os.path.join(diretorio, f"{gerador}_{grafo.num_pontos}.txt")
+    cache = caminho + ".cache"
+    with medidor.fase("escrever", **caso):
+        escrever_entrada(caminho, grafo, lixo, aterro_id, zoonoses_id)
+    with medidor.fase("ler", **caso):
+        ler_entrada(caminho)
+    with medidor.fase("ler_criando_cache", **caso):
+        ler_entrada(caminho, cache=cache)
+    with medidor.fase("ler_do_cache", **caso):
+        grafo, lixo, aterro_id, zoonoses_id = ler_entrada(caminho, cache=cache)
+
+    with medidor.fase("dijkstra", **caso):
+        dijkstra(grafo, aterro_id)
+    with medidor.fase("instalacoes_proximas", **caso):
+        InstalacoesProximas(grafo, aterro_id).distancias
+
+    rng = np.random.default_rng(semente)
+    populacao = PopulacaoAnimais(grafo.num_pontos)
+    populacao.sortear(rng)
+    with medidor.fase("movimentar_animais", **caso):
+        movimentar_animais(grafo, populacao, RegistroEventos(MODELOS_EVENTOS), 0, rng)
+
+    if grafo.num_pontos <= limite_roteamento:
+        _fases_roteamento(medidor, caso, grafo, lixo, aterro_id, zoonoses_id, rng,
+                          simular=grafo.num_pontos <= limite_simulacao)
+    if grafo.num_pontos <= limite_alocacao:
+        _fase_alocacao(medidor, caso, grafo, semente)
+
+
+def _fases_roteamento(medidor, caso, grafo, lixo, aterro_id, zoonoses_id, rng, simular):
+    pontos = criar_pontos(grafo, lixo)
+    pontos[0].populacao.sortear(rng)
+    tabela = TabelaDistancias(grafo)
+    with medidor.fase("planejar_rotas", **caso):
+        rotas = planejar_rotas(tabela, aterro_id, lixo, 10, tempos_de_coleta(pontos, 5), tempo_maximo=8 * 60)
+    with medidor.fase("dimensionamento", **caso):
+        dimensionamento = frota_minima(rotas, 8 * 60)
+    if not simular:
+        return
+    with medidor.fase("executar_coleta_simultanea", **caso):
+        executar_coleta_simultanea(grafo, pontos,
+                                   criar_caminhoes(max(1, dimensionamento.caminhoes), 10, 5),
+                                   criar_carrocinhas(calcular_carrocinhas(pontos), 5),
+                                   aterro_id, zoonoses_id, 8 * 60, tabela, atribuicao=dimensionamento.atribuicao)
+
+
+def _fase_alocacao(medidor, caso, grafo, semente):
+    import projeto
+    from sorteios import Sorteios
+    bairro = projeto.GrafoBairro(grafo.num_pontos, sorteios=Sorteios(semente))
+    origens = np.repeat(np.arange(grafo.num_pontos), np.diff(grafo.indptr))
+    uma_vez = origens < grafo.indices  # O grafo é simétrico; GrafoBairro espelha cada conexão
+    for u, v, custo in zip(origens[uma_vez].tolist(), grafo.indices[uma_vez].tolist(), grafo.pesos[uma_vez].tolist()):
+        bairro.adicionar_conexao(u, v, custo)
+    bairro.gerar_animais()
+    sistema = projeto.SistemaColeta(bairro)
+    with medidor.fase("alocar_caminhoes", **caso), contextlib.redirect_stdout(io.StringIO()):
+        sistema.alocar_caminhoes()
+
+
+# ------------------- Resultados -------------------
+
+def ambiente():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def comparar(resultados, anteriores):
+    """Razão entre o tempo atual e o anterior de cada (gerador, pontos, fase); > 1 é regressão."""
+    referencia = {(r["gerador"], r["pontos"], r["fase"]): r["segundos"] for r in anteriores if "erro" not in r}
+    linhas = []
+    for r in resultados:
+        if "erro" in r:
+            continue
+        antes = referencia.get((r["gerador"], r["pontos"], r["fase"]))
+        if antes:
+            linhas.append((r["gerador"], r["pontos"], r["fase"], antes, r["segundos"], r["segundos"] / antes))
+    return linhas
+
+
+def formatar_resultados(resultados):
+    linhas = ["Gerador".ljust(16) + "Pontos".rjust(9) + "  " + "Fase".ljust(28) + "Tempo (s)".rjust(11) + "Pico (MB)".rjust(11)]
+    for r in resultados:
+        pico = "-" if r["pico_bytes"] is None else f"{r['pico_bytes'] / 2**20:.1f}"
+        linhas.append(r["gerador"].ljust(16) + str(r["pontos"]).rjust(9) + "  " + r["fase"].ljust(28)
+                      + f"{r['segundos']:.4f}".rjust(11) + pico.rjust(11) + ("  " + r["erro"] if "erro" in r else ""))
+    return "\n".join(linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o desempenho das fases em bairros sintéticos.")
+    parser.add_argument("-g", "--geradores", nargs="+", choices=GERADORES, default=list(GERADORES))
+    parser.add_argument("-t", "--tamanhos", nargs="+", type=lambda s: int(float(s)), default=list(TAMANHOS),
+                        help="números de pontos (aceita notação como 1e6)")
+    parser.add_argument("-s", "--semente", type=int, default=0)
+    parser.add_argument("-o", "--saida", default="resultados_benchmark.json")
+    parser.add_argument("-c", "--comparar", help="resultados anteriores para comparar os tempos")
+    parser.add_argument("-d", "--diretorio", help="onde gravar as entradas geradas (padrão: diretório temporário)")
+    parser.add_argument("--limite-roteamento", type=int, default=LIMITE_ROTEAMENTO)
+    parser.add_argument("--limite-simulacao", type=int, default=LIMITE_SIMULACAO)
+    parser.add_argument("--limite-alocacao", type=int, default=LIMITE_ALOCACAO)
+    parser.add_argument("--sem-memoria", action="store_true", help="não rastreia alocações (tempos sem interferência)")
+    args = parser.parse_args()
+
+    medidor = Medidor(memoria=not args.sem_memoria)
+    with contextlib.ExitStack() as pilha:
+        diretorio = args.diretorio or pilha.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(diretorio, exist_ok=True)
+        for num_pontos in args.tamanhos:
+            for gerador in args.geradores:
+                executar_caso(medidor, gerador, num_pontos, args.semente, diretorio,
+                              args.limite_roteamento, args.limite_simulacao, args.limite_alocacao)
+
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if platform.system() == "Darwin" else 1024)
+    with open(args.saida, "w") as f:
+        json.dump({"ambiente": ambiente(), "pico_rss_bytes": pico_rss, "resultados": medidor.resultados}, f, indent=1)
+
+    print(formatar_resultados(medidor.resultados))
+    print(f"\nResultados gravados em {args.saida}.")
+    if args.comparar:
+        with open(args.comparar) as f:
+            anteriores = json.load(f)["resultados"]
+        print("\n=== Comparação com " + args.comparar + " ===")
+        for gerador, pontos, fase, antes, agora, razao in comparar(medidor.resultados, anteriores):
+            print(f"{gerador:<16}{pontos:>9}  {fase:<28}{antes:>10.4f}s {agora:>10.4f}s {razao:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
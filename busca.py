@@ -0,0 +1,150 @@
+import heapq
+import numpy as np
+import perfil
+from grafo import dijkstra
+
+
+def _vizinhanca(grafo, u):
+    inicio, fim = grafo.indptr[u], grafo.indptr[u + 1]
+    return zip(grafo.indices[inicio:fim].tolist(), grafo.pesos[inicio:fim].tolist())
+
+
+def _custo(valor):
+    # Custos inteiros continuam inteiros, como em TabelaDistancias.distancia.
+    return int(valor) if float(valor).is_integer() else valor
+
+
+def _refazer(pred, fim):
+    caminho = [fim]
+    while pred[caminho[-1]] is not None:
+        caminho.append(pred[caminho[-1]])
+    return caminho
+
+
+def caminho_bidirecional(grafo, origem, destino):
+    """Caminho mínimo e custo entre dois pontos numa única consulta (Dijkstra bidirecional).
+
+    Uma busca sai da origem no grafo e outra do destino no grafo transposto,
+    sempre avançando a de menor fronteira; para quando a soma das duas
+    fronteiras não pode mais melhorar o melhor encontro. Só os pontos
+    visitados ocupam memória. Retorna ([], inf) se não houver caminho.
+    """
+    if origem == destino:
+        return [origem], 0
+    grafos = (grafo, grafo.transposto())
+    dist = ({origem: 0.0}, {destino: 0.0})
+    pred = ({origem: None}, {destino: None})
+    filas = ([(0.0, origem)], [(0.0, destino)])
+    fixados = (set(), set())
+    melhor, encontro = np.inf, None
+
+    while filas[0] and filas[1]:
+        if filas[0][0][0] + filas[1][0][0] >= melhor:
+            break
+        lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+        custo, u = heapq.heappop(filas[lado])
+        if u in fixados[lado]:
+            continue
+        fixados[lado].add(u)
+        distancias, outro = dist[lado], dist[1 - lado]
+        for v, peso in _vizinhanca(grafos[lado], u):
+            novo = custo + peso
+            if novo < distancias.get(v, np.inf):
+                distancias[v] = novo
+                pred[lado][v] = u
+                heapq.heappush(filas[lado], (novo, v))
+            if v in outro and distancias[v] + outro[v] < melhor:
+                melhor, encontro = distancias[v] + outro[v], v
+
+    if perfil.ATIVO:
+        perfil.contar("pontos_fixados", len(fixados[0]) + len(fixados[1]))
+    if encontro is None:
+        return [], np.inf
+    caminho = _refazer(pred[0], encontro)[::-1] + _refazer(pred[1], encontro)[1:]
+    return caminho, _custo(melhor)
+
+
+class Marcos:
+    """Distâncias de e para alguns pontos de referência (marcos), para limites inferiores ALT.
+
+    Pela desigualdade triangular, d(v, t) >= d(L, t) - d(L, v) e
+    d(v, t) >= d(v, L) - d(t, L) para qualquer marco L; o maior desses
+    limites guia o A* até o destino. Os marcos são escolhidos afastados entre
+    si (cada um é o ponto mais distante dos anteriores), e as distâncias são
+    refeitas na próxima consulta se o grafo mudar.
+    """
+
+    def __init__(self, grafo, quantidade=8, semente=0):
+        self.grafo = grafo
+        self.quantidade = min(quantidade, grafo.num_pontos)
+        self.semente = semente
+        self.pontos = None
+        self._de = None  # (num_pontos, marcos): distância do marco até o ponto
+        self._para = None  # (num_pontos, marcos): distância do ponto até o marco
+        grafo.adicionar_observador(self)
+
+    def _calcular(self):
+        num_pontos = self.grafo.num_pontos
+        transposto = self.grafo.transposto()
+        de = np.empty((self.quantidade, num_pontos), dtype=np.float64)
+        para = np.empty((self.quantidade, num_pontos), dtype=np.float64)
+        pontos = [int(np.random.default_rng(self.semente).integers(num_pontos))]
+        mais_perto = np.full(num_pontos, np.inf)
+        for i in range(self.quantidade):
+            if i:
+                # Próximo marco: o mais distante dos já escolhidos entre os alcançáveis
+                candidatos = np.where(np.isfinite(mais_perto), mais_perto, -1)
+                pontos.append(int(np.argmax(candidatos)))
+            dijkstra(self.grafo, pontos[i], de[i])
+            dijkstra(transposto, pontos[i], para[i])
+            np.minimum(mais_perto, de[i], out=mais_perto)
+        self.pontos = pontos
+        self._de, self._para = de.T.copy(), para.T.copy()
+
+    def limite(self, v, destino):
+        """Limite inferior para d(v, destino); inf se o marco prova que não há caminho."""
+        if self._de is None:
+            self._calcular()
+        with np.errstate(invalid="ignore"):
+            limites = np.fmax(self._de[destino] - self._de[v], self._para[v] - self._para[destino])
+        valor = np.fmax.reduce(limites)
+        return valor if valor > 0 else 0.0
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """Descarta as distâncias; com custos menores os limites deixariam de valer."""
+        self._de = self._para = None
+
+
+def caminho_alt(grafo, origem, destino, marcos):
+    """Caminho mínimo e custo por A* com limites inferiores de marcos (ALT), numa única busca.
+
+    Os limites são consistentes, então cada ponto é fixado uma única vez e a
+    busca termina ao fixar o destino. Retorna ([], inf) se não houver caminho.
+    """
+    dist = {origem: 0.0}
+    pred = {origem: None}
+    fila = [(marcos.limite(origem, destino), 0.0, origem)]
+    fixados = set()
+
+    while fila:
+        _, custo, u = heapq.heappop(fila)
+        if u in fixados:
+            continue
+        fixados.add(u)
+        if u == destino:
+            break
+        for v, peso in _vizinhanca(grafo, u):
+            novo = custo + peso
+            if novo < dist.get(v, np.inf):
+                estimativa = marcos.limite(v, destino)
+                if np.isinf(estimativa):
+                    continue
+                dist[v] = novo
+                pred[v] = u
+                heapq.heappush(fila, (novo + estimativa, novo, v))
+
+    if perfil.ATIVO:
+        perfil.contar("pontos_fixados", len(fixados))
+    if destino not in fixados:
+        return [], np.inf
+    return _refazer(pred, destino)[::-1], _custo(dist[destino])
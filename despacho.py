@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+import numpy as np
+import perfil
+from animais import ESPECIES
+from distancias import InstalacoesProximas, TabelaDistancias
+from hierarquia import carregar_se_existir
+from leitor import ler_entrada
+from main import ArmazemCaminhoes, ArmazemCarrocinhas, criar_pontos
+
+PERCENTIS = (50, 95, 99)
+ESPECIES_RECOLHIDAS = ("gatos", "cachorros")  # Só estas chamam a carrocinha, como na simulação
+
+
+class ServicoDespacho:
+    """Despacho ao vivo: recebe atualizações dos pontos e manda o veículo livre mais próximo.
+
+    Cada evento é uma linha JSON, por exemplo
+    {"ponto": 12, "minuto": 95.5, "lixo": 18, "animais": {"gatos": 1}, "enviado": 1234.5}.
+    lixo e animais são as leituras atuais do ponto (não acréscimos), minuto é
+    o relógio do turno e enviado, opcional, é o time.perf_counter() de quem
+    enviou, para medir a latência na mesma máquina.
+
+    As fontes (socket ou arquivo seguido) põem os eventos numa fila limitada;
+    com a fila cheia, elas param de ler e a pressão volta a quem envia. O
+    consumidor tira os eventos em lotes, atualiza o lixo e os animais nos
+    arrays dos pontos e escolhe, entre os caminhões (ou carrocinhas) livres
+    naquele minuto, o de menor distância até o ponto. Com uma hierarquia de
+    contração (hierarquia.py), as distâncias dos veículos até o ponto saem de
+    uma consulta muitos para um; sem ela, de uma TabelaDistancias sobre o
+    grafo transposto, em que uma linha por ponto chamado dá a distância de
+    todos os pontos até ele e fica guardada para as chamadas seguintes.
+    Pontos sem veículo livre esperam numa fila e são atendidos primeiro.
+    """
+
+    def __init__(self, grafo, pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, limite_fila=1024,
+                 lote=256, limiar_lixo=1, hierarquia=None):
+        self.grafo = grafo
+        self.pontos = pontos  # ArmazemPontos
+        self.caminhoes = caminhoes  # ArmazemCaminhoes
+        self.carrocinhas = carrocinhas  # ArmazemCarrocinhas
+        self.aterros = InstalacoesProximas(grafo, aterro_id)
+        self.abrigos = InstalacoesProximas(grafo, zoonoses_id)
+        self.hierarquia = hierarquia
+        self.chegadas = TabelaDistancias(grafo.transposto())
+        self.fila = asyncio.Queue(maxsize=limite_fila)
+        self.lote = lote
+        self.limiar_lixo = limiar_lixo
+        self.minuto = 0
+        self.aguardando_coleta = deque()
+        self.aguardando_recolha = deque()
+        self._na_espera = np.zeros(grafo.num_pontos, dtype=bool)  # Ponto já está numa das filas de espera
+        self._na_espera_animais = np.zeros(grafo.num_pontos, dtype=bool)
+
+        instalacoes, abrigos = self.aterros.instalacoes, self.abrigos.instalacoes
+        for i in range(len(caminhoes)):
+            if caminhoes.posicao[i] < 0:
+                caminhoes.posicao[i] = instalacoes[i % len(instalacoes)]
+        for i in range(len(carrocinhas)):
+            if carrocinhas.posicao[i] < 0:
+                carrocinhas.posicao[i] = abrigos[i % len(abrigos)]
+
+        self.recebidos = 0
+        self.processados = 0
+        self.rejeitados = 0
+        self.coletas = 0
+        self.recolhas = 0
+        self.fila_maxima = 0
+        self._latencias = []
+
+    # ---- Fontes ----
+
+    async def _enfileirar(self, linha):
+        linha = linha.strip()
+        if not linha:
+            return True
+        try:
+            evento = json.loads(linha)
+        except json.JSONDecodeError:
+            self.rejeitados += 1
+            return True
+        if evento.get("fim"):
+            return False
+        self.recebidos += 1
+        await self.fila.put(evento)  # Bloqueia com a fila cheia: é aqui que a pressão volta à fonte
+        self.fila_maxima = max(self.fila_maxima, self.fila.qsize())
+        return True
+
+    async def atender_conexao(self, leitor, escritor):
+        """Lê eventos de uma conexão (uma linha JSON por evento) até ela fechar."""
+        try:
+            while linha := await leitor.readline():
+                if not await self._enfileirar(linha):
+                    break
+        finally:
+            escritor.close()
+
+    async def seguir_arquivo(self, caminho, intervalo=0.05):
+        """Segue um arquivo que cresce (como tail -f) até a linha {"fim": true}."""
+        with open(caminho, "rb") as arquivo:
+            pendente = b""
+            while True:
+                linha = arquivo.readline()
+                if not linha.endswith(b"\n"):
+                    pendente += linha  # Linha ainda sendo escrita
+                    await asyncio.sleep(intervalo)
+                    continue
+                if not await self._enfileirar(pendente + linha):
+                    return
+                pendente = b""
+
+    # ---- Consumidor ----
+
+    async def consumir(self):
+        """Processa eventos em lotes até ser cancelado."""
+        while True:
+            eventos = [await self.fila.get()]
+            while len(eventos) < self.lote and not self.fila.empty():
+                eventos.append(self.fila.get_nowait())
+            self.processar_lote(eventos)
+            for _ in eventos:
+                self.fila.task_done()
+            await asyncio.sleep(0)  # Deixa as fontes lerem entre um lote e outro
+
+    @perfil.fase("despacho_lote")
+    def processar_lote(self, eventos):
+        for evento in eventos:
+            self._aplicar(evento)
+            if "enviado" in evento:
+                self._latencias.append(time.perf_counter() - evento["enviado"])
+        self.processados += len(eventos)
+        self._atender_esperas()
+
+    def _aplicar(self, evento):
+        ponto = int(evento["ponto"])
+        self.minuto = max(self.minuto, evento.get("minuto", self.minuto))
+        if "lixo" in evento:
+            self.pontos.lixo[ponto] = evento["lixo"]
+            if evento["lixo"] >= self.limiar_lixo and not self._na_espera[ponto]:
+                if not self._enviar_caminhao(ponto):
+                    self._na_espera[ponto] = True
+                    self.aguardando_coleta.append(ponto)
+        if "animais" in evento:
+            visao = self.pontos.populacao.visao(ponto)
+            for especie, quantidade in evento["animais"].items():
+                if especie in ESPECIES:
+                    visao[especie] = quantidade
+            if any(visao[e] for e in ESPECIES_RECOLHIDAS) and not self._na_espera_animais[ponto]:
+                if not self._enviar_carrocinha(ponto):
+                    self._na_espera_animais[ponto] = True
+                    self.aguardando_recolha.append(ponto)
+
+    def _atender_esperas(self):
+        for espera, marcados, enviar in ((self.aguardando_coleta, self._na_espera, self._enviar_caminhao),
+                                         (self.aguardando_recolha, self._na_espera_animais, self._enviar_carrocinha)):
+            while espera and enviar(espera[0]):
+                marcados[espera.popleft()] = False
+
+    def _mais_proximo(self, frota, livres, ponto):
+        """Índice do veículo livre mais perto do ponto (ou -1), por uma linha de distâncias em cache."""
+        candidatos = np.flatnonzero(livres)
+        if not len(candidatos):
+            return -1, np.inf
+        posicoes = frota.posicao[candidatos]
+        if self.hierarquia is not None:
+            distancias = self.hierarquia.matriz(posicoes, [ponto])[:, 0]
+        else:
+            distancias = self.chegadas.distancias(ponto)[posicoes]
+        k = int(np.argmin(distancias))
+        return (int(candidatos[k]), float(distancias[k])) if np.isfinite(distancias[k]) else (-1, np.inf)
+
+    def _enviar_caminhao(self, ponto):
+        frota = self.caminhoes
+        if self.pontos.lixo[ponto] <= 0:
+            return True  # Nada mais a coletar: sai da espera
+        livres = (frota.relogio <= self.minuto) & (frota.volume_atual < frota.capacidade)
+        indice, distancia = self._mais_proximo(frota, livres, ponto)
+        if indice < 0:
+            return False
+        caminhao = frota[indice]
+        tempo_gasto, coletado = caminhao.coleta(self.pontos[ponto])
+        caminhao.posicao = ponto
+        caminhao.relogio = self.minuto + distancia + tempo_gasto
+        self.coletas += 1
+        if caminhao.volume_atual >= caminhao.capacidade:
+            if caminhao.compactacoes < 3:
+                caminhao.compactar()
+                caminhao.relogio += 1
+            else:
+                aterro_id, ate_aterro = self.aterros.mais_proxima(ponto)
+                caminhao.descarregar()
+                caminhao.posicao = aterro_id
+                caminhao.relogio += ate_aterro
+        # Se o caminhão encheu antes de esvaziar o ponto, ele volta para a espera até outro ficar livre
+        return self.pontos.lixo[ponto] <= 0
+
+    def _enviar_carrocinha(self, ponto):
+        frota = self.carrocinhas
+        visao = self.pontos.populacao.visao(ponto)
+        if not any(visao[e] for e in ESPECIES_RECOLHIDAS):
+            return True
+        livres = (frota.relogio <= self.minuto) & (frota.animais < frota.capacidade)
+        indice, distancia = self._mais_proximo(frota, livres, ponto)
+        if indice < 0:
+            return False
+        carrocinha = frota[indice]
+        for especie in ESPECIES_RECOLHIDAS:
+            recolhidos = min(visao[especie], carrocinha.capacidade - carrocinha.animais)
+            visao[especie] -= recolhidos
+            carrocinha.animais += recolhidos
+        carrocinha.posicao = ponto
+        carrocinha.relogio = self.minuto + distancia
+        self.recolhas += 1
+        if carrocinha.animais >= carrocinha.capacidade:
+            zoonoses_id, ate_abrigo = self.abrigos.mais_proxima(ponto)
+            carrocinha.animais = 0
+            carrocinha.posicao = zoonoses_id
+            carrocinha.relogio += ate_abrigo
+        # Se sobraram animais, o ponto volta para a espera até outra carrocinha ficar livre
+        return not any(visao[e] for e in ESPECIES_RECOLHIDAS)
+
+    # ---- Medição ----
+
+    def relatorio(self, segundos):
+        linhas = [f"Eventos recebidos: {self.recebidos} (rejeitados: {self.rejeitados})",
+                  f"Eventos processados: {self.processados} em {segundos:.2f} s "
+                  f"({self.processados / segundos if segundos else 0:.0f} eventos/s)",
+                  f"Coletas despachadas: {self.coletas}; recolhas de animais: {self.recolhas}",
+                  f"Pontos à espera de caminhão: {len(self.aguardando_coleta)}; "
+                  f"de carrocinha: {len(self.aguardando_recolha)}",
+                  f"Maior ocupação da fila: {self.fila_maxima}/{self.fila.maxsize}"]
+        if self._latencias:
+            latencias = 1000 * np.array(self._latencias)
+            valores = np.percentile(latencias, PERCENTIS)
+            linhas.append("Latência (ms): " + ", ".join(f"p{p} {v:.2f}" for p, v in zip(PERCENTIS, valores))
+                          + f", máx {latencias.max():.2f}")
+        return "\n".join(linhas)
+
+
+def eventos_sinteticos(num_pontos, total, semente=0, proporcao_animais=0.2, duracao_turno=8 * 60):
+    """Gera leituras sintéticas de telemetria espalhadas pelo turno, em ordem de minuto."""
+    rng = np.random.default_rng(semente)
+    pontos = rng.integers(num_pontos, size=total).tolist()
+    minutos = np.sort(rng.random(total) * duracao_turno).round(2).tolist()
+    lixo = rng.integers(0, 31, size=total).tolist()
+    com_animais = (rng.random(total) < proporcao_animais).tolist()
+    especies = rng.choice(ESPECIES, size=total).tolist()
+    for i in range(total):
+        evento = {"ponto": pontos[i], "minuto": minutos[i], "lixo": lixo[i]}
+        if com_animais[i]:
+            evento["animais"] = {especies[i]: 1}
+        yield evento
+
+
+async def gerar_carga(escritor, eventos, taxa=0):
+    """Envia os eventos por um StreamWriter (ou arquivo) a `taxa` eventos/s (0: o mais rápido possível).
+
+    Com socket, drain() espera quando o serviço deixa de ler: a fila cheia do
+    serviço freia o gerador, que mede assim a vazão sustentada.
+    """
+    inicio = time.perf_counter()
+    for i, evento in enumerate(eventos):
+        if taxa:
+            atraso = inicio + i / taxa - time.perf_counter()
+            if atraso > 0:
+                await asyncio.sleep(atraso)
+        evento["enviado"] = time.perf_counter()
+        escritor.write((json.dumps(evento) + "\n").encode())
+        if hasattr(escritor, "drain"):
+            if i % 64 == 0:
+                await escritor.drain()
+        elif i % 1024 == 0:
+            escritor.flush()
+            await asyncio.sleep(0)
+    escritor.write(b'{"fim": true}\n')
+    if hasattr(escritor, "drain"):
+        await escritor.drain()
+        escritor.close()
+    else:
+        escritor.flush()
+
+
+async def executar_carga(servico, eventos, taxa=0, arquivo=None, host="127.0.0.1", porta=0):
+    """Roda o serviço com o gerador de carga local (socket TCP ou arquivo seguido) e devolve os segundos gastos."""
+    consumidor = asyncio.create_task(servico.consumir())
+    inicio = time.perf_counter()
+    if arquivo is None:
+        conexoes = []
+
+        async def atender(leitor, escritor):
+            tarefa = asyncio.current_task()
+            conexoes.append(tarefa)
+            await servico.atender_conexao(leitor, escritor)
+
+        servidor = await asyncio.start_server(atender, host, porta)
+        porta = servidor.sockets[0].getsockname()[1]
+        _, escritor = await asyncio.open_connection(host, porta)
+        await gerar_carga(escritor, eventos, taxa)
+        while not conexoes:
+            await asyncio.sleep(0)
+        await asyncio.gather(*conexoes)
+        servidor.close()
+        await servidor.wait_closed()
+    else:
+        open(arquivo, "wb").close()
+        seguidor = asyncio.create_task(servico.seguir_arquivo(arquivo))
+        with open(arquivo, "ab") as saida:
+            await gerar_carga(saida, eventos, taxa)
+        await seguidor
+    await servico.fila.join()
+    segundos = time.perf_counter() - inicio
+    consumidor.cancel()
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço de despacho ao vivo com um gerador de carga local.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("-n", "--eventos", type=int, default=20000, help="eventos enviados pelo gerador de carga")
+    parser.add_argument("-t", "--taxa", type=float, default=0, help="eventos por segundo (0: o mais rápido possível)")
+    parser.add_argument("-f", "--fila", type=int, default=1024, help="tamanho máximo da fila de eventos")
+    parser.add_argument("-c", "--caminhoes", type=int, default=10)
+    parser.add_argument("-k", "--carrocinhas", type=int, default=4)
+    parser.add_argument("-a", "--arquivo", default=None, help="usa um arquivo seguido (tail) em vez de socket")
+    parser.add_argument("-s", "--semente", type=int, default=0)
+    parser.add_argument("--perfil", action="store_true", help="imprime o perfil das fases ao final (perfil.py)")
+    parser.add_argument("--cprofile", metavar="ARQUIVO", help="grava também um perfil do cProfile")
+    args = parser.parse_args()
+
+    perfil.iniciar()
+    base = os.path.splitext(args.entrada)[0]
+    grafo, lixo, aterro_id, zoonoses_id = ler_entrada(args.entrada, cache=base + ".cache")
+    servico = ServicoDespacho(grafo, criar_pontos(grafo, lixo), ArmazemCaminhoes(args.caminhoes, 10, 4),
+                              ArmazemCarrocinhas(args.carrocinhas, 5), aterro_id, zoonoses_id, args.fila,
+                              hierarquia=carregar_se_existir(base + ".ch", grafo))
+    eventos = eventos_sinteticos(grafo.num_pontos, args.eventos, args.semente)
+    segundos = asyncio.run(executar_carga(servico, eventos, args.taxa, args.arquivo))
+    print(servico.relatorio(segundos))
+    perfil.finalizar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import bisect
+import math
+import sys
+import numpy as np
+import perfil
+
+
+class Dimensionamento:
+    """Resultado da busca pela menor frota que cumpre todas as viagens no tempo limite."""
+
+    def __init__(self, caminhoes, atribuicao, exato, inviaveis=()):
+        self.caminhoes = caminhoes
+        self.atribuicao = atribuicao  # Lista de viagens (Rota) de cada caminhão
+        self.exato = exato  # True se foi provado que caminhoes - 1 não basta
+        self.inviaveis = list(inviaveis)  # Viagens mais longas que o limite, cada uma num caminhão só dela
+
+    @property
+    def viavel(self):
+        return not self.inviaveis
+
+    def __repr__(self):
+        return f"Dimensionamento(caminhoes={self.caminhoes}, exato={self.exato}, viavel={self.viavel})"
+
+
+def _primeiro_encaixe(duracoes, k, limite):
+    """First-fit decreasing: tenta encaixar as viagens (já ordenadas) em k caminhões.
+
+    As ocupações ficam nas folhas de uma árvore de mínimos (caminhões ainda
+    vazios valem 0, as folhas que sobram, infinito): o primeiro caminhão com
+    folga sai de uma descida pela árvore, em O(log k), sem percorrer a frota.
+    """
+    folhas = 1
+    while folhas < k:
+        folhas *= 2
+    arvore = [0.0] * (folhas + k) + [math.inf] * (folhas - k)
+    for no in range(folhas - 1, 0, -1):
+        arvore[no] = min(arvore[2 * no], arvore[2 * no + 1])
+    atribuicao = []
+    for i, duracao in enumerate(duracoes):
+        if arvore[1] + duracao > limite:
+            return None
+        no = 1
+        while no < folhas:
+            no *= 2
+            if arvore[no] + duracao > limite:
+                no += 1
+        c = no - folhas
+        if c == len(atribuicao):  # Os caminhões são abertos em ordem
+            atribuicao.append([])
+        atribuicao[c].append(i)
+        arvore[no] += duracao
+        no //= 2
+        while no:
+            arvore[no] = min(arvore[2 * no], arvore[2 * no + 1])
+            no //= 2
+    return atribuicao
+
+
+def _melhor_encaixe(duracoes, limite):
+    """Best-fit decreasing: cada viagem vai para o caminhão em que sobra menos folga.
+
+    Os caminhões abertos ficam ordenados por ocupação, e o mais cheio em que
+    a viagem cabe sai de uma busca binária.
+    """
+    ordenados = []  # (ocupação, -caminhão): entre ocupações iguais vale o primeiro caminhão
+    atribuicao = []
+    for i, duracao in enumerate(duracoes):
+        pos = bisect.bisect_right(ordenados, (limite - duracao, math.inf))
+        # limite - duracao pode arredondar diferente de usado + duracao <= limite; acerta a fronteira
+        while pos and ordenados[pos - 1][0] + duracao > limite:
+            pos -= 1
+        while pos < len(ordenados) and ordenados[pos][0] + duracao <= limite:
+            pos += 1
+        if pos == 0:
+            c, usado = len(atribuicao), 0.0
+            atribuicao.append([])
+        else:
+            usado, c = ordenados.pop(pos - 1)
+            c = -c
+        atribuicao[c].append(i)
+        bisect.insort(ordenados, (usado + duracao, -c))
+    return atribuicao
+
+
+def _limite_inferior(duracoes, limite):
+    """Limite inferior L2 de Martello e Toth para o número de caminhões (bin packing).
+
+    Para cada corte a <= limite/2, as viagens acima de limite - a não dividem
+    caminhão com nenhuma outra de pelo menos a, as de (limite/2, limite - a]
+    ficam uma por caminhão, e as de [a, limite/2] ocupam no mínimo o que
+    sobra nesses caminhões mais caminhões novos.
+    """
+    d = np.sort(np.asarray(duracoes, dtype=np.float64))
+    soma = np.concatenate([[0.0], np.cumsum(d)])
+    metade = limite / 2
+    cortes = np.unique(np.concatenate([[0.0], d[d <= metade]]))
+    acima_metade = len(d) - np.searchsorted(d, metade, side="right")
+    # Índices das fronteiras: [a, ...] começa em ini; (limite - a, ...] começa em grandes
+    ini = np.searchsorted(d, cortes, side="left")
+    meio = np.searchsorted(d, metade, side="right")
+    grandes = np.searchsorted(d, limite - cortes, side="right")
+    num_j1 = len(d) - grandes
+    num_j2 = acima_metade - num_j1
+    soma_j2 = soma[grandes] - soma[meio]
+    soma_j3 = soma[meio] - soma[ini]
+    sobra = np.ceil((soma_j3 - (num_j2 * limite - soma_j2)) / limite - 1e-9)
+    l2 = num_j1 + num_j2 + np.maximum(0, sobra)
+    return max(1, math.ceil(soma[-1] / limite - 1e-9), int(l2.max()))
+
+
+class _LimiteEsgotado(Exception):
+    pass
+
+
+def _busca_exata(duracoes, k, limite, nos_restantes):
+    """Busca em profundidade pelas atribuições das viagens a k caminhões.
+
+    Retorna (atribuicao ou None, nós gastos, esgotou), onde esgotou indica que
+    os nos_restantes acabaram antes de uma resposta definitiva. Estados
+    parciais já provados inviáveis (viagem atual + ocupações ordenadas) são
+    memorizados.
+    """
+    n = len(duracoes)
+    if n > sys.getrecursionlimit() - 100:
+        return None, 0, True  # Viagens demais para a busca recursiva; fica o resultado heurístico
+    restante = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        restante[i] = restante[i + 1] + duracoes[i]
+    ocupacao = [0.0] * k
+    atribuicao = [[] for _ in range(k)]
+    inviaveis = set()
+    nos = 0
+    ocupado = 0.0  # Soma de ocupacao, mantida junto com ela
+
+    def buscar(i):
+        nonlocal nos, ocupado
+        if i == n:
+            return True
+        nos += 1
+        if nos > nos_restantes:
+            raise _LimiteEsgotado
+        if restante[i] > k * limite - ocupado + 1e-9:
+            return False
+        estado = (i, tuple(sorted(ocupacao)))
+        if estado in inviaveis:
+            return False
+
+        tentadas = set()
+        for c in range(k):
+            # Caminhões com a mesma ocupação são equivalentes; basta tentar um deles.
+            if ocupacao[c] in tentadas or ocupacao[c] + duracoes[i] > limite:
+                continue
+            tentadas.add(ocupacao[c])
+            ocupacao[c] += duracoes[i]
+            ocupado += duracoes[i]
+            atribuicao[c].append(i)
+            if buscar(i + 1):
+                return True
+            ocupacao[c] -= duracoes[i]
+            ocupado -= duracoes[i]
+            atribuicao[c].pop()
+
+        inviaveis.add(estado)
+        return False
+
+    try:
+        return (atribuicao if buscar(0) else None), nos, False
+    except _LimiteEsgotado:
+        return None, nos_restantes, True
+
+
+@perfil.fase("frota_minima")
+def frota_minima(rotas, tempo_maximo, limite_nos=20000):
+    """Busca binária pelo menor número de caminhões que faz todas as viagens em tempo_maximo.
+
+    O intervalo começa entre o limite inferior L2 e a melhor atribuição entre
+    first-fit e best-fit decreasing; se eles coincidem, a frota está provada
+    mínima sem busca. Cada candidato no meio é verificado com first-fit e,
+    se ele falhar, com uma busca exata; todas as buscas juntas examinam no
+    máximo limite_nos nós, e o resultado indica se a minimalidade foi provada.
+
+    Viagens mais longas que tempo_maximo não cabem em caminhão nenhum: cada
+    uma recebe um caminhão só para ela, e o resultado sai com viavel=False.
+    """
+    rotas = sorted(rotas, key=lambda r: r.duracao, reverse=True)
+    inviaveis = [r for r in rotas if r.duracao > tempo_maximo]
+    rotas = rotas[len(inviaveis):]
+    duracoes = [r.duracao for r in rotas]
+    dedicados = [[r] for r in inviaveis]
+    if not rotas:
+        return Dimensionamento(len(dedicados), dedicados, True, inviaveis)
+
+    inferior = _limite_inferior(duracoes, tempo_maximo)
+    melhor = min(_primeiro_encaixe(duracoes, len(duracoes), tempo_maximo),
+                 _melhor_encaixe(duracoes, tempo_maximo), key=len)
+    superior = len(melhor)
+
+    exato = True
+    nos_restantes = limite_nos
+    while inferior < superior:
+        k = (inferior + superior) // 2
+        atribuicao = _primeiro_encaixe(duracoes, k, tempo_maximo)
+        if atribuicao is None:
+            atribuicao, nos, esgotou = _busca_exata(duracoes, k, tempo_maximo, nos_restantes)
+            nos_restantes -= nos
+            exato = exato and not esgotou
+        if atribuicao is not None:
+            superior, melhor = k, [c for c in atribuicao if c]
+        else:
+            inferior = k + 1
+
+    atribuicao = [[rotas[i] for i in caminhao] for caminhao in melhor] + dedicados
+    return Dimensionamento(superior + len(dedicados), atribuicao, exato, inviaveis)
+
+
+# Uma linha por cenário: parâmetros e recursos estimados.
+TIPO_CENARIO = np.dtype([
+    ("capacidade_caminhao", "f8"),
+    ("funcionarios_por_caminhao", "i8"),
+    ("capacidade_carrocinha", "i8"),
+    ("tempo_maximo", "f8"),
+    ("caminhoes", "i8"),
+    ("funcionarios", "i8"),
+    ("carrocinhas", "i8"),
+])
+
+
+@perfil.fase("recursos_em_lote")
+def recursos_em_lote(lixo, com_animais, capacidade_caminhao=10, funcionarios_por_caminhao=5,
+                     capacidade_carrocinha=5, tempo_maximo=8 * 60, bloco=1 << 22):
+    """Estimativa de recursos (sem planejar viagens) para muitos cenários de uma vez.
+
+    Os quatro parâmetros podem ser escalares ou arrays e são combinados por
+    broadcasting; o resultado é um array estruturado (TIPO_CENARIO) com o
+    formato do broadcast. É uma estimativa por fórmula, sem empacotar as
+    coletas: o tempo de coleta de um ponto é ceil(lixo / funcionários), dobrado
+    onde há animais. Como esse tempo só depende do lixo do ponto, os pontos
+    são agrupados pelos valores distintos de lixo e cada cenário soma apenas
+    sobre esses valores, em blocos de até `bloco` elementos.
+    """
+    lixo = np.asarray(lixo, dtype=np.float64)
+    com_animais = np.asarray(com_animais, dtype=bool)
+    capacidade_caminhao, funcionarios_por_caminhao, capacidade_carrocinha, tempo_maximo = np.broadcast_arrays(
+        *(np.asarray(x) for x in (capacidade_caminhao, funcionarios_por_caminhao, capacidade_carrocinha, tempo_maximo)))
+
+    total_lixo = lixo.sum()
+    total_animais = np.count_nonzero(com_animais)
+    valores, grupo = np.unique(lixo, return_inverse=True)
+    pesos = np.bincount(grupo.ravel(), weights=np.where(com_animais, 2, 1).ravel(), minlength=len(valores))
+
+    # Tempo total de coleta por quantidade de funcionários distinta, e não por cenário
+    equipes, por_cenario = np.unique(funcionarios_por_caminhao, return_inverse=True)
+    tempo_total_coleta = np.empty(len(equipes))
+    passo = max(1, bloco // max(1, len(valores)))
+    for inicio in range(0, len(equipes), passo):
+        fatia = equipes[inicio:inicio + passo, None]
+        tempo_total_coleta[inicio:inicio + passo] = np.ceil(valores / fatia) @ pesos
+    tempo_total_coleta = tempo_total_coleta[por_cenario].reshape(funcionarios_por_caminhao.shape)
+
+    # Viagens considerando a compactação (três cargas por viagem) e caminhões para caber no tempo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        viagens_necessarias = np.ceil(total_lixo / (capacidade_caminhao * 3))
+        caminhoes = np.ceil(np.nan_to_num(tempo_total_coleta / (tempo_maximo / viagens_necessarias)))
+    caminhoes = np.maximum(1, caminhoes).astype(np.int64)
+    carrocinhas = np.maximum(1, np.ceil(total_animais / capacidade_carrocinha)).astype(np.int64)
+
+    resultado = np.empty(caminhoes.shape, dtype=TIPO_CENARIO)
+    resultado["capacidade_caminhao"] = capacidade_caminhao
+    resultado["funcionarios_por_caminhao"] = funcionarios_por_caminhao
+    resultado["capacidade_carrocinha"] = capacidade_carrocinha
+    resultado["tempo_maximo"] = tempo_maximo
+    resultado["caminhoes"] = caminhoes
+    resultado["funcionarios"] = caminhoes * funcionarios_por_caminhao
+    resultado["carrocinhas"] = carrocinhas
+    return resultado
@@ -0,0 +1,240 @@
+import numpy as np
+from grafo import dijkstra, dijkstra_multiorigem, propagar
+
+
+def como_ids(instalacoes):
+    """Normaliza um id ou uma sequência de ids de instalações para uma tupla de ints."""
+    if np.ndim(instalacoes) == 0:
+        return (int(instalacoes),)
+    return tuple(int(i) for i in instalacoes)
+
+
+class TabelaDistancias:
+    """Índice de distâncias e predecessores compartilhado por toda a simulação.
+
+    Cada origem consultada gera uma linha (Dijkstra) guardada em arrays
+    compactos; as consultas seguintes à mesma origem não buscam de novo.
+    Com completa=True todas as origens são calculadas na criação (APSP),
+    o que só compensa em grafos pequenos.
+
+    Quando o custo de uma aresta muda no grafo, as linhas já calculadas são
+    reparadas só nos pontos afetados (atualização dinâmica no estilo de
+    Ramalingam-Reps), sem refazer o Dijkstra.
+
+    Com uma HierarquiaContracao (hierarquia.py), as consultas ponto a ponto e
+    de poucos destinos de origens ainda sem linha são respondidas por ela, sem
+    Dijkstra completo. Ela deixa de ser usada na primeira mudança do grafo.
+
+    Os custos não dependem do horário; para isso, veja transito.TabelaTemporal.
+    """
+
+    temporal = False
+
+    def __init__(self, grafo, completa=False, hierarquia=None):
+        num_pontos = grafo.num_pontos
+        self.grafo = grafo
+        self.num_pontos = num_pontos
+        self.completa = completa
+        self.hierarquia = hierarquia
+        self._linha = np.full(num_pontos, -1, dtype=np.int32)  # origem -> linha nos arrays
+        capacidade = num_pontos if completa else min(num_pontos, 8)
+        self._dist = np.empty((capacidade, num_pontos), dtype=np.float64)
+        self._pred = np.empty((capacidade, num_pontos), dtype=np.int32)
+        self._linhas_usadas = 0
+        grafo.adicionar_observador(self)
+
+        if completa:
+            for origem in range(num_pontos):
+                self._preencher(origem)
+
+    def _reservar_linha(self):
+        """Devolve o índice de uma linha livre, dobrando os arrays se necessário."""
+        if self._linhas_usadas == self._dist.shape[0]:
+            nova = max(1, 2 * self._dist.shape[0])
+            self._dist = np.resize(self._dist, (nova, self.num_pontos))
+            self._pred = np.resize(self._pred, (nova, self.num_pontos))
+        linha = self._linhas_usadas
+        self._linhas_usadas += 1
+        return linha
+
+    def _preencher(self, origem):
+        """Executa Dijkstra a partir da origem e guarda distâncias e predecessores."""
+        linha = self._reservar_linha()
+        dijkstra(self.grafo, origem, self._dist[linha], self._pred[linha])
+        self._linha[origem] = linha
+        return linha
+
+    def _indice(self, origem):
+        linha = self._linha[origem]
+        if linha < 0:
+            linha = self._preencher(origem)
+        return linha
+
+    def distancias(self, origem):
+        """Retorna o array de distâncias da origem para todos os pontos."""
+        linha = self._indice(origem)
+        return self._dist[linha]
+
+    def predecessores(self, origem):
+        """Retorna o array de predecessores da árvore de caminhos mínimos da origem."""
+        linha = self._indice(origem)
+        return self._pred[linha]
+
+    def _usa_hierarquia(self, origem):
+        return self.hierarquia is not None and self._linha[origem] < 0
+
+    def distancia(self, origem, destino, partida=None):
+        """Retorna o custo do caminho mínimo entre dois pontos (inf se inalcançável).
+
+        partida (o instante de saída) é aceito como em TabelaTemporal, mas não muda nada aqui.
+        """
+        if self._usa_hierarquia(origem):
+            valor = float(self.hierarquia.distancia(origem, destino))
+        else:
+            linha = self._indice(origem)  # Pode realocar self._dist: indexar só depois
+            valor = float(self._dist[linha, destino])
+        # Custos inteiros continuam inteiros, como no dijkstra original.
+        return int(valor) if valor.is_integer() else valor
+
+    def caminho(self, origem, destino):
+        """Reconstrói o caminho mínimo como lista de ids (vazia se inalcançável)."""
+        if self._usa_hierarquia(origem):
+            return self.hierarquia.caminho(origem, destino)
+        linha = self._indice(origem)
+        if np.isinf(self._dist[linha, destino]):
+            return []
+        pred = self._pred[linha]
+        caminho = [destino]
+        while caminho[-1] != origem:
+            caminho.append(int(pred[caminho[-1]]))
+        caminho.reverse()
+        return caminho
+
+    def matriz(self, origens, destinos):
+        """Distâncias de cada origem a cada destino, como array (len(origens), len(destinos))."""
+        destinos = np.asarray(destinos, dtype=np.int64)
+        if self.hierarquia is not None and not np.all(self._linha[np.asarray(origens, dtype=np.int64)] >= 0):
+            return self.hierarquia.matriz(origens, destinos)
+        return np.vstack([self.distancias(int(origem))[destinos] for origem in origens])
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """Repara as linhas calculadas depois que o custo da aresta u -> v mudou no grafo."""
+        self.hierarquia = None  # Os atalhos guardam custos antigos
+        for linha in self._linha[self._linha >= 0].tolist():
+            dist, pred = self._dist[linha], self._pred[linha]
+            if custo_novo < custo_antigo:
+                self._reparar_reducao(dist, pred, u, v, custo_novo)
+            elif pred[v] == u:
+                self._reparar_aumento(dist, pred, v)
+
+    def _reparar_reducao(self, dist, pred, u, v, custo):
+        """A aresta ficou mais barata: propaga a melhora a partir de v, se houver."""
+        if dist[u] + custo < dist[v]:
+            dist[v] = dist[u] + custo
+            pred[v] = u
+            propagar(self.grafo, dist, pred, [(float(dist[v]), v)])
+
+    def _reparar_aumento(self, dist, pred, v):
+        """A aresta da árvore ficou mais cara (ou sumiu): recalcula só a subárvore de v."""
+        indptr, indices = self.grafo.indptr, self.grafo.indices
+        afetados = [v]
+        marcados = {v}
+        for x in afetados:
+            filhos = indices[indptr[x]:indptr[x + 1]]
+            for y in filhos[pred[filhos] == x].tolist():
+                if y not in marcados:
+                    marcados.add(y)
+                    afetados.append(y)
+
+        afetados = np.array(afetados)
+        dist[afetados] = np.inf
+        pred[afetados] = -1
+
+        # Cada ponto afetado recomeça pela melhor aresta de chegada vinda de fora da subárvore.
+        transposto = self.grafo.transposto()
+        fila = []
+        for y in afetados.tolist():
+            inicio, fim = transposto.indptr[y], transposto.indptr[y + 1]
+            candidatos = dist[transposto.indices[inicio:fim]] + transposto.pesos[inicio:fim]
+            if len(candidatos):
+                k = int(np.argmin(candidatos))
+                if np.isfinite(candidatos[k]):
+                    dist[y] = candidatos[k]
+                    pred[y] = transposto.indices[inicio + k]
+                    fila.append((float(dist[y]), y))
+        propagar(self.grafo, dist, pred, fila)
+
+
+class InstalacoesProximas:
+    """Instalação mais próxima (aterro ou centro de zoonoses) de cada ponto.
+
+    Um único Dijkstra de múltiplas origens, partindo de todas as instalações
+    do mesmo tipo no grafo transposto, dá para cada ponto a distância até a
+    instalação mais próxima, qual é ela e o próximo ponto do caminho. As
+    consultas são O(1) e nunca disparam uma busca. Com chegada=False a busca
+    segue o sentido das arestas (da instalação até o ponto), como na saída
+    dos caminhões. Mudanças no grafo fazem a busca ser refeita na consulta
+    seguinte.
+    """
+
+    def __init__(self, grafo, instalacoes, chegada=True):
+        self.grafo = grafo
+        self.instalacoes = como_ids(instalacoes)
+        self.chegada = chegada
+        self._dist = None
+        self._proximo = None
+        self._instalacao = None
+        grafo.adicionar_observador(self)
+
+    def _calcular(self):
+        num_pontos = self.grafo.num_pontos
+        grafo = self.grafo.transposto() if self.chegada else self.grafo
+        self._dist = np.empty(num_pontos, dtype=np.float64)
+        self._proximo = np.empty(num_pontos, dtype=np.int32)
+        dijkstra_multiorigem(grafo, self.instalacoes, self._dist, self._proximo)
+
+        # Cada ponto fica com a instalação em que termina a sua cadeia de próximos pontos;
+        # dobrar os saltos a cada passada resolve todas as cadeias em O(log n) passadas.
+        raiz = np.where(self._proximo < 0, np.arange(num_pontos), self._proximo)
+        while True:
+            salto = raiz[raiz]
+            if np.array_equal(salto, raiz):
+                break
+            raiz = salto
+        raiz[np.isinf(self._dist)] = -1
+        self._instalacao = raiz
+
+    def _arrays(self):
+        if self._dist is None:
+            self._calcular()
+        return self._dist, self._proximo, self._instalacao
+
+    @property
+    def distancias(self):
+        """Array com a distância de cada ponto até a instalação mais próxima."""
+        return self._arrays()[0]
+
+    @property
+    def mais_proximas(self):
+        """Array com o id da instalação mais próxima de cada ponto (-1 se inalcançável)."""
+        return self._arrays()[2]
+
+    def mais_proxima(self, ponto):
+        """Retorna (instalação, distância) da instalação mais próxima do ponto."""
+        dist, _, instalacao = self._arrays()
+        valor = float(dist[ponto])
+        return int(instalacao[ponto]), int(valor) if valor.is_integer() else valor
+
+    def caminho(self, ponto):
+        """Caminho mínimo do ponto até a instalação mais próxima (de onde ela sai, se chegada=False)."""
+        dist, proximo, _ = self._arrays()
+        if np.isinf(dist[ponto]):
+            return []
+        caminho = [ponto]
+        while proximo[caminho[-1]] >= 0:
+            caminho.append(int(proximo[caminho[-1]]))
+        return caminho if self.chegada else caminho[::-1]
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """Descarta a busca; ela é refeita na próxima consulta."""
+        self._dist = self._proximo = self._instalacao = None
@@ -0,0 +1,114 @@
+import numpy as np
+
+
+class Campo:
+    """Atributo de uma Visao guardado no array de mesmo nome do seu Armazem.
+
+    Com nulo, o valor sentinela no array aparece como None (e None é gravado
+    como o sentinela), como a posição ainda indefinida dos veículos. Valores
+    inteiros em campos de ponto flutuante continuam inteiros, como as
+    distâncias em TabelaDistancias.distancia.
+    """
+
+    __slots__ = ("nome", "nulo")
+
+    def __init__(self, nulo=None):
+        self.nulo = nulo
+
+    def __set_name__(self, dono, nome):
+        self.nome = nome
+
+    def __get__(self, visao, dono=None):
+        if visao is None:
+            return self
+        valor = getattr(visao._armazem, self.nome)[visao._indice].item()
+        if self.nulo is not None and valor == self.nulo:
+            return None
+        return int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+
+    def __set__(self, visao, valor):
+        getattr(visao._armazem, self.nome)[visao._indice] = self.nulo if valor is None else valor
+
+
+class Visao:
+    """Objeto leve (sem __dict__) que lê e escreve uma linha de um Armazem."""
+
+    __slots__ = ("id", "_armazem", "_indice")
+
+    @classmethod
+    def sobre(cls, armazem, indice, id=None):
+        """Visão da linha indice, sem criar entidade nova (não chama __init__)."""
+        visao = cls.__new__(cls)
+        visao.id = indice if id is None else id
+        visao._armazem = armazem
+        visao._indice = indice
+        return visao
+
+    @property
+    def armazem(self):
+        return self._armazem
+
+    @property
+    def indice(self):
+        """Linha da entidade nos arrays do armazém."""
+        return self._indice
+
+    def __eq__(self, outra):
+        if not isinstance(outra, Visao):
+            return NotImplemented
+        return self._armazem is outra._armazem and self._indice == outra._indice
+
+    def __hash__(self):
+        return hash((id(self._armazem), self._indice))
+
+
+class Armazem:
+    """Entidades do mesmo tipo guardadas como estrutura de arrays, um array por campo.
+
+    As subclasses declaram CAMPOS (nome -> dtype) e VISAO (a classe de visão).
+    Cada campo é um atributo numpy com uma posição por entidade, para as
+    operações em lote; armazem[i] devolve a visão da entidade i para o código
+    que trabalha com um objeto por vez.
+    """
+
+    CAMPOS = {}
+    VISAO = Visao
+
+    def __init__(self, quantidade=0, **valores):
+        self._quantidade = quantidade
+        self._buffers = {nome: np.zeros(max(quantidade, 1), dtype=tipo) for nome, tipo in self.CAMPOS.items()}
+        for nome, valor in valores.items():
+            self._buffers[nome][:quantidade] = valor
+        self._expor()
+
+    def _expor(self):
+        for nome, buffer in self._buffers.items():
+            setattr(self, nome, buffer[:self._quantidade])
+
+    def adicionar(self, **valores):
+        """Acrescenta uma entidade (campos omitidos valem zero) e retorna o seu índice."""
+        indice = self._quantidade
+        if indice == len(next(iter(self._buffers.values()))):
+            for nome, buffer in self._buffers.items():
+                novo = np.zeros(2 * len(buffer), dtype=buffer.dtype)
+                novo[:indice] = buffer[:indice]
+                self._buffers[nome] = novo
+        for nome, valor in valores.items():
+            self._buffers[nome][indice] = valor
+        self._quantidade += 1
+        self._expor()
+        return indice
+
+    def __len__(self):
+        return self._quantidade
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self.VISAO.sobre(self, i) for i in range(*indice.indices(self._quantidade))]
+        if not -self._quantidade <= indice < self._quantidade:
+            raise IndexError(indice)
+        return self.VISAO.sobre(self, indice % self._quantidade)
+
+    def __iter__(self):
+        for indice in range(self._quantidade):
+            yield self.VISAO.sobre(self, indice)
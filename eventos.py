@@ -0,0 +1,42 @@
+import heapq
+import perfil
+
+# Tipos de evento da simulação
+CHEGADA = "chegada"                      # Caminhão chega a um ponto e começa a coleta
+COLETA = "coleta"                        # Caminhão termina a coleta no ponto
+COMPACTACAO = "compactacao"              # Caminhão compacta o lixo (1 min)
+DESCARGA = "descarga"                    # Caminhão chega ao aterro e descarrega
+MOVIMENTO_ANIMAIS = "movimento_animais"  # Animais se deslocam e carrocinhas são acionadas
+RECOLHA = "recolha"                      # Carrocinha chega a um ponto e recolhe um animal
+DESCARGA_CARROCINHA = "descarga_carrocinha"  # Carrocinha chega ao centro de zoonoses
+
+
+class Agenda:
+    """Fila de prioridade de eventos, ordenada pelo instante em que acontecem.
+
+    Eventos no mesmo instante saem na ordem em que foram agendados.
+    """
+
+    def __init__(self):
+        self._fila = []
+        self._sequencia = 0
+        self.processados = 0
+
+    @perfil.contador("heap_agenda_push")
+    def agendar(self, tempo, tipo, *dados):
+        heapq.heappush(self._fila, (tempo, self._sequencia, tipo, dados))
+        self._sequencia += 1
+
+    @perfil.contador("tiques")  # Cada evento processado é um tique da simulação
+    def proximo(self):
+        """Remove e retorna o próximo evento como (tempo, tipo, dados)."""
+        tempo, _, tipo, dados = heapq.heappop(self._fila)
+        self.processados += 1
+        return tempo, tipo, dados
+
+    def proximo_tempo(self):
+        """Instante do próximo evento, sem removê-lo."""
+        return self._fila[0][0]
+
+    def __len__(self):
+        return len(self._fila)
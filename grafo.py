@@ -0,0 +1,256 @@
+import heapq
+import weakref
+import numpy as np
+import perfil
+
+
+class GrafoCSR:
+    """Grafo de coleta em formato CSR (compressed sparse row).
+
+    Os vizinhos do ponto u são indices[indptr[u]:indptr[u + 1]] e os custos
+    correspondentes ficam na mesma fatia de pesos. Três arrays contíguos
+    substituem as listas de tuplas (vizinho, custo) de cada ponto.
+
+    Mudanças de custo, inclusão e remoção de arestas são avisadas aos
+    observadores (por exemplo, uma TabelaDistancias), que reparam as suas
+    árvores de caminhos mínimos sem refazer as buscas.
+    """
+
+    def __init__(self, indptr, indices, pesos):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.pesos = np.asarray(pesos, dtype=np.float64)
+        self._transposto = None
+        self._observadores = weakref.WeakSet()
+
+    @property
+    def num_pontos(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_arestas(self):
+        return len(self.indices)
+
+    @classmethod
+    def de_arestas(cls, num_pontos, origens, destinos, pesos, simetrico=False):
+        """Monta o grafo a partir de arrays de arestas (origem, destino, peso)."""
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        pesos = np.asarray(pesos, dtype=np.float64)
+        if simetrico:
+            origens, destinos = np.concatenate([origens, destinos]), np.concatenate([destinos, origens])
+            pesos = np.concatenate([pesos, pesos])
+
+        ordem = np.argsort(origens, kind="stable")
+        indptr = np.zeros(num_pontos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origens, minlength=num_pontos), out=indptr[1:])
+        return cls(indptr, destinos[ordem], pesos[ordem])
+
+    @classmethod
+    def de_conexoes(cls, conexoes):
+        """Monta o grafo a partir de uma lista de conexões [(vizinho, custo), ...] por ponto."""
+        graus = np.fromiter((len(c) for c in conexoes), dtype=np.int64, count=len(conexoes))
+        indptr = np.zeros(len(conexoes) + 1, dtype=np.int64)
+        np.cumsum(graus, out=indptr[1:])
+        indices = np.fromiter((v for c in conexoes for v, _ in c), dtype=np.int32, count=indptr[-1])
+        pesos = np.fromiter((custo for c in conexoes for _, custo in c), dtype=np.float64, count=indptr[-1])
+        return cls(indptr, indices, pesos)
+
+    def grau(self, u):
+        return int(self.indptr[u + 1] - self.indptr[u])
+
+    def vizinhos(self, u):
+        """Retorna os pares (vizinho, custo) do ponto u."""
+        inicio, fim = self.indptr[u], self.indptr[u + 1]
+        return list(zip(self.indices[inicio:fim].tolist(), self.pesos[inicio:fim].tolist()))
+
+    def simetrico(self):
+        """True se cada aresta u -> v tem a volta v -> u com o mesmo custo (o grafo é igual ao transposto)."""
+        origens = np.repeat(np.arange(self.num_pontos), np.diff(self.indptr))
+        ida = np.lexsort((self.pesos, self.indices, origens))
+        volta = np.lexsort((self.pesos, origens, self.indices))
+        return (np.array_equal(origens[ida], self.indices[volta]) and np.array_equal(self.indices[ida], origens[volta])
+                and np.array_equal(self.pesos[ida], self.pesos[volta]))
+
+    def transposto(self):
+        """Grafo com as arestas invertidas (arestas de chegada de cada ponto), mantido em cache."""
+        if self._transposto is None:
+            origens = np.repeat(np.arange(self.num_pontos), np.diff(self.indptr))
+            self._transposto = GrafoCSR.de_arestas(self.num_pontos, self.indices, origens, self.pesos)
+        return self._transposto
+
+    def adicionar_observador(self, observador):
+        """Registra um objeto com o método aresta_alterada(u, v, custo_antigo, custo_novo)."""
+        self._observadores.add(observador)
+
+    def _posicoes(self, u, v):
+        inicio, fim = self.indptr[u], self.indptr[u + 1]
+        return inicio + np.flatnonzero(self.indices[inicio:fim] == v)
+
+    def custo(self, u, v):
+        """Menor custo entre as arestas u -> v (inf se não houver nenhuma)."""
+        posicoes = self._posicoes(u, v)
+        return float(self.pesos[posicoes].min()) if len(posicoes) else np.inf
+
+    def _alterar(self, u, v, mudanca, simetrico):
+        arcos = [(u, v), (v, u)] if simetrico and u != v else [(u, v)]
+        for a, b in arcos:
+            antigo = self.custo(a, b)
+            mudanca(self, a, b)
+            if self._transposto is not None:
+                mudanca(self._transposto, b, a)
+            novo = self.custo(a, b)
+            if novo != antigo:
+                for observador in list(self._observadores):
+                    observador.aresta_alterada(a, b, antigo, novo)
+
+    def atualizar_custo(self, u, v, custo, simetrico=True):
+        """Muda o custo da aresta existente u -> v (e v -> u se simetrico)."""
+        if not len(self._posicoes(u, v)):
+            raise KeyError(f"Não existe aresta {u} -> {v}.")
+
+        def mudanca(grafo, a, b):
+            if not grafo.pesos.flags.writeable:
+                grafo.pesos = grafo.pesos.copy()  # Arrays vindos do cache em memmap são somente leitura
+            grafo.pesos[grafo._posicoes(a, b)] = custo
+        self._alterar(u, v, mudanca, simetrico)
+
+    def adicionar_aresta(self, u, v, custo, simetrico=True):
+        """Inclui a aresta u -> v (e v -> u se simetrico); os arrays são realocados."""
+        def mudanca(grafo, a, b):
+            posicao = grafo.indptr[a + 1]
+            grafo.indices = np.insert(grafo.indices, posicao, b)
+            grafo.pesos = np.insert(grafo.pesos, posicao, custo)
+            grafo.indptr = grafo.indptr.copy()
+            grafo.indptr[a + 1:] += 1
+        self._alterar(u, v, mudanca, simetrico)
+
+    def remover_aresta(self, u, v, simetrico=True):
+        """Remove todas as arestas u -> v (e v -> u se simetrico)."""
+        def mudanca(grafo, a, b):
+            posicoes = grafo._posicoes(a, b)
+            grafo.indices = np.delete(grafo.indices, posicoes)
+            grafo.pesos = np.delete(grafo.pesos, posicoes)
+            grafo.indptr = grafo.indptr.copy()
+            grafo.indptr[a + 1:] -= len(posicoes)
+        self._alterar(u, v, mudanca, simetrico)
+
+    def sortear_vizinhos(self, origens, rng):
+        """Sorteia, para cada origem, um vizinho uniformemente (origens precisam ter grau > 0)."""
+        inicio = self.indptr[origens]
+        graus = self.indptr[origens + 1] - inicio
+        return self.indices[inicio + (rng.random(len(origens)) * graus).astype(np.int64)]
+
+
+@perfil.fase("dijkstra")
+def dijkstra(grafo, inicio, dist=None, pred=None):
+    """Distâncias mínimas a partir de inicio, relaxando cada fatia de vizinhos de uma vez.
+
+    dist e pred podem ser arrays já alocados (por exemplo, linhas de uma
+    TabelaDistancias); pred é opcional e recebe a árvore de caminhos mínimos.
+    """
+    if dist is None:
+        dist = np.empty(grafo.num_pontos, dtype=np.float64)
+    dist.fill(np.inf)
+    if pred is not None:
+        pred.fill(-1)
+    dist[inicio] = 0
+    return propagar(grafo, dist, pred, [(0.0, inicio)])
+
+
+@perfil.fase("dijkstra_multiorigem")
+def dijkstra_multiorigem(grafo, origens, dist=None, pred=None):
+    """Distâncias mínimas até a origem mais próxima, com todas as origens na fila desde o início.
+
+    Uma única busca substitui um Dijkstra por origem; seguindo pred a partir
+    de qualquer ponto chega-se à origem que o alcançou primeiro.
+    """
+    if dist is None:
+        dist = np.empty(grafo.num_pontos, dtype=np.float64)
+    dist.fill(np.inf)
+    if pred is not None:
+        pred.fill(-1)
+    dist[list(origens)] = 0
+    return propagar(grafo, dist, pred, [(0.0, origem) for origem in origens])
+
+
+class BuscasLocais:
+    """Dijkstras que param assim que encontram os alvos pedidos, para consultas perto da origem.
+
+    Os arrays do CSR são copiados para listas uma única vez, na criação: cada
+    busca só toca os pontos que fixa, sem alocar arrays do tamanho do grafo.
+    Mudanças posteriores no grafo não são vistas.
+    """
+
+    def __init__(self, grafo):
+        self.indptr = grafo.indptr.tolist()
+        self.indices = grafo.indices.tolist()
+        self.pesos = grafo.pesos.tolist()
+
+    def ate(self, origem, alvos, quantos):
+        """Os quantos pontos de alvos (um set) mais próximos da origem, sem ela: [(ponto, distância)] em ordem."""
+        indptr, indices, pesos = self.indptr, self.indices, self.pesos
+        dist = {origem: 0.0}
+        fixados = set()
+        achados = []
+        pq = [(0.0, origem)]
+        while pq and len(achados) < quantos:
+            custo_atual, ponto_atual = heapq.heappop(pq)
+            if ponto_atual in fixados:
+                continue
+            fixados.add(ponto_atual)
+            if ponto_atual in alvos and ponto_atual != origem:
+                achados.append((ponto_atual, custo_atual))
+            for aresta in range(indptr[ponto_atual], indptr[ponto_atual + 1]):
+                vizinho = indices[aresta]
+                novo_custo = custo_atual + pesos[aresta]
+                if novo_custo < dist.get(vizinho, np.inf):
+                    dist[vizinho] = novo_custo
+                    heapq.heappush(pq, (novo_custo, vizinho))
+        return achados
+
+
+@perfil.fase("propagar")
+def propagar(grafo, dist, pred, pq):
+    """Laço do Dijkstra a partir de uma fila já semeada, sobre distâncias já parciais.
+
+    Só os pontos cuja distância melhora são visitados, o que permite reparar
+    uma árvore de caminhos mínimos depois de uma mudança local no grafo. Com
+    o perfil ativo, as operações de heap e as arestas examinadas e melhoradas
+    vão para os contadores.
+    """
+    indptr, indices, pesos = grafo.indptr, grafo.indices, grafo.pesos
+    heapq.heapify(pq)
+    semeados = len(pq)
+    inseridos, removidos, examinadas = semeados, 0, 0
+
+    while pq:
+        custo_atual, ponto_atual = heapq.heappop(pq)
+        removidos += 1
+
+        if custo_atual > dist[ponto_atual]:
+            continue
+
+        inicio_fatia, fim_fatia = indptr[ponto_atual], indptr[ponto_atual + 1]
+        examinadas += int(fim_fatia - inicio_fatia)
+        vizinhos = indices[inicio_fatia:fim_fatia]
+        novos_custos = custo_atual + pesos[inicio_fatia:fim_fatia]
+        melhora = novos_custos < dist[vizinhos]
+        if not melhora.any():
+            continue
+
+        vizinhos = vizinhos[melhora]
+        novos_custos = novos_custos[melhora]
+        np.minimum.at(dist, vizinhos, novos_custos)  # Arestas paralelas: fica o menor custo
+        if pred is not None:
+            pred[vizinhos] = ponto_atual
+        inseridos += len(vizinhos)
+        for novo_custo, vizinho in zip(novos_custos.tolist(), vizinhos.tolist()):
+            heapq.heappush(pq, (novo_custo, vizinho))
+
+    if perfil.ATIVO:
+        perfil.contar("heap_dijkstra_push", inseridos)
+        perfil.contar("heap_dijkstra_pop", removidos)
+        perfil.contar("arestas_examinadas", examinadas)
+        perfil.contar("arestas_relaxadas", inseridos - semeados)
+    return dist
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import heapq
+import os
+import numpy as np
+
+
+def impressao_digital(grafo):
+    """Resumo dos arrays do grafo, para saber se uma hierarquia gravada ainda vale para ele."""
+    resumo = hashlib.blake2b(digest_size=16)
+    for array in (grafo.indptr, grafo.indices, grafo.pesos):
+        resumo.update(np.ascontiguousarray(array).tobytes())
+    return np.frombuffer(resumo.digest(), dtype=np.uint8)
+
+
+class _Contracao:
+    """Estado da contração: arestas de entrada e saída dos pontos ainda não contraídos."""
+
+    def __init__(self, grafo, limite_testemunha):
+        n = grafo.num_pontos
+        self.saida = [dict() for _ in range(n)]
+        self.entrada = [dict() for _ in range(n)]
+        self.meio = {}  # (u, w) -> ponto contraído que o atalho u -> w substitui
+        self.limite_testemunha = limite_testemunha
+        self.vizinhos_contraidos = np.zeros(n, dtype=np.int64)
+        origens = np.repeat(np.arange(n), np.diff(grafo.indptr))
+        for u, v, peso in zip(origens.tolist(), grafo.indices.tolist(), grafo.pesos.tolist()):
+            if u != v and peso < self.saida[u].get(v, np.inf):
+                self.saida[u][v] = peso
+                self.entrada[v][u] = peso
+
+    def _testemunha(self, u, ignorado, alvos, custo_maximo):
+        """Dijkstra limitado a partir de u sem passar por ignorado; distâncias aos alvos alcançados."""
+        dist = {u: 0.0}
+        fila = [(0.0, u)]
+        restantes = set(alvos)
+        fixados = 0
+        while fila and restantes and fixados < self.limite_testemunha:
+            custo, x = heapq.heappop(fila)
+            if custo > dist[x]:
+                continue
+            if custo > custo_maximo:
+                break
+            fixados += 1
+            restantes.discard(x)
+            for y, peso in self.saida[x].items():
+                if y != ignorado and custo + peso < dist.get(y, np.inf):
+                    dist[y] = custo + peso
+                    heapq.heappush(fila, (custo + peso, y))
+        return dist
+
+    def atalhos(self, v):
+        """Atalhos (u, w, custo) necessários para contrair v sem perder caminhos mínimos."""
+        novos = []
+        saidas = self.saida[v]
+        for u, peso_entrada in self.entrada[v].items():
+            alvos = [w for w in saidas if w != u]
+            if not alvos:
+                continue
+            custo_maximo = peso_entrada + max(saidas[w] for w in alvos)
+            dist = self._testemunha(u, v, alvos, custo_maximo)
+            for w in alvos:
+                custo = peso_entrada + saidas[w]
+                if dist.get(w, np.inf) > custo:
+                    novos.append((u, w, custo))
+        return novos
+
+    def prioridade(self, v):
+        """Diferença de arestas mais vizinhos já contraídos: contrai primeiro o que menos adensa o grafo."""
+        removidas = len(self.entrada[v]) + len(self.saida[v])
+        return len(self.atalhos(v)) - removidas + int(self.vizinhos_contraidos[v])
+
+    def contrair(self, v):
+        """Remove v do grafo restante, acrescentando os atalhos; devolve as arestas que v tinha."""
+        for u, w, custo in self.atalhos(v):
+            if custo < self.saida[u].get(w, np.inf):
+                self.saida[u][w] = custo
+                self.entrada[w][u] = custo
+                self.meio[(u, w)] = v
+        subida = [(w, peso, self.meio.get((v, w), -1)) for w, peso in self.saida[v].items()]
+        descida = [(u, peso, self.meio.get((u, v), -1)) for u, peso in self.entrada[v].items()]
+        for w in self.saida[v]:
+            del self.entrada[w][v]
+            self.vizinhos_contraidos[w] += 1
+        for u in self.entrada[v]:
+            del self.saida[u][v]
+            self.vizinhos_contraidos[u] += 1
+        self.saida[v] = {}
+        self.entrada[v] = {}
+        return subida, descida
+
+
+def _csr(listas):
+    graus = np.fromiter((len(l) for l in listas), dtype=np.int64, count=len(listas))
+    indptr = np.zeros(len(listas) + 1, dtype=np.int64)
+    np.cumsum(graus, out=indptr[1:])
+    plano = [aresta for lista in listas for aresta in lista]
+    indices = np.fromiter((a[0] for a in plano), dtype=np.int32, count=len(plano))
+    pesos = np.fromiter((a[1] for a in plano), dtype=np.float64, count=len(plano))
+    meio = np.fromiter((a[2] for a in plano), dtype=np.int32, count=len(plano))
+    return indptr, indices, pesos, meio
+
+
+class HierarquiaContracao:
+    """Hierarquia de contração (CH) do grafo de coleta, para consultas de caminho mínimo rápidas.
+
+    Os pontos são contraídos um a um, do menos ao mais importante, e atalhos
+    preservam as distâncias entre os que restam. Uma consulta só sobe na
+    hierarquia: a busca da origem usa as arestas para pontos mais importantes
+    (subida) e a do destino as arestas vindas deles (descida), visitando
+    poucas centenas de pontos mesmo em grafos grandes.
+    """
+
+    def __init__(self, nivel, subida, descida, impressao):
+        self.nivel = nivel  # Ordem de contração de cada ponto
+        self.subida = subida  # (indptr, indices, pesos, meio): arestas u -> w com nivel[w] > nivel[u]
+        self.descida = descida  # (indptr, indices, pesos, meio): em v, as arestas u -> v com nivel[u] > nivel[v]
+        self.impressao = impressao
+
+    @property
+    def num_pontos(self):
+        return len(self.nivel)
+
+    @classmethod
+    def construir(cls, grafo, limite_testemunha=64):
+        """Contrai todos os pontos; a ordem vem de uma fila de prioridades atualizada sob demanda."""
+        estado = _Contracao(grafo, limite_testemunha)
+        n = grafo.num_pontos
+        fila = [(estado.prioridade(v), v) for v in range(n)]
+        heapq.heapify(fila)
+        nivel = np.empty(n, dtype=np.int64)
+        subida, descida = [None] * n, [None] * n
+        proximo = 0
+        while fila:
+            _, v = heapq.heappop(fila)
+            atual = estado.prioridade(v)
+            if fila and atual > fila[0][0]:
+                heapq.heappush(fila, (atual, v))  # A prioridade piorou: volta para a fila
+                continue
+            nivel[v] = proximo
+            proximo += 1
+            subida[v], descida[v] = estado.contrair(v)
+        return cls(nivel, _csr(subida), _csr(descida), impressao_digital(grafo))
+
+    # ---- Persistência ----
+
+    def salvar(self, caminho):
+        with open(caminho, "wb") as f:
+            np.savez(f, nivel=self.nivel, impressao=self.impressao,
+                     **{f"subida_{i}": a for i, a in enumerate(self.subida)},
+                     **{f"descida_{i}": a for i, a in enumerate(self.descida)})
+
+    @classmethod
+    def carregar(cls, caminho, grafo=None):
+        """Abre uma hierarquia gravada; com grafo, recusa a que foi feita para outro grafo."""
+        with np.load(caminho) as dados:
+            hierarquia = cls(dados["nivel"],
+                             tuple(dados[f"subida_{i}"] for i in range(4)),
+                             tuple(dados[f"descida_{i}"] for i in range(4)),
+                             dados["impressao"])
+        if grafo is not None and not hierarquia.vale_para(grafo):
+            raise ValueError(f"{caminho} foi construída para outro grafo.")
+        return hierarquia
+
+    def vale_para(self, grafo):
+        return self.num_pontos == grafo.num_pontos and np.array_equal(self.impressao, impressao_digital(grafo))
+
+    # ---- Consultas ----
+
+    @staticmethod
+    def _busca_completa(csr, inicio):
+        """Todo o espaço de busca para cima a partir de inicio: {ponto: (custo, anterior)}."""
+        indptr, indices, pesos, _ = csr
+        dist = {inicio: (0.0, -1)}
+        fila = [(0.0, inicio)]
+        while fila:
+            custo, u = heapq.heappop(fila)
+            if custo > dist[u][0]:
+                continue
+            a, b = indptr[u], indptr[u + 1]
+            for v, peso in zip(indices[a:b].tolist(), pesos[a:b].tolist()):
+                if custo + peso < dist.get(v, (np.inf,))[0]:
+                    dist[v] = (custo + peso, u)
+                    heapq.heappush(fila, (custo + peso, v))
+        return dist
+
+    def _buscar(self, origem, destino):
+        """Buscas para cima dos dois lados, alternadas; devolve (custo, encontro, dist_ida, dist_volta)."""
+        grafos = (self.subida, self.descida)
+        dist = ({origem: (0.0, -1)}, {destino: (0.0, -1)})
+        filas = ([(0.0, origem)], [(0.0, destino)])
+        melhor, encontro = (0.0, origem) if origem == destino else (np.inf, -1)
+        lado = 0
+        while filas[0] or filas[1]:
+            if not filas[lado]:
+                lado = 1 - lado
+            custo, u = heapq.heappop(filas[lado])
+            if custo >= melhor:
+                filas[lado].clear()  # Nada mais deste lado pode melhorar o encontro
+                lado = 1 - lado
+                continue
+            if custo > dist[lado][u][0]:
+                continue
+            outro = dist[1 - lado].get(u)
+            if outro is not None and custo + outro[0] < melhor:
+                melhor, encontro = custo + outro[0], u
+            indptr, indices, pesos, _ = grafos[lado]
+            a, b = indptr[u], indptr[u + 1]
+            for v, peso in zip(indices[a:b].tolist(), pesos[a:b].tolist()):
+                if custo + peso < dist[lado].get(v, (np.inf,))[0]:
+                    dist[lado][v] = (custo + peso, u)
+                    heapq.heappush(filas[lado], (custo + peso, v))
+            lado = 1 - lado
+        return melhor, encontro, dist[0], dist[1]
+
+    def distancia(self, origem, destino):
+        """Custo do caminho mínimo (inf se inalcançável)."""
+        return self._buscar(origem, destino)[0]
+
+    def _meio(self, u, v):
+        """Ponto contraído que a aresta u -> v da hierarquia substitui (-1 se é uma rua de verdade)."""
+        if self.nivel[u] < self.nivel[v]:
+            indptr, indices, pesos, meio = self.subida
+            a, b, procurado = indptr[u], indptr[u + 1], v
+        else:
+            indptr, indices, pesos, meio = self.descida
+            a, b, procurado = indptr[v], indptr[v + 1], u
+        posicoes = a + np.flatnonzero(indices[a:b] == procurado)
+        return int(meio[posicoes[np.argmin(pesos[posicoes])]])
+
+    def _desempacotar(self, u, v):
+        caminho = [u]
+        pilha = [(u, v)]
+        while pilha:
+            a, b = pilha.pop()
+            m = self._meio(a, b)
+            if m < 0:
+                caminho.append(b)
+            else:
+                pilha.append((m, b))
+                pilha.append((a, m))
+        return caminho[1:]
+
+    def caminho(self, origem, destino):
+        """Caminho mínimo como lista de ids (vazia se inalcançável), com os atalhos desfeitos."""
+        custo, encontro, ida, volta = self._buscar(origem, destino)
+        if np.isinf(custo):
+            return []
+        subindo = [encontro]
+        while ida[subindo[-1]][1] >= 0:
+            subindo.append(ida[subindo[-1]][1])
+        descendo = [encontro]
+        while volta[descendo[-1]][1] >= 0:
+            descendo.append(volta[descendo[-1]][1])
+        pontos = subindo[::-1] + descendo[1:]
+        caminho = [origem]
+        for a, b in zip(pontos[:-1], pontos[1:]):
+            caminho.extend(self._desempacotar(a, b))
+        return caminho
+
+    def matriz(self, origens, destinos):
+        """Distâncias de cada origem a cada destino (muitos para muitos, com baldes).
+
+        Cada destino faz uma única busca de descida e deixa o custo num balde
+        em cada ponto alcançado; cada origem faz uma busca de subida e só
+        combina com os baldes dos pontos por onde passa.
+        """
+        baldes = {}
+        for j, destino in enumerate(destinos):
+            for x, (custo, _) in self._busca_completa(self.descida, int(destino)).items():
+                baldes.setdefault(x, []).append((j, custo))
+        resultado = np.full((len(origens), len(destinos)), np.inf)
+        for i, origem in enumerate(origens):
+            linha = resultado[i]
+            for x, (custo, _) in self._busca_completa(self.subida, int(origem)).items():
+                for j, custo_destino in baldes.get(x, ()):
+                    if custo + custo_destino < linha[j]:
+                        linha[j] = custo + custo_destino
+        return resultado
+
+    def distancias(self, origem, destinos):
+        """Distâncias de uma origem a vários destinos (um para muitos)."""
+        return self.matriz([origem], destinos)[0]
+
+
+def carregar_se_existir(caminho, grafo):
+    """Hierarquia gravada em caminho, se existir e valer para o grafo; senão None."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return HierarquiaContracao.carregar(caminho, grafo)
+    except ValueError:
+        return None
+
+
+def main():
+    from leitor import ler_entrada
+    parser = argparse.ArgumentParser(description="Pré-processa o grafo de coleta numa hierarquia de contração.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("-o", "--saida", default=None, help="padrão: o nome da entrada com extensão .ch")
+    parser.add_argument("--limite-testemunha", type=int, default=64)
+    args = parser.parse_args()
+
+    grafo, _, _, _ = ler_entrada(args.entrada)
+    hierarquia = HierarquiaContracao.construir(grafo, args.limite_testemunha)
+    saida = args.saida or os.path.splitext(args.entrada)[0] + ".ch"
+    hierarquia.salvar(saida)
+    atalhos = len(hierarquia.subida[1]) + len(hierarquia.descida[1]) - grafo.num_arestas
+    print(f"Hierarquia com {grafo.num_pontos} pontos e {atalhos} atalhos gravada em {saida}.")
+
+
+if __name__ == "__main__":
+    main()
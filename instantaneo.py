@@ -0,0 +1,224 @@
+import argparse
+import json
+from collections import deque
+import numpy as np
+from animais import ESPECIES, PopulacaoAnimais
+from eventos import Agenda
+from grafo import GrafoCSR
+from main import (MODELOS_EVENTOS, ArmazemCaminhoes, ArmazemCarrocinhas, ArmazemPontos, CaminhaoDeLixo, Carrocinha,
+                  SimulacaoColeta, montar_simulacao)
+from registro import RegistroEventos
+from transito import PerfisTransito, TabelaTemporal
+
+# Um instantâneo é um único .npz comprimido com arrays numéricos, sem pickle:
+# grafo, lixo e animais por ponto, campos dos veículos, filas, agenda de eventos,
+# linha do tempo e estado do gerador aleatório da simulação, além dos perfis de
+# trânsito quando os tempos de viagem dependem do horário.
+_VERSAO = 1
+
+# Os dados de cada evento da agenda viram pares (tipo, valor) em arrays de inteiros.
+_SEM_DADO, _INTEIRO, _CAMINHAO, _CARROCINHA, _ESPECIE = range(5)
+_DADOS_POR_EVENTO = 3
+
+_CAMPOS_CAMINHAO = ("capacidade", "funcionarios", "volume_atual", "compactacoes", "relogio", "posicao")
+_CAMPOS_CARROCINHA = ("capacidade", "animais", "reservas", "relogio", "posicao")
+
+
+def _campos(veiculos, nomes):
+    """Campos de cada veículo lidos pelas visões (os veículos podem estar em armazéns diferentes)."""
+    arrays = {"id": np.array([v.id for v in veiculos], dtype=np.int64)}
+    for nome in nomes:
+        valores = [getattr(v, nome) for v in veiculos]
+        arrays[nome] = np.array([-1 if x is None else x for x in valores], dtype=np.float64)
+    return arrays
+
+
+def _codificar_agenda(agenda, caminhoes, carrocinhas):
+    posicao_caminhao = {c: i for i, c in enumerate(caminhoes)}
+    posicao_carrocinha = {c: i for i, c in enumerate(carrocinhas)}
+    fila = agenda._fila
+    tempos = np.array([e[0] for e in fila], dtype=np.float64)
+    sequencias = np.array([e[1] for e in fila], dtype=np.int64)
+    tipos = np.array([e[2] for e in fila])
+    dados_tipo = np.full((len(fila), _DADOS_POR_EVENTO), _SEM_DADO, dtype=np.int8)
+    dados_valor = np.zeros((len(fila), _DADOS_POR_EVENTO), dtype=np.int64)
+    for i, (_, _, _, dados) in enumerate(fila):
+        for j, dado in enumerate(dados):
+            if isinstance(dado, CaminhaoDeLixo):
+                dados_tipo[i, j], dados_valor[i, j] = _CAMINHAO, posicao_caminhao[dado]
+            elif isinstance(dado, Carrocinha):
+                dados_tipo[i, j], dados_valor[i, j] = _CARROCINHA, posicao_carrocinha[dado]
+            elif isinstance(dado, str):
+                dados_tipo[i, j], dados_valor[i, j] = _ESPECIE, ESPECIES.index(dado)
+            else:
+                dados_tipo[i, j], dados_valor[i, j] = _INTEIRO, int(dado)
+    return {"agenda_tempo": tempos, "agenda_sequencia": sequencias, "agenda_tipo": tipos.astype(str),
+            "agenda_dados_tipo": dados_tipo, "agenda_dados_valor": dados_valor}
+
+
+def _decodificar_agenda(dados, caminhoes, carrocinhas):
+    agenda = Agenda()
+    agenda._sequencia = int(dados["agenda_sequencia_proxima"])
+    agenda.processados = int(dados["agenda_processados"])
+    decodificar = {
+        _INTEIRO: int,
+        _CAMINHAO: caminhoes.__getitem__,
+        _CARROCINHA: carrocinhas.__getitem__,
+        _ESPECIE: ESPECIES.__getitem__,
+    }
+    # A fila foi gravada na ordem do heap, então continua sendo um heap válido
+    for tempo, sequencia, tipo, tipos, valores in zip(
+            dados["agenda_tempo"].tolist(), dados["agenda_sequencia"].tolist(), dados["agenda_tipo"].tolist(),
+            dados["agenda_dados_tipo"].tolist(), dados["agenda_dados_valor"].tolist()):
+        evento = tuple(decodificar[t](v) for t, v in zip(tipos, valores) if t != _SEM_DADO)
+        agenda._fila.append((_numero(tempo), sequencia, tipo, evento))
+    return agenda
+
+
+def _numero(x):
+    """Instantes e quantidades inteiros voltam como int, como foram gerados na simulação."""
+    x = float(x)
+    return int(x) if x.is_integer() else x
+
+
+def _fila_de_pontos(fila):
+    """Deque de ids com None (fim de viagem) como array, com -1 no lugar de None.
+
+    As marcas negativas do plano de uma política (main._ANTES_COMPACTAR...) são gravadas como estão.
+    """
+    return np.array([-1 if p is None else p for p in fila], dtype=np.int64)
+
+
+def salvar(simulacao, caminho):
+    """Grava o estado completo da simulação num único arquivo .npz comprimido."""
+    arrays = {
+        "versao": np.int64(_VERSAO),
+        "indptr": simulacao.grafo.indptr, "indices": simulacao.grafo.indices, "pesos": simulacao.grafo.pesos,
+        "lixo": np.array([p.lixo for p in simulacao.pontos], dtype=np.float64)
+        if not isinstance(simulacao.pontos, ArmazemPontos) else simulacao.pontos.lixo,
+        "aterros": np.array(simulacao.aterros.instalacoes, dtype=np.int64),
+        "abrigos": np.array(simulacao.abrigos.instalacoes, dtype=np.int64),
+        "tempo_maximo": np.float64(simulacao.tempo_maximo),
+        "intervalo_animais": np.float64(simulacao.intervalo_animais),
+        "tempo": np.float64(simulacao.tempo),
+        "encerrada": np.bool_(simulacao.encerrada),
+        "pendentes": _fila_de_pontos(simulacao.pendentes),
+        "agenda_sequencia_proxima": np.int64(simulacao.agenda._sequencia),
+        "agenda_processados": np.int64(simulacao.agenda.processados),
+        "rng": np.array(json.dumps(simulacao.rng.bit_generator.state)),
+        "registro": simulacao.linha_do_tempo_global.eventos(),
+        "registro_total": np.int64(simulacao.linha_do_tempo_global.total),
+    }
+    for especie in ESPECIES:
+        arrays[f"animais_{especie}"] = simulacao.populacao[especie]
+    for nome, valores in _campos(simulacao.caminhoes, _CAMPOS_CAMINHAO).items():
+        arrays[f"caminhao_{nome}"] = valores
+    for nome, valores in _campos(simulacao.carrocinhas, _CAMPOS_CARROCINHA).items():
+        arrays[f"carrocinha_{nome}"] = valores
+    if simulacao.roteiros is not None:
+        ids = list(simulacao.roteiros)
+        filas = [_fila_de_pontos(simulacao.roteiros[i]) for i in ids]
+        arrays["roteiro_ids"] = np.array(ids, dtype=np.int64)
+        arrays["roteiro_indptr"] = np.concatenate([[0], np.cumsum([len(f) for f in filas])]).astype(np.int64)
+        arrays["roteiro_pontos"] = np.concatenate(filas) if filas else np.zeros(0, dtype=np.int64)
+    if simulacao.tabela.temporal:
+        arrays["transito_largura"] = np.float64(simulacao.tabela.largura)
+        for nome, valores in simulacao.tabela.perfis.arrays().items():
+            arrays[f"transito_{nome}"] = valores
+    arrays.update(_codificar_agenda(simulacao.agenda, simulacao.caminhoes, simulacao.carrocinhas))
+    with open(caminho, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+def _veiculos(dados, prefixo, armazem, visao, nomes):
+    ids = dados[f"{prefixo}_id"]
+    for nome in nomes:
+        getattr(armazem, nome)[:] = dados[f"{prefixo}_{nome}"]
+    return [visao.sobre(armazem, i, int(ids[i])) for i in range(len(ids))]
+
+
+def _como_ids(instalacoes):
+    return int(instalacoes[0]) if len(instalacoes) == 1 else tuple(instalacoes.tolist())
+
+
+def carregar(caminho, tabela=None):
+    """Reconstrói a SimulacaoColeta gravada; avancar() continua exatamente de onde parou.
+
+    A tabela de distâncias não é gravada (é derivada do grafo e dos perfis de
+    trânsito) e é refeita sob demanda, ou pode ser passada pronta. Com um registro em anel ou gravado em
+    arquivo, só os eventos que estavam em memória voltam para a linha do tempo.
+    """
+    with np.load(caminho) as dados:
+        if int(dados["versao"]) != _VERSAO:
+            raise ValueError(f"{caminho}: versão de instantâneo {int(dados['versao'])} não suportada.")
+        grafo = GrafoCSR(dados["indptr"], dados["indices"], dados["pesos"])
+        populacao = PopulacaoAnimais(grafo.num_pontos)
+        for especie in ESPECIES:
+            populacao[especie][:] = dados[f"animais_{especie}"]
+        pontos = ArmazemPontos(grafo, dados["lixo"], populacao)
+
+        num_caminhoes, num_carrocinhas = len(dados["caminhao_id"]), len(dados["carrocinha_id"])
+        caminhoes = _veiculos(dados, "caminhao", ArmazemCaminhoes(num_caminhoes), CaminhaoDeLixo, _CAMPOS_CAMINHAO)
+        carrocinhas = _veiculos(dados, "carrocinha", ArmazemCarrocinhas(num_carrocinhas), Carrocinha,
+                                _CAMPOS_CARROCINHA)
+
+        registro = RegistroEventos.de_eventos(MODELOS_EVENTOS, dados["registro"], int(dados["registro_total"]))
+
+        if tabela is None and "transito_indptr" in dados:
+            perfis = PerfisTransito(grafo, **{nome: dados[f"transito_{nome}"]
+                                              for nome in ("origens", "destinos", "indptr", "instantes", "custos")})
+            tabela = TabelaTemporal(grafo, perfis, largura=_numero(dados["transito_largura"]))
+
+        rng = np.random.default_rng()
+        rng.bit_generator.state = json.loads(str(dados["rng"]))
+
+        simulacao = SimulacaoColeta(grafo, pontos, caminhoes, carrocinhas, _como_ids(dados["aterros"]),
+                                    _como_ids(dados["abrigos"]), _numero(dados["tempo_maximo"]), tabela,
+                                    intervalo_animais=_numero(dados["intervalo_animais"]), registro=registro, rng=rng)
+        simulacao.tempo = _numero(dados["tempo"])
+        simulacao.encerrada = bool(dados["encerrada"])
+        simulacao.pendentes = deque(None if p == -1 else p for p in dados["pendentes"].tolist())
+        if "roteiro_ids" in dados:
+            indptr, filas = dados["roteiro_indptr"], dados["roteiro_pontos"].tolist()
+            simulacao.roteiros = {
+                int(i): deque(None if p == -1 else p for p in filas[indptr[k]:indptr[k + 1]])
+                for k, i in enumerate(dados["roteiro_ids"].tolist())
+            }
+        simulacao.agenda = _decodificar_agenda(dados, caminhoes, carrocinhas)
+    return simulacao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grava e retoma instantâneos da simulação de coleta.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    gravar = comandos.add_parser("gravar", help="simula a entrada até um instante e grava o estado")
+    gravar.add_argument("entrada", nargs="?", default="entrada.txt")
+    gravar.add_argument("-a", "--ate", type=float, required=True, help="instante (min) em que a simulação para")
+    gravar.add_argument("-o", "--saida", default="turno.npz")
+    gravar.add_argument("-s", "--semente", type=int, default=None, help="semente dos sorteios da simulação")
+    retomar = comandos.add_parser("retomar", help="continua um instantâneo até o fim do turno")
+    retomar.add_argument("instantaneo")
+    retomar.add_argument("--custo", nargs=3, type=float, action="append", default=[], metavar=("U", "V", "CUSTO"),
+                         help="muda o custo de uma rua antes de continuar (cenário hipotético); pode repetir")
+    args = parser.parse_args()
+
+    if args.comando == "gravar":
+        simulacao = montar_simulacao(args.entrada, semente=args.semente)
+        simulacao.iniciar()
+        simulacao.avancar(ate=args.ate)
+        salvar(simulacao, args.saida)
+        print(f"Estado em {simulacao.tempo} min ({simulacao.agenda.processados} eventos) gravado em {args.saida}.")
+        return
+
+    simulacao = carregar(args.instantaneo)
+    ja_registrados = len(simulacao.linha_do_tempo_global)
+    for u, v, custo in args.custo:
+        simulacao.grafo.atualizar_custo(int(u), int(v), custo)
+    linha_do_tempo_global = simulacao.avancar()
+    print("=== Linha do Tempo Global (continuação) ===")
+    for evento in linha_do_tempo_global.linhas()[ja_registrados:]:
+        print(evento)
+
+
+if __name__ == "__main__":
+    main()
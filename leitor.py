@@ -0,0 +1,253 @@
+import os
+import struct
+import warnings
+import numpy as np
+import perfil
+from grafo import GrafoCSR
+
+# Cabeçalho do cache binário: assinatura, versão, número de pontos e de arestas,
+# quantidade de aterros e de centros de zoonoses (-1 quando ausentes), tamanho e
+# data de modificação do texto de origem e as opções de leitura (_OPCAO_*).
+# Os ids das instalações vêm depois do lixo.
+_CABECALHO = struct.Struct("<8sIqqqqqqI")
+_ASSINATURA = b"GRAFOCSR"
+_VERSAO = 3
+_OPCAO_INSTALACOES = 1
+_OPCAO_BIDIRECIONAL = 2
+_TAMANHO_CABECALHO = 64
+
+_ESPACOS = np.zeros(256, dtype=bool)
+_ESPACOS[[ord(" "), ord("\t"), ord("\r"), ord("\n"), ord("\v"), ord("\f")]] = True
+
+
+def _tokens_por_linha(bloco, num_linhas):
+    """Conta os tokens de cada linha de um bloco terminado em quebra de linha."""
+    dados = np.frombuffer(bloco, dtype=np.uint8)
+    espaco = _ESPACOS[dados]
+    # Um token começa onde há um caractere visível precedido de espaço (ou no início do bloco).
+    inicio_token = ~espaco
+    inicio_token[1:] &= espaco[:-1]
+    quebras = np.flatnonzero(dados == ord("\n"))
+    linha_do_token = np.searchsorted(quebras, np.flatnonzero(inicio_token))
+    return np.bincount(linha_do_token, minlength=num_linhas)
+
+
+def _inteiros(bloco, num_tokens):
+    """Converte os tokens do bloco em int64 numa única passada em C, sem um objeto Python por token."""
+    with warnings.catch_warnings():
+        # Um token que não é inteiro encerra a leitura com um aviso (NumPy 1.x) ou com um erro (NumPy 2.x)
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            valores = np.fromstring(bloco, dtype=np.int64, sep=" ")
+        except ValueError:
+            valores = None
+    if valores is None or len(valores) != num_tokens:
+        raise ValueError("Valor não inteiro no arquivo de entrada: esperados apenas inteiros.")
+    return valores
+
+
+def _ler_blocos(f, tamanho_bloco):
+    """Gera blocos de linhas completas, guardando a linha partida para o bloco seguinte."""
+    resto = b""
+    while True:
+        bloco = f.read(tamanho_bloco)
+        if not bloco:
+            break
+        bloco = resto + bloco
+        corte = bloco.rfind(b"\n") + 1
+        resto = bloco[corte:]
+        if corte:
+            yield bloco[:corte]
+    if resto.strip():
+        yield resto + b"\n"
+
+
+def _ler_instalacoes(linha, nome):
+    """Uma linha de instalações: um id, ou vários separados por espaço."""
+    ids = [int(token) for token in linha.split()]
+    if not ids:
+        raise ValueError(f"Linha do {nome} vazia: esperado ao menos um id.")
+    return _como_retorno(ids)
+
+
+def _como_retorno(ids):
+    """Um único id volta como int (formato original); vários, como tupla."""
+    return ids[0] if len(ids) == 1 else tuple(ids)
+
+
+@perfil.fase("ler_entrada")
+def ler_entrada(caminho, instalacoes=True, cache=None, exigir_bidirecional=True, tamanho_bloco=1 << 22):
+    """Lê o arquivo de entrada em blocos, direto para buffers NumPy.
+
+    Retorna (grafo, lixo, aterro_id, zoonoses_id). As linhas do aterro e do
+    centro de zoonoses podem listar vários ids; nesse caso o id volta como
+    tupla. Com instalacoes=False o arquivo não traz essas linhas (formato do teste.py).
+    Se cache for um caminho, um cache binário válido (do mesmo texto, lido com
+    as mesmas opções) é usado no lugar do texto e, caso contrário, é gravado
+    ao final da leitura.
+    """
+    if cache is not None and cache_valido(cache, caminho, instalacoes, exigir_bidirecional):
+        return carregar_cache(cache)
+
+    with open(caminho, "rb") as f:
+        num_pontos = int(f.readline())
+        aterro_id = zoonoses_id = None
+        if instalacoes:
+            aterro_id = _ler_instalacoes(f.readline(), "aterro")
+            zoonoses_id = _ler_instalacoes(f.readline(), "zoonoses")
+
+        lixo = np.zeros(num_pontos, dtype=np.int64)
+        origens, destinos, pesos = [], [], []
+        ponto = 0
+        for bloco in _ler_blocos(f, tamanho_bloco):
+            if ponto >= num_pontos:
+                break
+            num_linhas = bloco.count(b"\n")
+            contagem = _tokens_por_linha(bloco, num_linhas)
+            valores = _inteiros(bloco, int(contagem.sum()))
+
+            # Linhas além de num_pontos são ignoradas, como na leitura linha a linha.
+            usadas = min(num_linhas, num_pontos - ponto)
+            contagem = contagem[:usadas]
+            valores = valores[:contagem.sum()]
+            if (contagem == 0).any() or (contagem % 2 == 0).any():
+                linha = ponto + int(np.flatnonzero((contagem == 0) | (contagem % 2 == 0))[0])
+                raise ValueError(f"Linha do ponto {linha} mal formada: esperado '<lixo> [<vizinho> <custo>]...'.")
+
+            primeiros = np.zeros(usadas, dtype=np.int64)
+            np.cumsum(contagem[:-1], out=primeiros[1:])
+            lixo[ponto:ponto + usadas] = valores[primeiros]
+            pares = np.delete(valores, primeiros)
+            origens.append(np.repeat(np.arange(ponto, ponto + usadas), (contagem - 1) // 2))
+            destinos.append(pares[0::2])
+            pesos.append(pares[1::2])
+            ponto += usadas
+
+    if ponto < num_pontos:
+        raise ValueError(f"Esperados {num_pontos} pontos, encontrados {ponto}.")
+
+    origens = np.concatenate(origens) if origens else np.zeros(0, dtype=np.int64)
+    destinos = np.concatenate(destinos) if destinos else np.zeros(0, dtype=np.int64)
+    pesos = np.concatenate(pesos) if pesos else np.zeros(0, dtype=np.int64)
+    validar_entrada(num_pontos, origens, destinos, pesos, aterro_id, zoonoses_id, exigir_bidirecional)
+
+    grafo = GrafoCSR.de_arestas(num_pontos, origens, destinos, pesos)
+    if cache is not None:
+        salvar_cache(cache, grafo, lixo, aterro_id, zoonoses_id, fonte=caminho,
+                     instalacoes=instalacoes, exigir_bidirecional=exigir_bidirecional)
+    return grafo, lixo, aterro_id, zoonoses_id
+
+
+def validar_entrada(num_pontos, origens, destinos, pesos, aterro_id=None, zoonoses_id=None, exigir_bidirecional=True):
+    """Confere os ids, os custos e (opcionalmente) se toda conexão tem o caminho de volta."""
+    for nome, ids in (("aterro", aterro_id), ("zoonoses", zoonoses_id)):
+        for id_ in np.atleast_1d(ids if ids is not None else []).tolist():
+            if not 0 <= id_ < num_pontos:
+                raise ValueError(f"ID do {nome} ({id_}) fora do intervalo 0..{num_pontos - 1}.")
+
+    invalidos = np.flatnonzero((destinos < 0) | (destinos >= num_pontos))
+    if len(invalidos):
+        i = invalidos[0]
+        raise ValueError(f"Ponto {origens[i]} conectado a um ID inválido: {destinos[i]}.")
+    negativos = np.flatnonzero(pesos < 0)
+    if len(negativos):
+        i = negativos[0]
+        raise ValueError(f"Custo negativo na conexão {origens[i]} -> {destinos[i]}.")
+
+    if exigir_bidirecional:
+        ida = np.unique(origens * num_pontos + destinos)
+        volta = destinos * num_pontos + origens
+        sem_volta = np.flatnonzero(~np.isin(volta, ida))
+        if len(sem_volta):
+            i = sem_volta[0]
+            raise ValueError(f"Conexão {origens[i]} -> {destinos[i]} não tem o caminho de volta {destinos[i]} -> {origens[i]}.")
+
+
+def _alinhar(deslocamento):
+    return (deslocamento + 7) & ~7
+
+
+def _identidade_fonte(fonte):
+    if fonte is None:
+        return -1, -1
+    info = os.stat(fonte)
+    return info.st_size, info.st_mtime_ns
+
+
+def _opcoes(instalacoes, exigir_bidirecional):
+    return (_OPCAO_INSTALACOES if instalacoes else 0) | (_OPCAO_BIDIRECIONAL if exigir_bidirecional else 0)
+
+
+def salvar_cache(caminho, grafo, lixo, aterro_id=None, zoonoses_id=None, fonte=None, instalacoes=True,
+                 exigir_bidirecional=True):
+    """Grava grafo e lixo num arquivo binário que pode ser aberto com memmap.
+
+    instalacoes e exigir_bidirecional são as opções com que a fonte foi lida;
+    ficam no cabeçalho para que cache_valido recuse uma leitura com outras opções.
+    """
+    tamanho_fonte, mtime_fonte = _identidade_fonte(fonte)
+    aterros = np.atleast_1d(np.asarray(aterro_id if aterro_id is not None else [], dtype=np.int64))
+    zoonoses = np.atleast_1d(np.asarray(zoonoses_id if zoonoses_id is not None else [], dtype=np.int64))
+    cabecalho = _CABECALHO.pack(
+        _ASSINATURA, _VERSAO, grafo.num_pontos, grafo.num_arestas,
+        -1 if aterro_id is None else len(aterros),
+        -1 if zoonoses_id is None else len(zoonoses),
+        tamanho_fonte, mtime_fonte, _opcoes(instalacoes, exigir_bidirecional),
+    )
+    with open(caminho, "wb") as f:
+        f.write(cabecalho.ljust(_TAMANHO_CABECALHO, b"\0"))
+        for array in (grafo.indptr, grafo.indices, grafo.pesos, np.asarray(lixo, dtype=np.int64), aterros, zoonoses):
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.write(b"\0" * (_alinhar(f.tell()) - f.tell()))
+
+
+def _ler_cabecalho(caminho):
+    with open(caminho, "rb") as f:
+        dados = f.read(_CABECALHO.size)
+    if len(dados) < _CABECALHO.size:
+        return None
+    campos = _CABECALHO.unpack(dados)
+    if campos[0] != _ASSINATURA or campos[1] != _VERSAO:
+        return None
+    return campos
+
+
+def cache_valido(caminho, fonte, instalacoes=True, exigir_bidirecional=True):
+    """Indica se o cache existe e foi gerado a partir da versão atual do arquivo de texto com as mesmas opções.
+
+    Um cache validado com exigir_bidirecional também serve a uma leitura que não o exige.
+    """
+    if not os.path.exists(caminho):
+        return False
+    campos = _ler_cabecalho(caminho)
+    if campos is None or (campos[6], campos[7]) != _identidade_fonte(fonte):
+        return False
+    opcoes = campos[8]
+    if bool(opcoes & _OPCAO_INSTALACOES) != bool(instalacoes):
+        return False
+    return not exigir_bidirecional or bool(opcoes & _OPCAO_BIDIRECIONAL)
+
+
+def carregar_cache(caminho):
+    """Abre o cache binário sem copiar os arrays (memmap somente leitura)."""
+    campos = _ler_cabecalho(caminho)
+    if campos is None:
+        raise ValueError(f"{caminho} não é um cache de grafo válido.")
+    _, _, num_pontos, num_arestas, num_aterros, num_zoonoses, _, _, _ = campos
+
+    arrays = []
+    deslocamento = _TAMANHO_CABECALHO
+    for tipo, tamanho in ((np.int64, num_pontos + 1), (np.int32, num_arestas),
+                          (np.float64, num_arestas), (np.int64, num_pontos),
+                          (np.int64, max(num_aterros, 0)), (np.int64, max(num_zoonoses, 0))):
+        if tamanho:
+            arrays.append(np.memmap(caminho, dtype=tipo, mode="r", offset=deslocamento, shape=(tamanho,)))
+        else:
+            arrays.append(np.zeros(0, dtype=tipo))  # memmap não aceita regiões vazias
+        deslocamento = _alinhar(deslocamento + tamanho * np.dtype(tipo).itemsize)
+    indptr, indices, pesos, lixo, aterros, zoonoses = arrays
+
+    grafo = GrafoCSR(indptr, indices, pesos)
+    return (grafo, lixo,
+            None if num_aterros < 0 else _como_retorno(aterros.tolist()),
+            None if num_zoonoses < 0 else _como_retorno(zoonoses.tolist()))
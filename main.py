@@ -1,26 +1,122 @@
-import random
+import math
+import os
+import warnings
 import numpy as np
-import heapq
-
-class PontoDeColeta:
-    def __init__(self, id, lixo, conexoes):
-        self.id = id
-        self.lixo = lixo
-        self.conexoes = conexoes
-        self.animais = {"ratos": 0, "gatos": 0, "cachorros": 0}
-
-    def atualizar_animais(self):
-        self.animais["ratos"] = random.random() < 0.5
-        self.animais["gatos"] = random.random() < 0.25
-        self.animais["cachorros"] = random.random() < 0.1
-
-class CaminhaoDeLixo:
-    def __init__(self, id, capacidade, funcionarios):
-        self.id = id
-        self.capacidade = capacidade
-        self.funcionarios = funcionarios
-        self.volume_atual = 0
-        self.compactacoes = 0
+from collections import deque
+import perfil
+import politicas
+from animais import ESPECIES, PopulacaoAnimais
+from dimensionamento import frota_minima
+from entidades import Armazem, Campo, Visao
+from distancias import InstalacoesProximas, TabelaDistancias
+from proximidade import IndiceCarrocinhas
+from eventos import Agenda, CHEGADA, COLETA, COMPACTACAO, DESCARGA, MOVIMENTO_ANIMAIS, RECOLHA, DESCARGA_CARROCINHA
+from registro import RegistroEventos
+from roteamento import Rota, distribuir_rotas, planejar_rotas
+from sorteios import Sorteios, semente_do_ambiente
+
+# Tipos de evento da linha do tempo global e o texto de cada um
+EV_COLETA, EV_COMPACTACAO, EV_IDA_ATERRO, EV_DESCARGA_ATERRO, EV_FUGA_RATO, EV_FUGA_GATO, \
+    EV_RECOLHA, EV_IDA_ZOONOSES, EV_DESCARGA_ZOONOSES = range(9)
+
+MODELOS_EVENTOS = {
+    EV_COLETA: "[{tempo} min] Caminhão {veiculo} recolheu {valor} m³ de lixo no ponto {ponto}.",
+    EV_COMPACTACAO: "[{tempo} min] Caminhão {veiculo} compactou o lixo. Volume atual: {valor:.2f} m³.",
+    EV_IDA_ATERRO: "[{tempo} min] Caminhão {veiculo} indo para o aterro.",
+    EV_DESCARGA_ATERRO: "[{tempo} min] Caminhão {veiculo} descarregou no aterro.",
+    EV_FUGA_RATO: "[{tempo} min] Um rato fugiu do ponto {ponto} para o ponto {destino}.",
+    EV_FUGA_GATO: "[{tempo} min] Um gato fugiu do ponto {ponto} para o ponto {destino}.",
+    EV_RECOLHA: "[{tempo} min] Carrocinha {veiculo} recolheu um {especie} no ponto {ponto}. Total de animais: {valor}.",
+    EV_IDA_ZOONOSES: "[{tempo} min] Carrocinha {veiculo} indo para o centro de zoonoses.",
+    EV_DESCARGA_ZOONOSES: "[{tempo} min] Carrocinha {veiculo} descarregou {valor} animais no abrigo.",
+}
+
+# Marcas do plano de uma política (politicas.py) nos roteiros, antes da parada a que se referem
+_ANTES_COMPACTAR, _ANTES_DESCARREGAR = -2, -3
+_MARCAS = {politicas.COMPACTAR: _ANTES_COMPACTAR, politicas.DESCARREGAR: _ANTES_DESCARREGAR}
+
+class ArmazemPontos(Armazem):
+    """Lixo de todos os pontos num array; animais na PopulacaoAnimais e conexões no GrafoCSR."""
+
+    CAMPOS = {"lixo": np.float64}
+
+    def __init__(self, grafo, lixo, populacao=None):
+        super().__init__(len(lixo), lixo=lixo)
+        self.grafo = grafo
+        self.populacao = populacao if populacao is not None else PopulacaoAnimais(len(lixo))
+
+
+class PontoDeColeta(Visao):
+    __slots__ = ()
+    lixo = Campo()
+
+    def __init__(self, id, lixo, grafo, populacao=None):
+        # Ponto avulso: um armazém só para ele. Em lote, use criar_pontos. Os animais e as conexões
+        # são indexados pelo id no grafo, então a população cobre todos os pontos do grafo.
+        if populacao is None:
+            populacao = PopulacaoAnimais(grafo.num_pontos)
+        armazem = ArmazemPontos(grafo, [lixo], populacao)
+        self.id, self._armazem, self._indice = id, armazem, 0
+
+    @property
+    def grafo(self):
+        return self._armazem.grafo
+
+    @property
+    def populacao(self):
+        return self._armazem.populacao
+
+    @property
+    def conexoes(self):
+        return self.grafo.vizinhos(self.id)
+
+    @property
+    def animais(self):
+        return self.populacao.visao(self.id)
+
+    @animais.setter
+    def animais(self, valores):
+        self.animais.update(valores)
+
+    def atualizar_animais(self, rng=None):
+        """Sorteia os animais só deste ponto; para todos de uma vez, use populacao.sortear."""
+        self.populacao.sortear(rng, [self.id])
+
+ArmazemPontos.VISAO = PontoDeColeta
+
+class ArmazemCaminhoes(Armazem):
+    """Frota de caminhões em arrays: carga, compactações, relógio e posição de cada um."""
+
+    CAMPOS = {"capacidade": np.int64, "funcionarios": np.int64, "volume_atual": np.float64,
+              "compactacoes": np.int64, "relogio": np.float64, "posicao": np.int64}
+
+    def __init__(self, quantidade=0, capacidade=0, funcionarios=0):
+        super().__init__(quantidade, capacidade=capacidade, funcionarios=funcionarios, posicao=-1)
+
+    def compactar(self, indices):
+        """Compacta de uma vez os caminhões indicados que ainda podem compactar."""
+        indices = np.asarray(indices)
+        indices = indices[self.compactacoes[indices] < 3]
+        self.volume_atual[indices] *= (1 / 3)
+        self.compactacoes[indices] += 1
+
+    def descarregar(self, indices):
+        self.volume_atual[indices] = 0
+        self.compactacoes[indices] = 0
+
+class CaminhaoDeLixo(Visao):
+    __slots__ = ()
+    capacidade = Campo()
+    funcionarios = Campo()
+    volume_atual = Campo()
+    compactacoes = Campo()
+    relogio = Campo()  # Instante em que o caminhão fica livre
+    posicao = Campo(nulo=-1)  # Ponto onde o caminhão está
+
+    def __init__(self, id, capacidade, funcionarios, frota=None):
+        frota = frota if frota is not None else ArmazemCaminhoes()
+        self.id, self._armazem = id, frota
+        self._indice = frota.adicionar(capacidade=capacidade, funcionarios=funcionarios, posicao=-1)
 
     def compactar(self):
         if self.compactacoes < 3:
@@ -32,7 +128,7 @@ class CaminhaoDeLixo:
         self.compactacoes = 0
 
     def coleta(self, ponto):
-        tempo_gasto = int(np.ceil(ponto.lixo / self.funcionarios))
+        tempo_gasto = math.ceil(ponto.lixo / self.funcionarios)
         if any(ponto.animais.values()):
             tempo_gasto *= 2
 
@@ -42,166 +138,437 @@ class CaminhaoDeLixo:
         
         return tempo_gasto, coletado
 
-class Carrocinha:
-    def __init__(self, id, capacidade):
-        self.id = id
-        self.capacidade = capacidade
-        self.animais = 0
-
-    def recolher_animal(self, animal, ponto_id, tempo_atual, linha_do_tempo_global):
-        if self.animais < self.capacidade:
-            self.animais += 1
-            linha_do_tempo_global.append(f"[{tempo_atual} min] Carrocinha {self.id} recolheu um {animal} no ponto {ponto_id}. Total de animais: {self.animais}.")
-
-    def descarregar(self, tempo_atual, zoonoses_id, linha_do_tempo_global, pontos):
-        if self.animais > 0:
-            linha_do_tempo_global.append(f"[{tempo_atual} min] Carrocinha {self.id} indo para o centro de zoonoses.")
-            # Simula o tempo de deslocamento até o centro de zoonoses.
-            tempo_ate_zoonoses = dijkstra(pontos, zoonoses_id)[zoonoses_id]
-            tempo_atual += tempo_ate_zoonoses
-            linha_do_tempo_global.append(f"[{tempo_atual} min] Carrocinha {self.id} descarregou {self.animais} animais no abrigo.")
-            self.animais = 0
-
-def dijkstra(pontos, inicio):
-    dist = {p.id: float('inf') for p in pontos}
-    dist[inicio] = 0
-    pq = [(0, inicio)]
-
-    while pq:
-        custo_atual, ponto_atual = heapq.heappop(pq)
+ArmazemCaminhoes.VISAO = CaminhaoDeLixo
 
-        if custo_atual > dist[ponto_atual]:
-            continue
+class ArmazemCarrocinhas(Armazem):
+    """Carrocinhas em arrays: animais a bordo, reservas, relógio e posição de cada uma."""
 
-        for vizinho, custo in pontos[ponto_atual].conexoes:
-            novo_custo = custo_atual + custo
-            if novo_custo < dist[vizinho]:
-                dist[vizinho] = novo_custo
-                heapq.heappush(pq, (novo_custo, vizinho))
+    CAMPOS = {"capacidade": np.int64, "animais": np.int64, "reservas": np.int64,
+              "relogio": np.float64, "posicao": np.int64}
 
-    return dist
-
-def movimentar_animais(pontos, carrocinhas, linha_do_tempo_global, tempo_atual):
-    for ponto in pontos:
-        
-        # Movimentação de ratos se houver gatos no mesmo ponto
-        if ponto.animais["gatos"] > 0 and ponto.animais["ratos"] > 0:
-            for _ in range(ponto.animais["ratos"]):
-                destino_id = random.choice([vizinho for vizinho, _ in ponto.conexoes])
-                destino_ponto = next(p for p in pontos if p.id == destino_id)
-                destino_ponto.animais["ratos"] += 1
-                linha_do_tempo_global.append(f"[{tempo_atual} min] Um rato fugiu do ponto {ponto.id} para o ponto {destino_id}.")
-            ponto.animais["ratos"] -= len(destino_ponto.conexoes)
-
-        # Movimentação de gatos se houver cachorros no mesmo ponto
-        if ponto.animais["cachorros"] > 0 and ponto.animais["gatos"] > 0:
-            for _ in range(ponto.animais["gatos"]):
-                destino_id = random.choice([vizinho for vizinho, _ in ponto.conexoes])
-                destino_ponto = next(p for p in pontos if p.id == destino_id)
-                destino_ponto.animais["gatos"] += 1
-                linha_do_tempo_global.append(f"[{tempo_atual} min] Um gato fugiu do ponto {ponto.id} para o ponto {destino_id}.")
-            ponto.animais["gatos"] -= len(destino_ponto.conexoes)
-
-def executar_coleta_simultanea(pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo):
-    tempo_atual = 0
-    linha_do_tempo_global = []
-
-    while tempo_atual < tempo_maximo:
-        
-        all_collected = all(p.lixo == 0 for p in pontos)
-
-        for caminhao in caminhoes:
-            for ponto in pontos:
-                if ponto.lixo > 0:
-                    all_collected = False
-                    tempo_gasto_coleta, coletado_lixo = caminhao.coleta(ponto)
-                    linha_do_tempo_global.append(f"[{tempo_atual} min] Caminhão {caminhao.id} recolheu {coletado_lixo} m³ de lixo no ponto {ponto.id}.")
-                    tempo_atual += tempo_gasto_coleta
-                
-                while caminhao.volume_atual >= caminhao.capacidade and caminhao.compactacoes < 3:
-                    caminhao.compactar()
-                    linha_do_tempo_global.append(f"[{tempo_atual} min] Caminhão {caminhao.id} compactou o lixo. Volume atual: {caminhao.volume_atual:.2f} m³.")
-                    # Simula o tempo de compactação como um minuto adicional por operação de compactação.
-                    tempo_atual += 1 
-
-                if caminhao.volume_atual >= caminhao.capacidade and caminhao.compactacoes == 3:
-                    linha_do_tempo_global.append(f"[{tempo_atual} min] Caminhão {caminhao.id} indo para o aterro.")
-                    # Simula o tempo de deslocamento até o aterro.
-                    tempo_ate_aterro = dijkstra(pontos, caminhao.id)[aterro_id]
-                    tempo_atual += tempo_ate_aterro
-                    caminhao.descarregar()
-                    linha_do_tempo_global.append(f"[{tempo_atual} min] Caminhão {caminhao.id} descarregou no aterro.")
-
-                movimentar_animais(pontos, carrocinhas, linha_do_tempo_global, tempo_atual)
-
-                # Notificar carrocinhas se houver animais a serem recolhidos
-                for animal in ["gatos", "cachorros"]:
-                    if ponto.animais[animal]:
-                        carrocinha_disponivel = next((c for c in carrocinhas if c.animais < c.capacidade), None)
-                        if carrocinha_disponivel:
-                            carrocinha_disponivel.recolher_animal(animal, ponto.id, tempo_atual, linha_do_tempo_global)
-                            if carrocinha_disponivel.animais >= carrocinha_disponivel.capacidade:
-                                carrocinha_disponivel.descarregar(tempo_atual, zoonoses_id, linha_do_tempo_global, pontos)
-
-                if all_collected or tempo_atual >= tempo_maximo:
-                    return linha_do_tempo_global
-    
-    return linha_do_tempo_global
+    def __init__(self, quantidade=0, capacidade=0):
+        super().__init__(quantidade, capacidade=capacidade, posicao=-1)
 
-def calcular_recursos_minimos_vias(pontos, tempo_maximo=8*60):
-    capacidade_caminhao = 10
-    funcionarios_por_caminhao = 5
-    capacidade_carrocinha = 5
+class Carrocinha(Visao):
+    __slots__ = ()
+    capacidade = Campo()
+    animais = Campo()
+    reservas = Campo()  # Animais que a carrocinha já foi chamada para recolher
+    relogio = Campo()  # Instante em que a carrocinha termina a última tarefa agendada
+    posicao = Campo(nulo=-1)  # Ponto onde a carrocinha estará ao fim dessa tarefa
 
-    total_lixo = sum(p.lixo for p in pontos)
-    total_animais = sum(any(p.animais.values()) for p in pontos)
+    def __init__(self, id, capacidade, frota=None):
+        frota = frota if frota is not None else ArmazemCarrocinhas()
+        self.id, self._armazem = id, frota
+        self._indice = frota.adicionar(capacidade=capacidade, posicao=-1)
 
-    # Calcular o tempo total necessário para a coleta
-    tempo_total_coleta = sum(int(np.ceil(p.lixo / funcionarios_por_caminhao)) * (2 if any(p.animais.values()) else 1) for p in pontos)
+    def recolher_animal(self, animal, ponto_id, tempo_atual, linha_do_tempo_global):
+        if self.animais < self.capacidade:
+            self.animais += 1
+            linha_do_tempo_global.registrar(tempo_atual, EV_RECOLHA, self.id, ponto_id, valor=self.animais, especie=ESPECIES.index(animal))
+
+    def ir_para_zoonoses(self, tempo_atual, abrigos, linha_do_tempo_global, tabela=None):
+        """Parte para o centro de zoonoses mais próximo e retorna o instante de chegada."""
+        linha_do_tempo_global.registrar(tempo_atual, EV_IDA_ZOONOSES, self.id)
+        # Simula o tempo de deslocamento até o centro de zoonoses (consulta O(1), sem busca no grafo).
+        zoonoses_id, distancia = abrigos.mais_proxima(self.posicao)
+        if tabela is not None and tabela.temporal:
+            distancia = tabela.distancia(self.posicao, zoonoses_id, tempo_atual)  # No trânsito do horário de saída
+        tempo_atual += distancia
+        self.relogio = tempo_atual
+        self.posicao = zoonoses_id
+        return tempo_atual
+
+    def descarregar(self, tempo_atual, linha_do_tempo_global):
+        if self.animais > 0:
+            linha_do_tempo_global.registrar(tempo_atual, EV_DESCARGA_ZOONOSES, self.id, self.posicao, valor=self.animais)
+            self.animais = 0
 
-    # Estimar o número de viagens necessárias considerando compactação e viagens ao aterro
-    viagens_necessarias = np.ceil(total_lixo / (capacidade_caminhao * 3))  
-    caminhoes_necessarios = max(1, int(np.ceil(tempo_total_coleta / (tempo_maximo / viagens_necessarias))))
+ArmazemCarrocinhas.VISAO = Carrocinha
+
+def criar_pontos(grafo, lixo):
+    """Cria os pontos de coleta num único ArmazemPontos, com uma única PopulacaoAnimais.
+
+    O resultado se comporta como a lista de PontoDeColeta (pontos[i], for ponto in pontos),
+    mas os objetos são visões criadas sob demanda; o lixo fica em pontos.lixo.
+    """
+    return ArmazemPontos(grafo, lixo)
+
+def criar_caminhoes(quantidade, capacidade, funcionarios):
+    """Cria a frota num único ArmazemCaminhoes e retorna as visões de cada caminhão."""
+    frota = ArmazemCaminhoes(quantidade, capacidade, funcionarios)
+    return list(frota)
+
+def criar_carrocinhas(quantidade, capacidade):
+    """Cria as carrocinhas num único ArmazemCarrocinhas e retorna as visões de cada uma."""
+    return list(ArmazemCarrocinhas(quantidade, capacidade))
+
+def lixo_dos_pontos(pontos):
+    """Array com o lixo de cada ponto, lido direto do armazém quando possível."""
+    if isinstance(pontos, ArmazemPontos):
+        return pontos.lixo
+    return np.array([p.lixo for p in pontos], dtype=np.float64)
+
+def pontos_com_animais(pontos):
+    """Máscara dos pontos com algum animal."""
+    if isinstance(pontos, ArmazemPontos):
+        return pontos.populacao.total() > 0
+    return np.array([any(p.animais.values()) for p in pontos], dtype=bool)
+
+@perfil.fase("movimentar_animais")
+def movimentar_animais(grafo, populacao, linha_do_tempo_global, tempo_atual, rng=None):
+    # Ratos fogem dos pontos com gatos e gatos fogem dos pontos com cachorros,
+    # todos de uma vez e para vizinhos sorteados.
+    tem_gatos = populacao.gatos > 0
+    tem_cachorros = populacao.cachorros > 0
+
+    origens, destinos = populacao.fugir(grafo, "ratos", tem_gatos, rng)
+    linha_do_tempo_global.registrar_lote(tempo_atual, EV_FUGA_RATO, origens, destinos)
+
+    origens, destinos = populacao.fugir(grafo, "gatos", tem_cachorros, rng)
+    linha_do_tempo_global.registrar_lote(tempo_atual, EV_FUGA_GATO, origens, destinos)
+
+class SimulacaoColeta:
+    """Simulação orientada a eventos: cada caminhão e carrocinha tem o próprio relógio.
+
+    Os veículos trabalham em paralelo; o custo da simulação cresce com o número
+    de eventos (chegadas, coletas, compactações, descargas e movimentos de
+    animais), e não com varreduras de todos os pontos a cada passo.
+    """
+
+    def __init__(self, grafo, pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo,
+                 tabela=None, intervalo_animais=10, rotas=None, registro=None, rng=None, politica=None,
+                 atribuicao=None, grafo_animais=None):
+        self.grafo = grafo
+        # Por onde os animais fogem; difere do grafo dos veículos quando este tem pontos virtuais (zonas.py)
+        self.grafo_animais = grafo_animais if grafo_animais is not None else grafo
+        self.pontos = pontos
+        self.populacao = pontos[0].populacao if len(pontos) else PopulacaoAnimais(0)
+        self.caminhoes = caminhoes
+        self.carrocinhas = carrocinhas
+        # Carrocinhas com vaga por ordem de chegada a cada ponto com animais avistados
+        self.indice_carrocinhas = IndiceCarrocinhas(grafo, carrocinhas)
+        # Aterros e centros de zoonoses (um id ou vários): a mais próxima de cada ponto é
+        # calculada uma vez por tipo, e as descargas não fazem busca no grafo.
+        self.aterros = InstalacoesProximas(grafo, aterro_id)
+        self.abrigos = InstalacoesProximas(grafo, zoonoses_id)
+        self.tempo_maximo = tempo_maximo
+        # Distâncias calculadas uma única vez por grafo e reaproveitadas em todas as viagens;
+        # com uma TabelaTemporal (transito.py), os tempos de viagem dependem do horário de saída.
+        self.tabela = tabela if tabela is not None else TabelaDistancias(grafo)
+        self.intervalo_animais = intervalo_animais
+        # Eventos guardados como registros compactos; o texto só é montado na leitura
+        self.linha_do_tempo_global = registro if registro is not None else RegistroEventos(MODELOS_EVENTOS)
+        self.agenda = Agenda()
+        self.rng = rng if rng is not None else np.random.default_rng()  # Sorteios da movimentação dos animais
+        self.tempo = 0  # Instante do último evento processado
+        self.encerrada = False  # Todo o lixo recolhido: nada mais a simular
+        # Pontos com lixo ainda não atribuídos a nenhum caminhão, na ordem da lista
+        lixo = lixo_dos_pontos(pontos)
+        self.pendentes = deque(np.flatnonzero(lixo > 0).tolist())
+        # Com rotas planejadas, cada caminhão segue o seu roteiro; None marca o fim de uma viagem.
+        # atribuicao (as viagens de cada caminhão, como em Dimensionamento.atribuicao) é seguida como
+        # veio; rotas soltas são repartidas entre os caminhões aqui. Com uma política (nome em
+        # politicas.POLITICAS ou função), o roteiro leva também as compactações e descargas que ela
+        # planejou antes de cada parada.
+        self.roteiros = None
+        if rotas is not None or atribuicao is not None:
+            if atribuicao is None:
+                atribuicao = distribuir_rotas(rotas, len(caminhoes))
+            atribuicao = list(atribuicao) + [[] for _ in range(len(caminhoes) - len(atribuicao))]
+            self.roteiros = {}
+            if isinstance(politica, str):
+                politica = politicas.POLITICAS[politica]
+            saida = InstalacoesProximas(grafo, aterro_id, chegada=False) if politica is not None else None
+            for caminhao, viagens in zip(caminhoes, atribuicao):
+                self.roteiros[caminhao.id] = deque(
+                    p for rota in viagens for p in self._roteiro(rota, caminhao, politica, saida, lixo) + [None])
+        # Contagem exata para o fim da coleta: uma soma de lixo em ponto flutuante pode sobrar um resíduo
+        # acima de zero depois que todos os pontos ficam limpos
+        self.pontos_com_lixo = int(np.count_nonzero(lixo > 0))
+
+    def _roteiro(self, rota, caminhao, politica, saida, lixo):
+        """Pontos da viagem, precedidos das marcas do plano da política, se houver."""
+        if politica is None:
+            return list(rota.pontos)
+        viagem = politicas.Viagem.de_rota(rota, self.tabela, self.aterros, saida, lixo, capacidade=caminhao.capacidade)
+        roteiro = []
+        for ponto_id, acao in zip(rota.pontos, politica(viagem).tolist()):
+            if acao in _MARCAS:
+                roteiro.append(_MARCAS[acao])
+            roteiro.append(ponto_id)
+        return roteiro
+
+    def executar(self):
+        self.iniciar()
+        return self.avancar()
+
+    def iniciar(self):
+        """Posiciona os veículos e agenda os primeiros eventos do turno."""
+        aterros, abrigos = self.aterros.instalacoes, self.abrigos.instalacoes
+        for i, caminhao in enumerate(self.caminhoes):
+            caminhao.relogio = 0
+            caminhao.posicao = aterros[i % len(aterros)]  # Os caminhões saem dos aterros, em rodízio
+            self._despachar_caminhao(caminhao, 0)
+        for i, carrocinha in enumerate(self.carrocinhas):
+            carrocinha.relogio = 0
+            carrocinha.posicao = abrigos[i % len(abrigos)]  # As carrocinhas saem dos centros de zoonoses
+        self.agenda.agendar(0, MOVIMENTO_ANIMAIS)
+
+    @perfil.fase("simulacao")
+    def avancar(self, ate=None):
+        """Processa os eventos até o fim do turno ou, com ate, até aquele instante (exclusive).
+
+        Parar no meio não perde nada: os eventos seguintes continuam na agenda,
+        e o estado pode ser gravado (instantaneo.py) e retomado depois.
+        """
+        limite = self.tempo_maximo if ate is None else min(ate, self.tempo_maximo)
+        tratadores = {
+            CHEGADA: self._chegada,
+            COLETA: self._fim_coleta,
+            COMPACTACAO: self._compactacao,
+            DESCARGA: self._descarga,
+            MOVIMENTO_ANIMAIS: self._movimento_animais,
+            RECOLHA: self._recolha,
+            DESCARGA_CARROCINHA: self._descarga_carrocinha,
+        }
+        while len(self.agenda) and not self.encerrada:
+            if self.agenda.proximo_tempo() >= limite:
+                break
+            tempo, tipo, dados = self.agenda.proximo()
+            self.tempo = tempo
+            tratadores[tipo](tempo, *dados)
+            if self.pontos_com_lixo == 0:
+                self.encerrada = True
+
+        return self.linha_do_tempo_global
+
+    # ---- Caminhões ----
+
+    def _despachar_caminhao(self, caminhao, tempo):
+        """Envia o caminhão livre ao próximo ponto do roteiro (ou pendente), se houver."""
+        fila = self.pendentes if self.roteiros is None else self.roteiros[caminhao.id]
+        while fila:
+            ponto_id = fila.popleft()
+            if ponto_id is None:
+                if caminhao.volume_atual > 0:
+                    self._ir_ao_aterro(caminhao, tempo)  # Fim da viagem planejada
+                    return
+            elif ponto_id == _ANTES_COMPACTAR:
+                if caminhao.volume_atual > 0 and caminhao.compactacoes < 3:
+                    self.agenda.agendar(tempo, COMPACTACAO, caminhao)
+                    return
+            elif ponto_id == _ANTES_DESCARREGAR:
+                if caminhao.volume_atual > 0:
+                    self._ir_ao_aterro(caminhao, tempo)
+                    return
+            elif self.pontos[ponto_id].lixo > 0:
+                chegada = tempo + self.tabela.distancia(caminhao.posicao, ponto_id, tempo)
+                caminhao.relogio = chegada
+                self.agenda.agendar(chegada, CHEGADA, caminhao, ponto_id)
+                return
+
+    def _chegada(self, tempo, caminhao, ponto_id):
+        ponto = self.pontos[ponto_id]
+        caminhao.posicao = ponto_id
+        havia_lixo = ponto.lixo > 0
+        tempo_gasto_coleta, coletado_lixo = caminhao.coleta(ponto)
+        if havia_lixo and ponto.lixo <= 0:
+            self.pontos_com_lixo -= 1
+        self.linha_do_tempo_global.registrar(tempo, EV_COLETA, caminhao.id, ponto.id, valor=coletado_lixo)
+        caminhao.relogio = tempo + tempo_gasto_coleta
+        self.agenda.agendar(caminhao.relogio, COLETA, caminhao, ponto_id)
+
+    def _fim_coleta(self, tempo, caminhao, ponto_id):
+        if self.pontos[ponto_id].lixo > 0:
+            # O caminhão encheu antes de esvaziar o ponto
+            fila = self.pendentes if self.roteiros is None else self.roteiros[caminhao.id]
+            fila.appendleft(ponto_id)
+        self._proxima_acao(caminhao, tempo)
+
+    def _proxima_acao(self, caminhao, tempo):
+        caminhao.relogio = tempo
+        if caminhao.volume_atual >= caminhao.capacidade and caminhao.compactacoes < 3:
+            self.agenda.agendar(tempo, COMPACTACAO, caminhao)
+        elif caminhao.volume_atual >= caminhao.capacidade:
+            self._ir_ao_aterro(caminhao, tempo)
+        else:
+            self._despachar_caminhao(caminhao, tempo)
+
+    def _ir_ao_aterro(self, caminhao, tempo):
+        self.linha_do_tempo_global.registrar(tempo, EV_IDA_ATERRO, caminhao.id)
+        # Simula o tempo de deslocamento até o aterro mais próximo.
+        aterro_id, distancia = self.aterros.mais_proxima(caminhao.posicao)
+        if self.tabela.temporal:
+            distancia = self.tabela.distancia(caminhao.posicao, aterro_id, tempo)  # No trânsito do horário de saída
+        caminhao.relogio = tempo + distancia
+        self.agenda.agendar(caminhao.relogio, DESCARGA, caminhao, aterro_id)
+
+    def _compactacao(self, tempo, caminhao):
+        caminhao.compactar()
+        self.linha_do_tempo_global.registrar(tempo, EV_COMPACTACAO, caminhao.id, valor=caminhao.volume_atual)
+        # Simula o tempo de compactação como um minuto adicional por operação de compactação.
+        self._proxima_acao(caminhao, tempo + 1)
+
+    def _descarga(self, tempo, caminhao, aterro_id):
+        caminhao.descarregar()
+        caminhao.posicao = aterro_id
+        self.linha_do_tempo_global.registrar(tempo, EV_DESCARGA_ATERRO, caminhao.id, aterro_id)
+        self._proxima_acao(caminhao, tempo)
+
+    # ---- Animais e carrocinhas ----
+
+    def _movimento_animais(self, tempo):
+        movimentar_animais(self.grafo_animais, self.populacao, self.linha_do_tempo_global, tempo, self.rng)
+        self._acionar_carrocinhas(tempo)
+        self.agenda.agendar(tempo + self.intervalo_animais, MOVIMENTO_ANIMAIS)
+
+    @perfil.fase("despacho_carrocinhas")
+    def _acionar_carrocinhas(self, tempo):
+        # Notificar carrocinhas se houver animais a serem recolhidos
+        avistados = np.flatnonzero((self.populacao.gatos > 0) | (self.populacao.cachorros > 0))
+        for ponto_id in avistados.tolist():
+            ponto = self.pontos[ponto_id]
+            for animal in ["gatos", "cachorros"]:
+                while ponto.animais[animal] > 0:
+                    carrocinha = self.indice_carrocinhas.mais_proxima(ponto_id, tempo)
+                    if carrocinha is None:
+                        break
+                    ponto.animais[animal] -= 1
+                    carrocinha.reservas += 1
+                    partida = max(tempo, carrocinha.relogio)
+                    chegada = partida + self.tabela.distancia(carrocinha.posicao, ponto.id, partida)
+                    carrocinha.relogio = chegada
+                    carrocinha.posicao = ponto.id
+                    self.agenda.agendar(chegada, RECOLHA, carrocinha, animal, ponto.id)
+
+    def _recolha(self, tempo, carrocinha, animal, ponto_id):
+        carrocinha.reservas -= 1
+        carrocinha.recolher_animal(animal, ponto_id, tempo, self.linha_do_tempo_global)
+        if carrocinha.animais >= carrocinha.capacidade:
+            chegada = carrocinha.ir_para_zoonoses(tempo, self.abrigos, self.linha_do_tempo_global, self.tabela)
+            self.agenda.agendar(chegada, DESCARGA_CARROCINHA, carrocinha)
+
+    def _descarga_carrocinha(self, tempo, carrocinha):
+        carrocinha.descarregar(tempo, self.linha_do_tempo_global)
+        self.indice_carrocinhas.liberada(carrocinha, tempo)
+
+
+def executar_coleta_simultanea(grafo, pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo, tabela=None, rotas=None,
+                               registro=None, rng=None, politica=None, atribuicao=None, grafo_animais=None):
+    """Retorna a linha do tempo global (RegistroEventos; iterar sobre ela produz o texto de cada evento)."""
+    simulacao = SimulacaoColeta(grafo, pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo,
+                                tabela, rotas=rotas, registro=registro, rng=rng, politica=politica, atribuicao=atribuicao,
+                                grafo_animais=grafo_animais)
+    return simulacao.executar()
+
+def tempos_de_coleta(pontos, funcionarios):
+    """Tempo de coleta de cada ponto, dobrado onde há animais (mesma regra de CaminhaoDeLixo.coleta)."""
+    return np.ceil(lixo_dos_pontos(pontos) / funcionarios).astype(np.int64) * np.where(pontos_com_animais(pontos), 2, 1)
+
+@perfil.fase("dimensionamento")
+def dimensionar_frota(pontos, aterro_id, tempo_maximo=8*60, tabela=None, capacidade_caminhao=10,
+                      funcionarios_por_caminhao=5):
+    """Planeja as viagens e acha a menor frota que as cumpre em tempo_maximo (um Dimensionamento).
+
+    A atribuição do resultado diz quais viagens cada caminhão faz; viagens
+    mais longas que o turno saem em dimensionamento.inviaveis, num caminhão
+    só delas, em vez de interromper o dimensionamento.
+    """
+    if tabela is None:
+        tabela = TabelaDistancias(pontos[0].grafo)
+    rotas = planejar_rotas(tabela, aterro_id, lixo_dos_pontos(pontos), capacidade_caminhao,
+                           tempos_de_coleta(pontos, funcionarios_por_caminhao), tempo_maximo=tempo_maximo)
+    return frota_minima(rotas, tempo_maximo)
+
+def calcular_carrocinhas(pontos, capacidade_carrocinha=5):
+    """Carrocinhas para recolher um animal de cada ponto onde há animais, com ao menos uma."""
+    total_animais = int(np.count_nonzero(pontos_com_animais(pontos)))
+    return max(1, math.ceil(total_animais / capacidade_carrocinha))
+
+def calcular_recursos_minimos_vias(pontos, tempo_maximo=8*60, aterro_id=None, tabela=None, capacidade_caminhao=10,
+                                   funcionarios_por_caminhao=5, capacidade_carrocinha=5):
+    """Caminhões, funcionários e carrocinhas necessários.
+
+    Com o aterro, as viagens são planejadas sobre o grafo e a frota mínima
+    que as cumpre sai de frota_minima. Sem ele não há deslocamentos a
+    planejar: frota_minima empacota só o tempo de coleta de cada ponto nos
+    turnos, o que ignora as viagens e dá um limite inferior da frota. Para
+    uma estimativa por fórmula em muitos cenários de uma vez, veja
+    dimensionamento.recursos_em_lote.
+    """
+    if aterro_id is None:
+        tempos = tempos_de_coleta(pontos, funcionarios_por_caminhao)
+        coletas = [Rota([p], lixo, 0, tempo_servico=float(tempos[p]))
+                   for p, lixo in enumerate(lixo_dos_pontos(pontos).tolist()) if lixo > 0]
+        dimensionamento = frota_minima(coletas, tempo_maximo)
+    else:
+        # Frota mínima verificada: viagens planejadas sobre o grafo e busca binária no número de caminhões
+        dimensionamento = dimensionar_frota(pontos, aterro_id, tempo_maximo, tabela, capacidade_caminhao,
+                                            funcionarios_por_caminhao)
+    caminhoes_necessarios = max(1, dimensionamento.caminhoes)
 
     funcionarios_necessarios = caminhoes_necessarios * funcionarios_por_caminhao
 
-    carrocinhas_necessarias = max(1, int(np.ceil(total_animais / capacidade_carrocinha)))
+    carrocinhas_necessarias = calcular_carrocinhas(pontos, capacidade_carrocinha)
 
     return int(caminhoes_necessarios), int(funcionarios_necessarios), int(carrocinhas_necessarias)
 
-def main():
-    with open("entrada.txt", "r") as f:
-        num_pontos = int(f.readline().strip())
-        
-        # Ler IDs do aterro e do centro de zoonoses
-        aterro_id = int(f.readline().strip())
-        zoonoses_id = int(f.readline().strip())
-
-        pontos = []
-
-        for i in range(num_pontos):
-            linha = f.readline().strip().split()
-            lixo = int(linha[0])
-            conexoes = []
-            for j in range(1, len(linha), 2):
-                conexoes.append((int(linha[j]), int(linha[j + 1])))
-            pontos.append(PontoDeColeta(i, lixo, conexoes))
-
-    for ponto in pontos:
-        ponto.atualizar_animais()
+def montar_simulacao(arquivo="entrada.txt", tempo_maximo=8 * 60, politica=None, semente=None):
+    """Lê a entrada, dimensiona a frota, planeja as viagens e devolve a SimulacaoColeta pronta para executar.
+
+    politica escolhe quando compactar e descarregar ao longo das viagens (veja
+    politicas.POLITICAS); sem ela, vale a regra de compactar ao encher. A mesma
+    semente (ou os mesmos Sorteios) reproduz a simulação exatamente.
+
+    O cache binário (.cache), a hierarquia de contração (.ch) e os perfis de
+    trânsito (.transito.npz) ficam ao lado da entrada.
+    """
+    # Leitura, hierarquia e trânsito só são necessários aqui: importá-los no topo atrasaria quem só dimensiona
+    from hierarquia import carregar_se_existir
+    from leitor import ler_entrada
+    import transito
+
+    base = os.path.splitext(arquivo)[0]
+    grafo, lixo, aterro_id, zoonoses_id = ler_entrada(arquivo, cache=base + ".cache")
+    pontos = criar_pontos(grafo, lixo)
+
+    sorteios = semente if isinstance(semente, Sorteios) else Sorteios(semente)
+    pontos.populacao.sortear(sorteios.animais)
+
+    # Distâncias compartilhadas pelo dimensionamento, pelo planejamento das viagens e pela simulação;
+    # a hierarquia de contração (python hierarquia.py entrada.txt) é usada se tiver sido gerada
+    tabela = TabelaDistancias(grafo, hierarquia=carregar_se_existir(base + ".ch", grafo))
+
+    # Viagens planejadas sobre as distâncias de caminho mínimo; cada caminhão recebe as viagens que o
+    # dimensionamento encaixou no turno dele
+    dimensionamento = dimensionar_frota(pontos, aterro_id, tempo_maximo, tabela)
+    if not dimensionamento.viavel:
+        maior = max(rota.duracao for rota in dimensionamento.inviaveis)
+        warnings.warn(f"{len(dimensionamento.inviaveis)} viagem(ns) não cabe(m) no turno de {tempo_maximo} min "
+                      f"(a mais longa leva {maior} min); cada uma segue num caminhão só dela.")
+
+    caminhoes = criar_caminhoes(max(1, dimensionamento.caminhoes), 10, 5)
+    
+    carrocinhas = criar_carrocinhas(calcular_carrocinhas(pontos), 5)
 
-    caminhoes_necessarios, funcionarios_necessarios, carrocinhas_necessarias = calcular_recursos_minimos_vias(pontos)
+    # Com perfis de trânsito (python transito.py entrada.txt), o dimensionamento e as viagens usam os custos
+    # fixos das ruas, e a simulação os tempos de cada horário
+    perfis = transito.carregar_se_existir(base + ".transito.npz", grafo)
+    if perfis is not None:
+        tabela = transito.TabelaTemporal(grafo, perfis)
 
-    caminhoes = [CaminhaoDeLixo(i, 10, funcionarios_necessarios // caminhoes_necessarios) for i in range(caminhoes_necessarios)]
-    
-    carrocinhas = [Carrocinha(i, 5) for i in range(carrocinhas_necessarias)]
+    return SimulacaoColeta(grafo, pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo, tabela,
+                           atribuicao=dimensionamento.atribuicao, rng=sorteios.movimento, politica=politica)
 
-    tempo_maximo = 8 * 60 
-    linha_do_tempo_global = executar_coleta_simultanea(pontos, caminhoes, carrocinhas, aterro_id, zoonoses_id, tempo_maximo)
+def main():
+    perfil.iniciar()
+    linha_do_tempo_global = montar_simulacao(semente=semente_do_ambiente()).executar()
 
     print("=== Linha do Tempo Global ===")
     for evento in linha_do_tempo_global:
         print(evento)
+    perfil.finalizar()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+import numpy as np
+from dimensionamento import frota_minima
+from distancias import TabelaDistancias
+from grafo import GrafoCSR
+from leitor import ler_entrada
+from main import SimulacaoColeta, calcular_carrocinhas, criar_caminhoes, criar_carrocinhas, criar_pontos, tempos_de_coleta
+from roteamento import Rota, planejar_rotas
+from sorteios import Sorteios, sementes_das_replicas
+
+PERCENTIS = (50, 95, 99)
+METRICAS = ("caminhoes", "funcionarios", "carrocinhas", "lixo_restante", "animais_restantes", "termino")
+FUNCIONARIOS_POR_CAMINHAO = 5
+
+# Estado de cada processo de trabalho: arrays do grafo e das viagens apontando para a memória compartilhada
+_grafo = None
+_lixo = None
+_rotas = None
+_aterro_id = None
+_zoonoses_id = None
+_tempo_maximo = None
+_tabela = None
+_memorias = []
+
+
+def _compartilhar(arrays):
+    """Copia os arrays para blocos de memória compartilhada e devolve (blocos, descritores)."""
+    blocos, descritores = [], []
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        bloco = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)[:] = array
+        blocos.append(bloco)
+        descritores.append((bloco.name, array.shape, array.dtype.str))
+    return blocos, descritores
+
+
+def _rotas_em_arrays(rotas):
+    """Viagens planejadas como arrays (pontos concatenados, início de cada viagem, custos, cargas)."""
+    inicios = np.zeros(len(rotas) + 1, dtype=np.int64)
+    np.cumsum([len(rota.pontos) for rota in rotas], out=inicios[1:])
+    pontos = np.fromiter((p for rota in rotas for p in rota.pontos), dtype=np.int64, count=inicios[-1])
+    cargas = np.fromiter((c for rota in rotas for c in rota.cargas), dtype=np.float64, count=inicios[-1])
+    custos = np.array([rota.custo_viagem for rota in rotas], dtype=np.float64)
+    return pontos, inicios, custos, cargas
+
+
+def _rotas_de_arrays(pontos, inicios, custos, cargas):
+    rotas = []
+    for r in range(len(custos)):
+        fatia = slice(inicios[r], inicios[r + 1])
+        rotas.append(Rota(pontos[fatia].tolist(), float(cargas[fatia].sum()), float(custos[r]),
+                          cargas=cargas[fatia].tolist()))
+    return rotas
+
+
+def _iniciar_processo(descritores, aterro_id, zoonoses_id, tempo_maximo):
+    """Conecta o processo aos arrays compartilhados (somente leitura, sem cópia)."""
+    global _grafo, _lixo, _rotas, _aterro_id, _zoonoses_id, _tempo_maximo, _tabela
+    arrays = []
+    for nome, forma, tipo in descritores:
+        bloco = shared_memory.SharedMemory(name=nome)
+        array = np.ndarray(forma, dtype=tipo, buffer=bloco.buf)
+        array.flags.writeable = False
+        _memorias.append(bloco)
+        arrays.append(array)
+    indptr, indices, pesos, _lixo = arrays[:4]
+    _grafo = GrafoCSR(indptr, indices, pesos)
+    _rotas = _rotas_de_arrays(*arrays[4:])  # Listas próprias do processo: não prendem a memória compartilhada
+    _aterro_id, _zoonoses_id, _tempo_maximo = aterro_id, zoonoses_id, tempo_maximo
+    _tabela = TabelaDistancias(_grafo)  # As distâncias não dependem da semente: valem para todas as réplicas
+    # Os processos do pool saem sem rodar atexit; os finalizadores do multiprocessing rodam
+    util.Finalize(None, _encerrar_processo, exitpriority=10)
+
+
+def _encerrar_processo():
+    """Solta os arrays que apontam para a memória compartilhada e fecha os blocos do processo."""
+    global _grafo, _lixo, _tabela
+    _grafo = _lixo = _tabela = None
+    gc.collect()  # Views presas em ciclos impediriam o close (BufferError)
+    while _memorias:
+        _memorias.pop().close()
+
+
+def simular_replica(semente):
+    """Uma réplica: sorteia os animais com a semente dada, dimensiona a frota para as viagens
+    compartilhadas e simula o turno com os sorteios da réplica; retorna uma linha de METRICAS."""
+    sorteios = Sorteios(semente)
+    pontos = criar_pontos(_grafo, _lixo)
+    pontos.populacao.sortear(sorteios.animais)
+
+    # As viagens são as mesmas em todas as réplicas; o tempo de coleta depende dos animais sorteados
+    servico = tempos_de_coleta(pontos, FUNCIONARIOS_POR_CAMINHAO)
+    rotas = [Rota(rota.pontos, rota.carga, rota.custo_viagem, float(servico[rota.pontos].sum()), rota.cargas)
+             for rota in _rotas]
+    dimensionamento = frota_minima(rotas, _tempo_maximo)
+    caminhoes = max(1, dimensionamento.caminhoes)
+    carrocinhas = calcular_carrocinhas(pontos)
+
+    simulacao = SimulacaoColeta(_grafo, pontos, criar_caminhoes(caminhoes, 10, FUNCIONARIOS_POR_CAMINHAO),
+                                criar_carrocinhas(carrocinhas, 5), _aterro_id, _zoonoses_id, _tempo_maximo, _tabela,
+                                atribuicao=dimensionamento.atribuicao, rng=sorteios.movimento)
+    simulacao.executar()
+    return (caminhoes, caminhoes * FUNCIONARIOS_POR_CAMINHAO, carrocinhas, float(pontos.lixo.sum()),
+            int(pontos.populacao.total().sum()), simulacao.tempo)
+
+
+def executar_lote(grafo, lixo, replicas, aterro_id, zoonoses_id, semente=0, processos=None, tempo_maximo=8 * 60):
+    """Executa réplicas independentes em paralelo e retorna um array (replicas, len(METRICAS)).
+
+    As colunas seguem METRICAS: recursos dimensionados, lixo e animais que
+    sobraram no fim do turno simulado e o instante do último evento. As
+    viagens são planejadas uma única vez aqui, com o tempo de coleta dobrado
+    em todos os pontos, para caberem no turno com qualquer sorteio de
+    animais. O grafo e as viagens vão uma única vez para a memória
+    compartilhada; cada tarefa recebe apenas a sua semente.
+    """
+    # Pior caso do tempo de coleta (tempos_de_coleta com animais em todos os pontos)
+    servico = 2 * np.ceil(np.asarray(lixo, dtype=np.float64) / FUNCIONARIOS_POR_CAMINHAO)
+    rotas = planejar_rotas(TabelaDistancias(grafo), aterro_id, lixo, 10, servico, tempo_maximo=tempo_maximo)
+
+    sementes = sementes_das_replicas(semente, replicas)
+    processos = processos or os.cpu_count() or 1
+    lote = max(1, replicas // (4 * processos))
+    blocos, descritores = _compartilhar((grafo.indptr, grafo.indices, grafo.pesos, lixo, *_rotas_em_arrays(rotas)))
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                                 initargs=(descritores, aterro_id, zoonoses_id, tempo_maximo)) as executor:
+            resultados = list(executor.map(simular_replica, sementes, chunksize=lote))
+    finally:
+        for bloco in blocos:
+            bloco.close()
+            bloco.unlink()
+    return np.array(resultados, dtype=np.float64).reshape(replicas, len(METRICAS))
+
+
+def tabela_percentis(resultados, percentis=PERCENTIS):
+    """Agrega os resultados em {metrica: {percentil: valor}}."""
+    valores = np.percentile(resultados, percentis, axis=0, method="higher")
+    return {metrica: {p: float(valores[i, j]) for i, p in enumerate(percentis)}
+            for j, metrica in enumerate(METRICAS)}
+
+
+def formatar_tabela(tabela):
+    percentis = list(next(iter(tabela.values())))
+    linhas = ["Métrica".ljust(18) + "".join(f"P{p}".rjust(8) for p in percentis)]
+    for metrica, valores in tabela.items():
+        linhas.append(metrica.ljust(18) + "".join(f"{valores[p]:g}".rjust(8) for p in percentis))
+    return "\n".join(linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dimensionamento de recursos e simulação do turno por Monte Carlo.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("-n", "--replicas", type=int, default=1000)
+    parser.add_argument("-j", "--processos", type=int, default=None)
+    parser.add_argument("-s", "--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    grafo, lixo, aterro_id, zoonoses_id = ler_entrada(args.entrada)
+    resultados = executar_lote(grafo, lixo, args.replicas, aterro_id, zoonoses_id, args.semente, args.processos)
+    print(f"=== {args.replicas} réplicas ===")
+    print(formatar_tabela(tabela_percentis(resultados)))
+
+
+if __name__ == "__main__":
+    main()
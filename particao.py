@@ -0,0 +1,157 @@
+import numpy as np
+from grafo import GrafoCSR
+
+
+def _vizinhos_de(grafo, pontos):
+    """Todos os vizinhos dos pontos dados, numa única operação sobre as fatias do CSR."""
+    inicio = grafo.indptr[pontos]
+    graus = grafo.indptr[pontos + 1] - inicio
+    deslocamento = np.arange(graus.sum()) - np.repeat(np.cumsum(graus) - graus, graus)
+    return grafo.indices[np.repeat(inicio, graus) + deslocamento]
+
+
+def _ordem_largura(grafo, inicio, ativo):
+    """Pontos ativos na ordem de uma busca em largura a partir de inicio, um nível por vez."""
+    visto = ~ativo
+    visto[inicio] = True
+    niveis = [np.array([inicio])]
+    while len(niveis[-1]):
+        vizinhos = _vizinhos_de(grafo, niveis[-1])
+        vizinhos = np.unique(vizinhos[~visto[vizinhos]])
+        visto[vizinhos] = True
+        niveis.append(vizinhos)
+    return np.concatenate(niveis)
+
+
+def _bissecar(grafo, pesos, zona, pontos, primeira, num_zonas):
+    """Divide os pontos em duas metades de peso proporcional ao número de zonas de cada uma.
+
+    Os pontos são ordenados por uma busca em largura a partir de um ponto
+    periférico (o último alcançado por uma busca anterior), e a ordem é
+    cortada onde o peso acumulado atinge a fração desejada: as duas metades
+    ficam equilibradas e tendem a ser compactas.
+    """
+    if num_zonas == 1:
+        zona[pontos] = primeira
+        return
+    ativo = np.zeros(grafo.num_pontos, dtype=bool)
+    ativo[pontos] = True
+    periferico = _ordem_largura(grafo, int(pontos[0]), ativo.copy())[-1]
+    ordem = _ordem_largura(grafo, int(periferico), ativo.copy())
+    if len(ordem) < len(pontos):
+        # Pontos sem caminho até o periférico (outros componentes) entram no fim
+        alcancados = np.zeros(grafo.num_pontos, dtype=bool)
+        alcancados[ordem] = True
+        ordem = np.concatenate([ordem, pontos[~alcancados[pontos]]])
+
+    metade = num_zonas // 2
+    acumulado = np.cumsum(pesos[ordem])
+    corte = int(np.searchsorted(acumulado, acumulado[-1] * metade / num_zonas)) + 1
+    corte = min(max(corte, metade), len(ordem) - (num_zonas - metade))
+    _bissecar(grafo, pesos, zona, ordem[:corte], primeira, metade)
+    _bissecar(grafo, pesos, zona, ordem[corte:], primeira + metade, num_zonas - metade)
+
+
+def _refinar(grafo, pesos, zona, carga, limite, passadas):
+    """Move pontos da borda para a zona vizinha com mais ligações, enquanto o corte diminuir.
+
+    É a parte gulosa do refinamento de Fiduccia-Mattheyses: só entram
+    movimentos de ganho positivo que mantêm cada zona abaixo do limite de
+    peso, e movimentos de ganho zero que aliviam a zona mais pesada.
+    """
+    indptr, indices = grafo.indptr, grafo.indices
+    origens = np.repeat(np.arange(grafo.num_pontos), np.diff(indptr))
+    for _ in range(passadas):
+        borda = np.unique(origens[zona[origens] != zona[indices]])
+        movidos = 0
+        for u in borda.tolist():
+            vizinhas = zona[indices[indptr[u]:indptr[u + 1]]]
+            contagem = np.bincount(vizinhas)
+            atual = int(zona[u])
+            internas = 0
+            if atual < len(contagem):
+                internas = contagem[atual]
+                contagem[atual] = -1
+            destino = int(np.argmax(contagem))
+            if contagem[destino] < internas or carga[destino] + pesos[u] > limite:
+                continue
+            if contagem[destino] == internas and carga[destino] + pesos[u] >= carga[atual]:
+                continue
+            zona[u] = destino
+            carga[atual] -= pesos[u]
+            carga[destino] += pesos[u]
+            movidos += 1
+        if not movidos:
+            break
+    return zona
+
+
+def particionar(grafo, pesos, num_zonas, tolerancia=0.05, passadas=8, semente=0):
+    """Divide os pontos em num_zonas zonas de peso equilibrado e com poucas arestas cortadas.
+
+    pesos costuma ser o lixo de cada ponto. As zonas saem de bisseções
+    recursivas em largura e depois passam por um refinamento guloso da
+    borda, que não leva nenhuma zona além de (1 + tolerancia) vezes o peso
+    médio. Retorna o array com a zona de cada ponto.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    if not pesos.any():
+        pesos = np.ones(grafo.num_pontos)  # Sem lixo, equilibra o número de pontos
+    num_zonas = max(1, min(num_zonas, grafo.num_pontos))
+    zona = np.zeros(grafo.num_pontos, dtype=np.int32)
+    if num_zonas == 1:
+        return zona
+    pontos = np.random.default_rng(semente).permutation(grafo.num_pontos)
+    _bissecar(grafo, pesos, zona, pontos, 0, num_zonas)
+    carga = np.bincount(zona, weights=pesos, minlength=num_zonas)
+    limite = max((1 + tolerancia) * pesos.sum() / num_zonas, carga.max())
+    return _refinar(grafo, pesos, zona, carga, limite, passadas)
+
+
+def arestas_cortadas(grafo, zona):
+    """Número de arestas (em um sentido) que ligam pontos de zonas diferentes."""
+    origens = np.repeat(np.arange(grafo.num_pontos), np.diff(grafo.indptr))
+    return int((zona[origens] != zona[grafo.indices]).sum())
+
+
+def subgrafo(grafo, pontos, ligacoes=()):
+    """Grafo induzido pelos pontos dados, renumerados de 0 a len(pontos) - 1.
+
+    Cada ligação (custos_ida, custos_volta) acrescenta um ponto virtual ao
+    final, ligado a todos os pontos: custos_ida[p] é o custo de p até o
+    ponto virtual e custos_volta[p] o do ponto virtual até p (arrays indexados
+    pelo id original; custos infinitos não viram arestas).
+    """
+    pontos = np.asarray(pontos, dtype=np.int64)
+    novo_id = np.full(grafo.num_pontos, -1, dtype=np.int64)
+    novo_id[pontos] = np.arange(len(pontos))
+
+    origens = np.repeat(np.arange(grafo.num_pontos), np.diff(grafo.indptr))
+    dentro = (novo_id[origens] >= 0) & (novo_id[grafo.indices] >= 0)
+    partes_o = [novo_id[origens[dentro]]]
+    partes_d = [novo_id[grafo.indices[dentro]]]
+    partes_p = [grafo.pesos[dentro]]
+
+    locais = np.arange(len(pontos))
+    for k, (ida, volta) in enumerate(ligacoes):
+        virtual = len(pontos) + k
+        ida, volta = np.asarray(ida)[pontos], np.asarray(volta)[pontos]
+        for de, para, custos in ((locais, virtual, ida), (virtual, locais, volta)):
+            finitos = np.isfinite(custos)
+            partes_o.append(np.broadcast_to(de, len(pontos))[finitos])
+            partes_d.append(np.broadcast_to(para, len(pontos))[finitos])
+            partes_p.append(custos[finitos])
+
+    return GrafoCSR.de_arestas(len(pontos) + len(ligacoes), np.concatenate(partes_o),
+                               np.concatenate(partes_d), np.concatenate(partes_p))
+
+
+def sem_pontos_virtuais(grafo, num_reais):
+    """O grafo sem as arestas que tocam os pontos virtuais (ids a partir de num_reais).
+
+    O número de pontos não muda, e os virtuais ficam isolados: sobram as ruas
+    da zona, por onde os animais andam, sem atalhos pelas instalações.
+    """
+    origens = np.repeat(np.arange(grafo.num_pontos), np.diff(grafo.indptr))
+    reais = (origens < num_reais) & (grafo.indices < num_reais)
+    return GrafoCSR.de_arestas(grafo.num_pontos, origens[reais], grafo.indices[reais], grafo.pesos[reais])
@@ -0,0 +1,108 @@
+import functools
+import os
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+
+def _opcoes(argv):
+    """Lê --perfil e --cprofile ARQUIVO (ou --cprofile=ARQUIVO) sem argparse, que todo módulo pagaria ao importar."""
+    opcoes = SimpleNamespace(perfil=False, cprofile=None)
+    for i, argumento in enumerate(argv):
+        if argumento == "--perfil":
+            opcoes.perfil = True
+        elif argumento == "--cprofile" and i + 1 < len(argv):
+            opcoes.cprofile = argv[i + 1]
+        elif argumento.startswith("--cprofile="):
+            opcoes.cprofile = argumento.split("=", 1)[1]
+    return opcoes
+
+
+# A instrumentação é decidida uma única vez, na importação, pela linha de comando
+# (--perfil, --cprofile ARQUIVO) ou pela variável de ambiente COLETA_PERFIL.
+# Desligada, fase() e contador() devolvem as próprias funções: o caminho quente
+# fica exatamente como sem este módulo.
+OPCOES = _opcoes(sys.argv[1:])
+ATIVO = bool(OPCOES.perfil or OPCOES.cprofile or os.environ.get("COLETA_PERFIL"))
+
+chamadas = defaultdict(int)
+tempos = defaultdict(float)
+contadores = defaultdict(int)
+_cprofile = None
+
+
+def fase(nome):
+    """Decorador que acumula chamadas e tempo da função sob o nome da fase (só com o perfil ativo)."""
+    def decorar(funcao):
+        if not ATIVO:
+            return funcao
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                tempos[nome] += time.perf_counter() - inicio
+                chamadas[nome] += 1
+        return medida
+    return decorar
+
+
+def contador(nome):
+    """Decorador que só conta as chamadas, para funções curtas demais para cronometrar."""
+    def decorar(funcao):
+        if not ATIVO:
+            return funcao
+
+        @functools.wraps(funcao)
+        def contada(*args, **kwargs):
+            contadores[nome] += 1
+            return funcao(*args, **kwargs)
+        return contada
+    return decorar
+
+
+def contar(nome, quantidade=1):
+    contadores[nome] += quantidade
+
+
+def iniciar():
+    """Começa a sessão de perfil do script (e o cProfile, se pedido)."""
+    global _cprofile
+    if OPCOES.cprofile:
+        import cProfile
+        _cprofile = cProfile.Profile()
+        _cprofile.enable()
+
+
+def finalizar(saida=sys.stderr):
+    """Encerra a sessão: grava o cProfile, se pedido, e imprime o resumo."""
+    global _cprofile
+    if _cprofile is not None:
+        _cprofile.disable()
+        _cprofile.dump_stats(OPCOES.cprofile)
+        _cprofile = None
+    if ATIVO:
+        print(relatorio(), file=saida)
+        if OPCOES.cprofile:
+            print(f"cProfile gravado em {OPCOES.cprofile} (python -m pstats {OPCOES.cprofile}).", file=saida)
+
+
+def relatorio():
+    """Resumo das fases (chamadas e tempo acumulado), dos contadores e do ritmo da simulação."""
+    linhas = ["=== Perfil ===", "Fase".ljust(28) + "Chamadas".rjust(10) + "Total (s)".rjust(12) + "Média (ms)".rjust(12)]
+    for nome in sorted(tempos, key=tempos.__getitem__, reverse=True):
+        media = 1000 * tempos[nome] / chamadas[nome]
+        linhas.append(nome.ljust(28) + str(chamadas[nome]).rjust(10) + f"{tempos[nome]:.4f}".rjust(12)
+                      + f"{media:.3f}".rjust(12))
+    if contadores:
+        linhas.append("")
+        linhas.append("Contador".ljust(28) + "Valor".rjust(10))
+        for nome in sorted(contadores):
+            linhas.append(nome.ljust(28) + str(contadores[nome]).rjust(10))
+    if contadores.get("tiques") and tempos.get("simulacao"):
+        linhas.append("")
+        linhas.append(f"Tiques por segundo: {contadores['tiques'] / tempos['simulacao']:.0f}")
+    return "\n".join(linhas)
@@ -0,0 +1,271 @@
+import argparse
+import numpy as np
+import perfil
+
+# Ação escolhida antes de seguir para cada parada da viagem
+SEGUIR, COMPACTAR, DESCARREGAR = range(3)
+
+TIPO_COMPARACAO = np.dtype([
+    ("politica", "U32"),
+    ("tempo", "f8"),  # Deslocamentos, compactações e idas ao aterro, somados em todas as viagens
+    ("idas_aterro", "i8"),  # Descargas, contando a do fim de cada viagem
+    ("compactacoes", "i8"),
+])
+
+_FOLGA = 1e-9
+
+
+class Viagem:
+    """Uma viagem planejada vista pela política: paradas, cargas e distâncias até o aterro.
+
+    deslocamentos[i] é o custo de chegar à parada i vindo da anterior (ou do
+    aterro, para a primeira); ida_aterro[i] e volta_aterro[i] são os custos da
+    parada i até o aterro mais próximo e do aterro mais próximo até ela.
+    """
+
+    def __init__(self, pontos, cargas, deslocamentos, ida_aterro, volta_aterro, capacidade=10,
+                 compactacoes=3, fator=1 / 3, tempo_compactacao=1):
+        self.pontos = list(pontos)
+        self.cargas = np.asarray(cargas, dtype=np.float64)
+        self.deslocamentos = np.asarray(deslocamentos, dtype=np.float64)
+        self.ida_aterro = np.asarray(ida_aterro, dtype=np.float64)
+        self.volta_aterro = np.asarray(volta_aterro, dtype=np.float64)
+        self.capacidade = capacidade
+        self.compactacoes = compactacoes
+        self.fator = fator
+        self.tempo_compactacao = tempo_compactacao
+
+    def __len__(self):
+        return len(self.pontos)
+
+    @classmethod
+    def de_rota(cls, rota, tabela, ida, volta, lixo=None, **parametros):
+        """Viagem de uma Rota; ida e volta são InstalacoesProximas dos aterros (chegada=True e False)."""
+        pontos = rota.pontos
+        cargas = rota.cargas if rota.cargas is not None else np.asarray(lixo, dtype=np.float64)[pontos]
+        deslocamentos = [volta.distancias[pontos[0]]] + [tabela.distancia(u, v) for u, v in zip(pontos, pontos[1:])]
+        return cls(pontos, cargas, deslocamentos, ida.distancias[pontos], volta.distancias[pontos], **parametros)
+
+
+class _Estado:
+    """Carga, compactações e custos acumulados do caminhão ao longo da viagem."""
+
+    __slots__ = ("volume", "compactacoes", "no_aterro", "tempo", "idas", "feitas")
+
+    def __init__(self):
+        self.volume = 0.0
+        self.compactacoes = 0
+        self.no_aterro = True  # A viagem começa no aterro
+        self.tempo = 0.0
+        self.idas = 0
+        self.feitas = 0
+
+    def copia(self):
+        novo = _Estado.__new__(_Estado)
+        for nome in _Estado.__slots__:
+            setattr(novo, nome, getattr(self, nome))
+        return novo
+
+
+def _compactar(estado, viagem):
+    estado.volume *= viagem.fator
+    estado.compactacoes += 1
+    estado.tempo += viagem.tempo_compactacao
+    estado.feitas += 1
+
+
+def _aplicar(estado, viagem, i, acao):
+    """Executa a ação escolhida antes da parada i; False se ela não é possível no estado."""
+    if acao == COMPACTAR:
+        if estado.compactacoes >= viagem.compactacoes or estado.volume <= 0:
+            return False
+        _compactar(estado, viagem)
+    elif acao == DESCARREGAR:
+        if estado.volume <= 0 or estado.no_aterro:
+            return False
+        estado.tempo += viagem.ida_aterro[i - 1]
+        estado.volume, estado.compactacoes, estado.no_aterro = 0.0, 0, True
+        estado.idas += 1
+    estado.tempo += viagem.volta_aterro[i] if estado.no_aterro else viagem.deslocamentos[i]
+    estado.no_aterro = False
+    return True
+
+
+def _servir(estado, viagem, i):
+    """Recolhe a parada i com a regra da simulação (SimulacaoColeta._proxima_acao).
+
+    Caminhão cheio compacta, se ainda pode, ou vai ao aterro; se sobrou lixo
+    no ponto, ele volta para terminar.
+    """
+    restante = viagem.cargas[i]
+    while True:
+        coletado = min(restante, max(0.0, viagem.capacidade - estado.volume))
+        estado.volume += coletado
+        restante -= coletado
+        if estado.volume >= viagem.capacidade - _FOLGA:
+            if estado.compactacoes < viagem.compactacoes:
+                _compactar(estado, viagem)
+            else:
+                estado.tempo += viagem.ida_aterro[i]
+                estado.volume, estado.compactacoes, estado.no_aterro = 0.0, 0, True
+                estado.idas += 1
+        if restante <= _FOLGA:
+            return
+        if estado.no_aterro:
+            estado.tempo += viagem.volta_aterro[i]
+            estado.no_aterro = False
+
+
+def _encerrar(estado, viagem):
+    """Ida ao aterro do fim da viagem, se o caminhão não terminou descarregando."""
+    if estado.volume > 0 and not estado.no_aterro:
+        estado.tempo += viagem.ida_aterro[-1]
+        estado.idas += 1
+
+
+def avaliar(viagem, acoes):
+    """Tempo, idas ao aterro e compactações da viagem com o plano de ações dado."""
+    estado = _Estado()
+    for i in range(len(viagem)):
+        if not _aplicar(estado, viagem, i, acoes[i]):
+            _aplicar(estado, viagem, i, SEGUIR)  # Ação impossível no estado: o caminhão só segue
+        _servir(estado, viagem, i)
+    _encerrar(estado, viagem)
+    return estado.tempo, estado.idas, estado.feitas
+
+
+def _por_regra(regra):
+    """Política que decide parada a parada pela regra(estado, viagem, i), sem olhar adiante."""
+    def politica(viagem):
+        estado = _Estado()
+        acoes = np.full(len(viagem), SEGUIR, dtype=np.int8)
+        for i in range(len(viagem)):
+            acao = regra(estado, viagem, i) if i else SEGUIR
+            if acao != SEGUIR and _aplicar(estado, viagem, i, acao):
+                acoes[i] = acao
+            else:
+                _aplicar(estado, viagem, i, SEGUIR)
+            _servir(estado, viagem, i)
+        return acoes
+    return politica
+
+
+@_por_regra
+def compactar_ao_encher(estado, viagem, i):
+    """Regra de main.py: nada antes das paradas; compacta quando enche, até três vezes, e então descarrega."""
+    return SEGUIR
+
+
+@_por_regra
+def compactar_antes_de_transbordar(estado, viagem, i):
+    """Regra de teste.py: compacta (ou, sem compactações, descarrega) se a próxima carga não couber."""
+    if estado.volume + viagem.cargas[i] <= viagem.capacidade:
+        return SEGUIR
+    return COMPACTAR if estado.compactacoes < viagem.compactacoes else DESCARREGAR
+
+
+def compactar_em_fracao(fracao=0.75):
+    """Regra de projeto.py: compacta sempre que a carga passa de uma fração da capacidade."""
+    @_por_regra
+    def regra(estado, viagem, i):
+        return COMPACTAR if estado.volume >= fracao * viagem.capacidade else SEGUIR
+    return regra
+
+
+@perfil.fase("politica_otima")
+def plano_otimo(viagem, max_rotulos=64):
+    """Plano de menor tempo por programação dinâmica sobre as paradas restantes.
+
+    Os estados de cada parada são agrupados por (compactações, no aterro) e,
+    em cada grupo, só ficam os rótulos não dominados em (tempo, volume): com
+    as mesmas compactações, um caminhão que chega mais tarde e mais cheio não
+    termina melhor. Cada grupo guarda no máximo max_rotulos rótulos, os de
+    menor tempo.
+    """
+    n = len(viagem)
+    # Rótulo: (tempo, idas, compactações feitas, volume, estado, ações até aqui)
+    rotulos = [(0.0, 0, 0, 0.0, _Estado(), ())]
+    for i in range(n):
+        grupos = {}
+        for _, _, _, _, estado, acoes in rotulos:
+            for acao in ((SEGUIR,) if i == 0 else (SEGUIR, COMPACTAR, DESCARREGAR)):
+                novo = estado.copia()
+                if not _aplicar(novo, viagem, i, acao):
+                    continue
+                _servir(novo, viagem, i)
+                rotulo = (novo.tempo, novo.idas, novo.feitas, novo.volume, novo, acoes + (acao,))
+                grupos.setdefault((novo.compactacoes, novo.no_aterro), []).append(rotulo)
+        rotulos = []
+        for grupo in grupos.values():
+            grupo.sort(key=lambda r: r[:4])
+            menor_volume = np.inf
+            mantidos = 0
+            for rotulo in grupo:
+                if rotulo[3] < menor_volume - _FOLGA and mantidos < max_rotulos:
+                    rotulos.append(rotulo)
+                    menor_volume = rotulo[3]
+                    mantidos += 1
+
+    def custo_final(rotulo):
+        estado = rotulo[4].copia()
+        _encerrar(estado, viagem)
+        return estado.tempo, estado.idas, estado.feitas
+
+    return np.array(min(rotulos, key=custo_final)[5], dtype=np.int8)
+
+
+POLITICAS = {
+    "ao_encher": compactar_ao_encher,
+    "antes_de_transbordar": compactar_antes_de_transbordar,
+    "fracao_75": compactar_em_fracao(0.75),
+    "otima": plano_otimo,
+}
+
+
+@perfil.fase("comparar_politicas")
+def comparar_politicas(viagens, politicas=None):
+    """Avalia cada política em todas as viagens; uma linha (TIPO_COMPARACAO) por política."""
+    politicas = POLITICAS if politicas is None else politicas
+    resultado = np.zeros(len(politicas), dtype=TIPO_COMPARACAO)
+    for linha, (nome, politica) in zip(resultado, politicas.items()):
+        linha["politica"] = nome
+        for viagem in viagens:
+            tempo, idas, compactacoes = avaliar(viagem, politica(viagem))
+            linha["tempo"] += tempo
+            linha["idas_aterro"] += idas
+            linha["compactacoes"] += compactacoes
+    return resultado
+
+
+def formatar_comparacao(resultado):
+    linhas = [f"{'Política':<24}{'Tempo (min)':>14}{'Idas ao aterro':>16}{'Compactações':>14}"]
+    for linha in resultado:
+        linhas.append(f"{linha['politica']:<24}{linha['tempo']:>14.1f}{linha['idas_aterro']:>16}"
+                      f"{linha['compactacoes']:>14}")
+    return "\n".join(linhas)
+
+
+def main():
+    from distancias import InstalacoesProximas, TabelaDistancias
+    from leitor import ler_entrada
+    from main import criar_pontos, tempos_de_coleta
+    from roteamento import planejar_rotas
+    parser = argparse.ArgumentParser(description="Compara políticas de compactação e descarga nas viagens planejadas.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("--capacidade", type=float, default=10)
+    parser.add_argument("--funcionarios", type=int, default=5)
+    parser.add_argument("--tempo-compactacao", type=float, default=1, help="minutos por compactação")
+    args = parser.parse_args()
+
+    grafo, lixo, aterro_id, _ = ler_entrada(args.entrada)
+    pontos = criar_pontos(grafo, lixo)
+    tabela = TabelaDistancias(grafo)
+    rotas = planejar_rotas(tabela, aterro_id, lixo, args.capacidade, tempos_de_coleta(pontos, args.funcionarios))
+    ida, volta = InstalacoesProximas(grafo, aterro_id), InstalacoesProximas(grafo, aterro_id, chegada=False)
+    viagens = [Viagem.de_rota(rota, tabela, ida, volta, capacidade=args.capacidade,
+                              tempo_compactacao=args.tempo_compactacao) for rota in rotas]
+    print(formatar_comparacao(comparar_politicas(viagens)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
-import random
-import networkx as nx
+from array import array
+import perfil
+
+# O grafo, as distâncias e as buscas usam NumPy; são importados só na primeira consulta,
+# para que importar este módulo (e criar pontos e caminhões) continue instantâneo.
 
 # ------------------- PontoColeta -------------------
 
 class PontoColeta:
-    def __init__(self, id):
+    __slots__ = ("id", "lixo", "animais", "vizinhos")  # Sem __dict__: milhões de pontos cabem na memória
+
+    def __init__(self, id, lixo, populacao=None):
         self.id = id
-        self.lixo = random.randint(15, 20)  # Lixo inicial (em metros cúbicos)
-        self.animais = {'ratos': 0, 'gatos': 0, 'cachorros': 0}  # Animais presentes no ponto
+        self.lixo = lixo  # Lixo inicial (em metros cúbicos), sorteado por quem cria o ponto (Sorteios.lixo)
+        # Animais presentes no ponto; com uma PopulacaoAnimais ficam nos arrays compartilhados
+        self.animais = populacao.visao(id) if populacao is not None else {'ratos': 0, 'gatos': 0, 'cachorros': 0}
         self.vizinhos = []  # Lista de conexões para outros pontos (arestas)
     
     def adicionar_animal(self, tipo):
@@ -36,45 +42,107 @@ class PontoColeta:
 # ------------------- GrafoBairro -------------------
 
 class GrafoBairro:
-    def __init__(self, num_pontos):
-        self.grafo = nx.Graph()  # Grafo não direcionado
-        self.pontos = [PontoColeta(i) for i in range(num_pontos)]  # Lista de pontos de coleta
-        for ponto in self.pontos:
-            self.grafo.add_node(ponto.id)  # Adicionando os pontos como nós no grafo
+    def __init__(self, num_pontos, distancias_completas=False, sorteios=None):
+        from animais import PopulacaoAnimais
+        from sorteios import Sorteios
+        self.sorteios = sorteios if sorteios is not None else Sorteios()  # Geradores do bairro, um por subsistema
+        self.populacao = PopulacaoAnimais(num_pontos)  # Animais de todos os pontos em arrays
+        lixo = self.sorteios.lixo.integers(15, 21, size=num_pontos).tolist()  # Lixo inicial sorteado em lote
+        self.pontos = [PontoColeta(i, lixo[i], self.populacao) for i in range(num_pontos)]  # Lista de pontos de coleta
+        # Arestas acumuladas em arrays compactos; o GrafoCSR é montado na primeira consulta
+        self._origens = array('i')
+        self._destinos = array('i')
+        self._custos = array('d')
+        self._grafo = None
+        self.distancias_completas = distancias_completas  # Calcula todas as origens de uma vez (grafos pequenos)
+        self._tabela = None  # Índice de distâncias, criado na primeira consulta
+        self._marcos = None  # Limites inferiores ALT, criados na primeira consulta ponto a ponto
     
     def adicionar_conexao(self, ponto1, ponto2, custo):
         """Adiciona uma conexão entre dois pontos de coleta com um custo"""
-        self.grafo.add_edge(ponto1, ponto2, weight=custo)  # Adiciona aresta entre ponto1 e ponto2
-    
+        if self._grafo is not None:
+            self._grafo.adicionar_aresta(ponto1, ponto2, custo)  # As distâncias guardadas são reparadas
+            return
+        self._origens.append(ponto1)
+        self._destinos.append(ponto2)
+        self._custos.append(custo)
+
+    def alterar_custo(self, ponto1, ponto2, custo):
+        """Muda o custo de uma conexão durante o turno (trânsito, obras)"""
+        self.grafo.atualizar_custo(ponto1, ponto2, custo)
+
+    def remover_conexao(self, ponto1, ponto2):
+        """Remove uma conexão (rua interditada)"""
+        self.grafo.remover_aresta(ponto1, ponto2)
+
+    @property
+    def grafo(self):
+        """Grafo não direcionado em formato CSR"""
+        if self._grafo is None:
+            from grafo import GrafoCSR
+            self._grafo = GrafoCSR.de_arestas(len(self.pontos), self._origens, self._destinos, self._custos, simetrico=True)
+        return self._grafo
+
+    @property
+    def tabela(self):
+        """Índice de distâncias compartilhado por todas as consultas de caminho"""
+        if self._tabela is None:
+            from distancias import TabelaDistancias
+            self._tabela = TabelaDistancias(self.grafo, completa=self.distancias_completas)
+        return self._tabela
+
+    @property
+    def marcos(self):
+        """Marcos (ALT) que guiam as consultas ponto a ponto"""
+        if self._marcos is None:
+            from busca import Marcos
+            self._marcos = Marcos(self.grafo)
+        return self._marcos
+
+    @perfil.fase("gerar_animais")
     def gerar_animais(self):
-        """Gera aleatoriamente os animais nos pontos de coleta com base nas interações de atração"""
-        for ponto in self.pontos:
-            if random.random() < 0.50:
-                ponto.adicionar_animal('ratos')
-            if random.random() < 0.25:
-                ponto.adicionar_animal('gatos')
-            if random.random() < 0.10:
-                ponto.adicionar_animal('cachorros')
-            
-            # Lógica de atração dos animais entre os pontos
-            if ponto.animais['ratos'] > 0:
-                if random.random() < 0.75:  # 75% de chance de ter gatos se houver ratos
-                    ponto.adicionar_animal('gatos')
-                if random.random() < 0.10:  # 10% de chance de ter cachorros se houver ratos
-                    ponto.adicionar_animal('cachorros')
-            if ponto.animais['gatos'] > 0 and random.random() < 0.75:  # 75% de chance de ter cachorros se houver gatos
-                ponto.adicionar_animal('cachorros')
-
-    def caminho_mais_curto(self, origem, destino):
-        """Calcula o caminho mais curto entre dois pontos usando o algoritmo de Dijkstra"""
-        caminho = nx.dijkstra_path(self.grafo, origem, destino, weight='weight')
-        custo = nx.dijkstra_path_length(self.grafo, origem, destino, weight='weight')
+        """Gera aleatoriamente os animais nos pontos de coleta com base nas interações de atração
+
+        Cada regra é um único sorteio em lote para todos os pontos.
+        """
+        populacao = self.populacao
+        sorteio = self.sorteios.animais.random((6, len(self.pontos)))
+        populacao.ratos += sorteio[0] < 0.50
+        populacao.gatos += sorteio[1] < 0.25
+        populacao.cachorros += sorteio[2] < 0.10
+
+        # Lógica de atração dos animais entre os pontos
+        com_ratos = populacao.ratos > 0
+        populacao.gatos += com_ratos & (sorteio[3] < 0.75)  # 75% de chance de ter gatos se houver ratos
+        populacao.cachorros += com_ratos & (sorteio[4] < 0.10)  # 10% de chance de ter cachorros se houver ratos
+        populacao.cachorros += (populacao.gatos > 0) & (sorteio[5] < 0.75)  # 75% de chance de ter cachorros se houver gatos
+
+    @perfil.fase("caminho_mais_curto")
+    def caminho_mais_curto(self, origem, destino, metodo="alt"):
+        """Calcula o caminho mais curto entre dois pontos e o seu custo numa única busca
+
+        metodo: "alt" (A* com marcos), "bidirecional" (Dijkstra nos dois sentidos)
+        ou "tabela" (árvore completa da origem, guardada para as próximas consultas).
+        """
+        from busca import caminho_alt, caminho_bidirecional
+        if metodo == "alt":
+            caminho, custo = caminho_alt(self.grafo, origem, destino, self.marcos)
+        elif metodo == "bidirecional":
+            caminho, custo = caminho_bidirecional(self.grafo, origem, destino)
+        elif metodo == "tabela":
+            caminho, custo = self.tabela.caminho(origem, destino), self.tabela.distancia(origem, destino)
+        else:
+            raise ValueError(f"Método de busca desconhecido: {metodo}.")
+        if not caminho:
+            raise ValueError(f"Não há caminho entre {origem} e {destino}.")
         return caminho, custo  # Retorna o caminho e o custo total
 
 
 # ------------------- Caminhao -------------------
 
 class Caminhao:
+    __slots__ = ("id", "funcionarios", "lixo_coletado", "lixo_nao_compactado", "capacidade_max", "compactacoes")
+
     def __init__(self, id, funcionarios):
         self.id = id
         self.funcionarios = funcionarios
@@ -115,13 +183,15 @@ class SistemaColeta:
         self.tempo_max = 1440  # Tempo máximo para a coleta (em minutos) ajustado para ser mais realista
         self.tempo_total = 0
 
+    @perfil.fase("alocar_caminhoes")
     def alocar_caminhoes(self):
         caminhões_alocados = 1
         total_lixo = sum([ponto.lixo for ponto in self.grafo.pontos])
         tempo_restante = self.tempo_max
         
-        # Inicializa o ciclo de coleta
-        while self.total_coletado < total_lixo and tempo_restante > 0:
+        # Inicializa o ciclo de coleta. total_coletado só conta caminhões cheios, então a última carga
+        # parcial nunca o faz chegar a total_lixo: sem pontos com lixo, o laço tem de parar por si.
+        while self.total_coletado < total_lixo and tempo_restante > 0 and any(ponto.lixo > 0 for ponto in self.grafo.pontos):
             caminhão = Caminhao(caminhões_alocados, 4)  # Alocando 4 funcionários por caminhão
             caminhões_alocados += 1
             self.caminhoes.append(caminhão)
@@ -170,28 +240,37 @@ class SistemaColeta:
 
 # ------------------- Execução -------------------
 
-# Configuração inicial do bairro e do sistema
-bairro = GrafoBairro(15)  # Reduzindo o número de pontos para evitar travamento
-bairro.adicionar_conexao(0, 1, 5)
-bairro.adicionar_conexao(1, 2, 3)
-bairro.adicionar_conexao(2, 3, 2)
-bairro.adicionar_conexao(3, 4, 4)
-bairro.adicionar_conexao(4, 5, 2)
-bairro.adicionar_conexao(5, 6, 4)
-bairro.adicionar_conexao(6, 7, 7)
-bairro.adicionar_conexao(7, 8, 8)
-bairro.adicionar_conexao(8, 9, 3)
-bairro.adicionar_conexao(9, 10, 6)
-bairro.adicionar_conexao(10, 11, 2)
-bairro.adicionar_conexao(11, 12, 5)
-bairro.adicionar_conexao(12, 13, 6)
-bairro.adicionar_conexao(13, 14, 3)
-
-bairro.gerar_animais()
-
-# Sistema de coleta de lixo
-sistema = SistemaColeta(bairro)
-caminhoes_alocados = sistema.alocar_caminhoes()
-
-print(f"\nCaminhões alocados para coleta: {caminhoes_alocados}")
-print(f"Tempo total de coleta: {sistema.tempo_total} minutos")
+def main():
+    perfil.iniciar()
+
+    # Configuração inicial do bairro e do sistema (COLETA_SEMENTE repete a mesma execução)
+    from sorteios import Sorteios, semente_do_ambiente
+    bairro = GrafoBairro(15, sorteios=Sorteios(semente_do_ambiente()))  # Reduzindo o número de pontos para evitar travamento
+    bairro.adicionar_conexao(0, 1, 5)
+    bairro.adicionar_conexao(1, 2, 3)
+    bairro.adicionar_conexao(2, 3, 2)
+    bairro.adicionar_conexao(3, 4, 4)
+    bairro.adicionar_conexao(4, 5, 2)
+    bairro.adicionar_conexao(5, 6, 4)
+    bairro.adicionar_conexao(6, 7, 7)
+    bairro.adicionar_conexao(7, 8, 8)
+    bairro.adicionar_conexao(8, 9, 3)
+    bairro.adicionar_conexao(9, 10, 6)
+    bairro.adicionar_conexao(10, 11, 2)
+    bairro.adicionar_conexao(11, 12, 5)
+    bairro.adicionar_conexao(12, 13, 6)
+    bairro.adicionar_conexao(13, 14, 3)
+
+    bairro.gerar_animais()
+
+    # Sistema de coleta de lixo
+    sistema = SistemaColeta(bairro)
+    caminhoes_alocados = sistema.alocar_caminhoes()
+
+    print(f"\nCaminhões alocados para coleta: {caminhoes_alocados}")
+    print(f"Tempo total de coleta: {sistema.tempo_total} minutos")
+    perfil.finalizar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import heapq
+from collections import OrderedDict
+import numpy as np
+from distancias import TabelaDistancias
+
+
+class _Fila:
+    """Carrocinhas com vaga ordenadas pela chegada a um ponto, com as distâncias até ele."""
+
+    __slots__ = ("distancias", "heap", "fora")
+
+    def __init__(self, distancias, heap, fora):
+        self.distancias = distancias  # Distância de cada ponto do grafo até o ponto da fila
+        self.heap = heap  # (chegada, carrocinha); a chegada guardada nunca passa da verdadeira
+        self.fora = fora  # Carrocinhas retiradas por estarem sem vaga
+
+
+class IndiceCarrocinhas:
+    """Escolhe a carrocinha com vaga que chega mais cedo a um ponto, em tempo logarítmico.
+
+    Para cada ponto com animais avistados há uma fila de prioridades das
+    carrocinhas com vaga, pela chegada max(agora, relógio) + distância até o
+    ponto. As distâncias vêm da árvore de caminhos mínimos do ponto no grafo
+    transposto (uma linha de TabelaDistancias, calculada uma vez por ponto).
+
+    A chegada de uma carrocinha a um ponto só aumenta: o relógio anda e, pela
+    desigualdade triangular, atender outro chamado antes nunca a deixa mais
+    perto. Por isso as filas não são atualizadas quando uma carrocinha muda:
+    a chegada guardada é um limite inferior, e só a do topo é conferida e
+    reinserida se tiver aumentado. Carrocinhas sem vaga saem das filas na
+    consulta e voltam em liberada(), depois de descarregar.
+
+    Guarda as filas dos max_pontos pontos consultados mais recentemente.
+    Mudanças no grafo descartam as filas e as distâncias. A escolha usa os
+    custos fixos das ruas, mesmo com uma TabelaTemporal.
+    """
+
+    def __init__(self, grafo, carrocinhas, max_pontos=4096):
+        self.grafo = grafo
+        self.carrocinhas = carrocinhas
+        self.max_pontos = max_pontos
+        self._posicao_na_lista = {c: i for i, c in enumerate(carrocinhas)}
+        self._chegadas = TabelaDistancias(grafo.transposto())
+        self._filas = OrderedDict()  # ponto -> _Fila
+        grafo.adicionar_observador(self)
+
+    def _estado(self):
+        """Posição, relógio e vagas de todas as carrocinhas, como arrays."""
+        frota = self.carrocinhas[0].armazem if len(self.carrocinhas) else None
+        if frota is not None and all(c.armazem is frota for c in self.carrocinhas):
+            linhas = np.fromiter((c.indice for c in self.carrocinhas), dtype=np.int64, count=len(self.carrocinhas))
+            vagas = frota.capacidade[linhas] - frota.animais[linhas] - frota.reservas[linhas]
+            return frota.posicao[linhas], frota.relogio[linhas], vagas
+        posicao = np.array([c.posicao for c in self.carrocinhas], dtype=np.int64)
+        relogio = np.array([c.relogio for c in self.carrocinhas], dtype=np.float64)
+        vagas = np.array([c.capacidade - c.animais - c.reservas for c in self.carrocinhas], dtype=np.int64)
+        return posicao, relogio, vagas
+
+    def _fila(self, ponto, tempo):
+        fila = self._filas.get(ponto)
+        if fila is not None:
+            self._filas.move_to_end(ponto)
+            return fila
+        distancias = self._chegadas.distancias(ponto)
+        posicao, relogio, vagas = self._estado()
+        com_vaga = vagas > 0
+        chegadas = np.maximum(tempo, relogio) + distancias[posicao]
+        candidatas = np.flatnonzero(com_vaga)
+        heap = list(zip(chegadas[candidatas].tolist(), candidatas.tolist()))
+        heapq.heapify(heap)
+        fila = self._filas[ponto] = _Fila(distancias, heap, set(np.flatnonzero(~com_vaga).tolist()))
+        if len(self._filas) > self.max_pontos:
+            self._filas.popitem(last=False)
+        return fila
+
+    def mais_proxima(self, ponto, tempo):
+        """Carrocinha com vaga que chega primeiro ao ponto saindo no instante tempo (None se não houver)."""
+        fila = self._fila(ponto, tempo)
+        heap = fila.heap
+        while heap:
+            guardada, i = heap[0]
+            carrocinha = self.carrocinhas[i]
+            if carrocinha.animais + carrocinha.reservas >= carrocinha.capacidade:
+                heapq.heappop(heap)
+                fila.fora.add(i)
+                continue
+            chegada = max(tempo, carrocinha.relogio) + float(fila.distancias[carrocinha.posicao])
+            if chegada > guardada:
+                heapq.heapreplace(heap, (chegada, i))
+                continue
+            return carrocinha if np.isfinite(chegada) else None
+        return None
+
+    def liberada(self, carrocinha, tempo):
+        """Devolve às filas a carrocinha que voltou a ter vaga (depois de descarregar no abrigo)."""
+        i = self._posicao_na_lista[carrocinha]
+        for fila in self._filas.values():
+            if i in fila.fora:
+                fila.fora.discard(i)
+                chegada = max(tempo, carrocinha.relogio) + float(fila.distancias[carrocinha.posicao])
+                heapq.heappush(fila.heap, (chegada, i))
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """Descarta as filas e as árvores; elas são refeitas nas próximas consultas."""
+        # O grafo transposto não avisa os seus observadores, então as linhas são refeitas, e não reparadas
+        self._chegadas = TabelaDistancias(self.grafo.transposto())
+        self._filas.clear()
@@ -0,0 +1,156 @@
+import numpy as np
+import perfil
+from animais import ESPECIES
+
+# Um registro por evento: números em campos fixos, sem texto.
+TIPO_REGISTRO = np.dtype([
+    ("tempo", "f8"),
+    ("tipo", "u1"),
+    ("especie", "i1"),  # Índice em ESPECIES (-1 quando não se aplica)
+    ("veiculo", "i4"),
+    ("ponto", "i4"),
+    ("destino", "i4"),
+    ("valor", "f8"),
+    ("valor2", "f8"),
+])
+
+
+def _numero(x):
+    """Números inteiros aparecem sem casa decimal no texto, como nas f-strings originais."""
+    x = float(x)
+    return int(x) if x.is_integer() else x
+
+
+class RegistroEventos:
+    """Linha do tempo guardada como registros compactos num array estruturado pré-alocado.
+
+    O texto de cada evento só é montado quando alguém lê a linha do tempo
+    (iteração ou linhas()), a partir de modelos {tipo: "texto com {campos}"}.
+    Com anel=True apenas os últimos `capacidade` eventos ficam na memória.
+    Com saida, os blocos cheios são gravados no arquivo (.jsonl ou binário)
+    e a memória usada fica limitada a um bloco.
+    """
+
+    def __init__(self, modelos, capacidade=1024, anel=False, saida=None):
+        if capacidade < 1:
+            raise ValueError(f"Capacidade do registro precisa ser ao menos 1, não {capacidade}.")
+        self.modelos = modelos
+        self.anel = anel
+        self._dados = np.zeros(capacidade, dtype=TIPO_REGISTRO)
+        self._tamanho = 0
+        self._inicio = 0  # Posição do evento mais antigo quando o anel deu a volta
+        self.total = 0  # Eventos registrados desde a criação (inclusive os já gravados ou descartados)
+        self._saida = None
+        self._jsonl = False
+        if saida is not None:
+            self._jsonl = str(saida).endswith(".jsonl")
+            self._saida = open(saida, "w" if self._jsonl else "wb")
+
+    @classmethod
+    def de_eventos(cls, modelos, eventos, total=None):
+        """Registro com eventos já prontos (array TIPO_REGISTRO), sem copiá-los: um memmap continua mapeado.
+
+        total conta também os eventos que não estão no array (já gravados ou
+        descartados); sem ele, vale o número de eventos. Registrar mais
+        eventos depois copia o array para um buffer maior.
+        """
+        registro = cls(modelos)
+        registro._dados = eventos
+        registro._tamanho = len(eventos)
+        registro.total = len(eventos) if total is None else int(total)
+        return registro
+
+    def _reservar(self, quantidade):
+        """Garante espaço para mais `quantidade` eventos e devolve a posição de escrita."""
+        if self._tamanho + quantidade > len(self._dados) and self._saida is not None:
+            self.descarregar()
+        if self._tamanho + quantidade > len(self._dados):
+            nova = max(2 * len(self._dados), self._tamanho + quantidade)
+            self._dados = np.resize(self._dados, nova)
+        return self._tamanho
+
+    def registrar(self, tempo, tipo, veiculo=-1, ponto=-1, destino=-1, valor=0.0, valor2=0.0, especie=-1):
+        if self.anel and self._saida is None and self._tamanho == len(self._dados):
+            posicao = self._inicio
+            self._inicio = (self._inicio + 1) % len(self._dados)
+        else:
+            posicao = self._reservar(1)
+            self._tamanho += 1
+        self._dados[posicao] = (tempo, tipo, especie, veiculo, ponto, destino, valor, valor2)
+        self.total += 1
+
+    def registrar_lote(self, tempo, tipo, pontos, destinos=None, veiculo=-1, valor=0.0):
+        """Registra um evento por elemento de pontos (e destinos), sem laço em Python."""
+        quantidade = len(pontos)
+        if not quantidade:
+            return
+        if self.anel and self._saida is None:
+            # No anel, um lote grande só precisa dos seus últimos eventos.
+            for i in range(max(0, quantidade - len(self._dados)), quantidade):
+                self.registrar(tempo, tipo, veiculo, pontos[i], -1 if destinos is None else destinos[i], valor)
+            return
+        posicao = self._reservar(quantidade)
+        bloco = self._dados[posicao:posicao + quantidade]
+        bloco["tempo"] = tempo
+        bloco["tipo"] = tipo
+        bloco["especie"] = -1
+        bloco["veiculo"] = veiculo
+        bloco["ponto"] = pontos
+        bloco["destino"] = -1 if destinos is None else destinos
+        bloco["valor"] = valor
+        bloco["valor2"] = 0.0
+        self._tamanho += quantidade
+        self.total += quantidade
+
+    def eventos(self):
+        """Eventos em memória, do mais antigo ao mais recente, como array estruturado."""
+        if self._inicio:
+            return np.concatenate([self._dados[self._inicio:self._tamanho], self._dados[:self._inicio]])
+        return self._dados[:self._tamanho]
+
+    @perfil.fase("renderizar_eventos")
+    def renderizar(self, evento):
+        especie = int(evento["especie"])
+        return self.modelos[int(evento["tipo"])].format(
+            tempo=_numero(round(float(evento["tempo"]), 2)),  # Tempos de viagem dependentes do horário são fracionários
+            veiculo=int(evento["veiculo"]),
+            ponto=int(evento["ponto"]),
+            destino=int(evento["destino"]),
+            valor=_numero(evento["valor"]),
+            valor2=_numero(evento["valor2"]),
+            especie=ESPECIES[especie] if especie >= 0 else "",
+        )
+
+    def linhas(self):
+        """Texto de cada evento em memória, montado só agora."""
+        return [self.renderizar(evento) for evento in self.eventos()]
+
+    def __iter__(self):
+        return (self.renderizar(evento) for evento in self.eventos())
+
+    def __len__(self):
+        return self._tamanho
+
+    def descarregar(self):
+        """Grava os eventos em memória na saída e esvazia o buffer."""
+        eventos = self.eventos()
+        if self._jsonl:
+            import json  # Só a saída .jsonl precisa dele
+            nomes = TIPO_REGISTRO.names
+            for evento in eventos.tolist():
+                self._saida.write(json.dumps(dict(zip(nomes, evento))) + "\n")
+        else:
+            eventos.tofile(self._saida)
+        self._tamanho = 0
+        self._inicio = 0
+
+    def fechar(self):
+        if self._saida is not None:
+            self.descarregar()
+            self._saida.close()
+            self._saida = None
+
+
+def ler_registro(caminho, modelos):
+    """Abre um registro gravado em binário (sem copiar: memmap) para renderizar ou analisar."""
+    return RegistroEventos.de_eventos(modelos, np.memmap(caminho, dtype=TIPO_REGISTRO, mode="r"))
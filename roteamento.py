@@ -0,0 +1,276 @@
+from array import array
+import numpy as np
+import perfil
+from distancias import InstalacoesProximas, como_ids
+from grafo import BuscasLocais
+
+
+class Rota:
+    """Uma viagem de caminhão: sai do depósito, visita os pontos em ordem e volta."""
+
+    def __init__(self, pontos, carga, custo_viagem, tempo_servico=0, cargas=None):
+        self.pontos = pontos  # Ids dos pontos, sem o depósito
+        self.carga = carga  # Lixo recolhido na viagem (antes da compactação)
+        self.cargas = cargas  # Lixo recolhido em cada ponto, se conhecido
+        self.custo_viagem = custo_viagem
+        self.tempo_servico = tempo_servico  # Tempo parado coletando nos pontos
+
+    @property
+    def duracao(self):
+        return self.custo_viagem + self.tempo_servico
+
+    def __repr__(self):
+        return f"Rota({self.pontos}, carga={self.carga}, duracao={self.duracao})"
+
+
+def capacidade_efetiva(capacidade, compactacoes=3, fator=1 / 3):
+    """Lixo bruto que cabe numa viagem: enche, compacta, enche de novo... até a última compactação."""
+    return capacidade * (1 + compactacoes * (1 - fator))
+
+
+def _custo(rota, D, conhecida=None):
+    caminho = [0] + rota + [0]
+    if conhecida is not None and not conhecida[caminho[:-1], caminho[1:]].all():
+        return np.inf
+    return float(D[caminho[:-1], caminho[1:]].sum())
+
+
+def _economias(buscas, reversas, clientes, saida, chegada, vizinhos_candidatos):
+    """Pares (i, j, D[i, j]) ordenados pela economia de Clarke-Wright chegada[i] + saida[j] - D[i, j].
+
+    i e j são índices em clientes; o par une uma rota que termina em i a outra
+    que começa em j. Só entram os vizinhos_candidatos clientes mais próximos
+    de cada um, nos dois sentidos, achados por Dijkstras que param ao
+    encontrá-los: nem matriz densa nem busca completa por cliente. Sem
+    reversas (grafo simétrico), cada par achado vale também ao contrário.
+    Retorna três arrays (i, j, D[i, j]), só com as economias positivas.
+    """
+    indice = {p: c for c, p in enumerate(clientes)}
+    alvos = set(clientes)
+    k = min(vizinhos_candidatos, len(clientes) - 1)
+    # Arrays compactos: em bairros grandes são dezenas de milhões de pares
+    origens, destinos, custos = array("q"), array("q"), array("d")
+    for c, p in enumerate(clientes):
+        idas = buscas.ate(p, alvos, k)  # p -> q
+        voltas = idas if reversas is None else reversas.ate(p, alvos, k)  # q -> p, pelo grafo transposto
+        for achados, de_p in ((idas, True), (voltas, False)):
+            vizinhos = [indice[q] for q, _ in achados]
+            mesmos = [c] * len(achados)
+            origens.extend(mesmos if de_p else vizinhos)
+            destinos.extend(vizinhos if de_p else mesmos)
+            custos.extend(custo for _, custo in achados)
+    i, j = np.frombuffer(origens, dtype=np.int64), np.frombuffer(destinos, dtype=np.int64)
+    custos = np.frombuffer(custos, dtype=np.float64)
+    # Pares achados pelos dois lados aparecem duas vezes; basta um.
+    _, unicos = np.unique(i * len(clientes) + j, return_index=True)
+    i, j, custos = i[unicos], j[unicos], custos[unicos]
+    economia = chegada[i] + saida[j] - custos
+    ordem = np.argsort(-economia, kind="stable")
+    ordem = ordem[economia[ordem] > 0]
+    return i[ordem], j[ordem], custos[ordem]
+
+
+def _em_blocos(*colunas, tamanho=1 << 16):
+    """Percorre arrays paralelos linha a linha, convertendo para listas um bloco por vez."""
+    for inicio in range(0, len(colunas[0]), tamanho):
+        yield from zip(*(coluna[inicio:inicio + tamanho].tolist() for coluna in colunas))
+
+
+def _clarke_wright(pares, saida, chegada, demanda, servico, capacidade, tempo_maximo):
+    """Heurística das economias (versão paralela) com limites de capacidade e de duração da viagem.
+
+    Uma rota que termina em i só é unida a outra que começa em j, sem inverter
+    nenhuma delas, o que vale também para ruas de mão única. Retorna as rotas
+    (listas de índices) e o custo de viagem de cada uma.
+    """
+    m = len(demanda)
+    rotas = {c: [c] for c in range(m)}
+    rota_de = list(range(m))
+    carga = {c: demanda[c] for c in range(m)}
+    custo = {c: saida[c] + chegada[c] for c in range(m)}
+    parado = {c: servico[c] for c in range(m)}
+
+    for i, j, custo_ij in _em_blocos(*pares):
+        ri, rj = rota_de[i], rota_de[j]
+        if ri == rj or rotas[ri][-1] != i or rotas[rj][0] != j:
+            continue
+        if carga[ri] + carga[rj] > capacidade:
+            continue
+        novo_custo = custo[ri] + custo[rj] - chegada[i] - saida[j] + custo_ij
+        if tempo_maximo is not None and novo_custo + parado[ri] + parado[rj] > tempo_maximo:
+            continue
+        b = rotas.pop(rj)
+        rotas[ri].extend(b)
+        carga[ri] += carga.pop(rj)
+        parado[ri] += parado.pop(rj)
+        custo[ri] = novo_custo
+        del custo[rj]
+        for c in b:
+            rota_de[c] = ri
+
+    return [(rota, custo[r]) for r, rota in rotas.items()]
+
+
+def _pares_por_rota(rotas, pares, m):
+    """Separa, por rota, os pares candidatos (i, j, D[i, j]) com os dois pontos nela."""
+    membro = np.full(m, -1)
+    for r, (rota, _) in enumerate(rotas):
+        membro[rota] = r
+    i, j, custos = pares
+    dentro = np.flatnonzero(membro[i] == membro[j])
+    dentro = dentro[np.argsort(membro[i[dentro]], kind="stable")]
+    limites = np.searchsorted(membro[i[dentro]], np.arange(len(rotas) + 1))
+    return [(i[dentro[a:b]], j[dentro[a:b]], custos[dentro[a:b]]) for a, b in zip(limites[:-1], limites[1:])]
+
+
+def _matriz_local(rota, pares, saida, chegada):
+    """Distâncias entre os pontos de uma rota, com o depósito na posição 0, e quais delas são conhecidas.
+
+    Entre os pontos só se conhecem os pares candidatos já achados pelas
+    economias. Os demais recebem a volta pelo depósito, chegada[i] + saida[j],
+    que limita a distância por cima: a busca local troca só arestas curtas.
+    """
+    m = len(rota) + 1
+    D = np.zeros((m, m))
+    D[0, 1:] = saida
+    D[1:, 0] = chegada
+    D[1:, 1:] = chegada[:, None] + saida[None, :]
+    conhecida = np.zeros((m, m), dtype=bool)
+    conhecida[0, :] = conhecida[:, 0] = True
+    np.fill_diagonal(conhecida, True)
+    posicao = np.zeros(max(rota) + 1, dtype=np.int64)
+    posicao[rota] = np.arange(1, m)
+    i, j, custos = pares
+    D[posicao[i], posicao[j]] = custos
+    conhecida[posicao[i], posicao[j]] = True
+    return D, conhecida
+
+
+def _inversao(trecho, D):
+    """Quanto o custo interno do trecho muda ao percorrê-lo ao contrário (zero com custos simétricos)."""
+    return float(D[trecho[1:], trecho[:-1]].sum() - D[trecho[:-1], trecho[1:]].sum())
+
+
+def _dois_opt(rota, D):
+    """Inverte trechos da rota enquanto isso diminuir o custo, contando a volta de cada rua invertida."""
+    caminho = [0] + rota + [0]
+    melhorou = True
+    while melhorou:
+        melhorou = False
+        for i in range(1, len(caminho) - 2):
+            interno = 0.0  # _inversao(caminho[i:j + 1], D), acumulada a cada j
+            for j in range(i + 1, len(caminho) - 1):
+                a, b, c, d = caminho[i - 1], caminho[i], caminho[j], caminho[j + 1]
+                interno += D[c, caminho[j - 1]] - D[caminho[j - 1], c]
+                if D[a, c] + D[b, d] - D[a, b] - D[c, d] + interno < -1e-9:
+                    caminho[i:j + 1] = caminho[i:j + 1][::-1]
+                    interno = -interno
+                    melhorou = True
+    return caminho[1:-1]
+
+
+def _or_opt(rota, D, tamanho_maximo=3):
+    """Move trechos de 1 a tamanho_maximo pontos para outra posição da rota (nos dois sentidos).
+
+    Um trecho reinserido ao contrário paga a diferença das ruas percorridas
+    na volta: cada movimento aceito baixa o custo real, também com mão única.
+    """
+    caminho = [0] + rota + [0]
+    melhorou = True
+    while melhorou:
+        melhorou = False
+        for tamanho in range(1, tamanho_maximo + 1):
+            for i in range(1, len(caminho) - tamanho):
+                trecho = caminho[i:i + tamanho]
+                antes, depois = caminho[i - 1], caminho[i + tamanho]
+                ganho_retirada = D[antes, trecho[0]] + D[trecho[-1], depois] - D[antes, depois]
+                resto = caminho[:i] + caminho[i + tamanho:]
+                sentidos = ((trecho, 0.0), (trecho[::-1], _inversao(trecho, D)))
+                melhor = None
+                for k in range(len(resto) - 1):
+                    if k == i - 1:
+                        continue
+                    p, q = resto[k], resto[k + 1]
+                    for orientado, interno in sentidos:
+                        custo_insercao = D[p, orientado[0]] + D[orientado[-1], q] - D[p, q] + interno
+                        if custo_insercao < ganho_retirada - 1e-9 and (melhor is None or custo_insercao < melhor[0]):
+                            melhor = (custo_insercao, k, orientado)
+                if melhor is not None:
+                    _, k, orientado = melhor
+                    caminho = resto[:k + 1] + list(orientado) + resto[k + 1:]
+                    melhorou = True
+                    break
+            if melhorou:
+                break
+    return caminho[1:-1]
+
+
+@perfil.fase("planejar_rotas")
+def planejar_rotas(tabela, deposito, lixo, capacidade, tempos_servico=None, compactacoes=3,
+                   vizinhos_candidatos=40, tempo_maximo=None):
+    """Monta as viagens dos caminhões (CVRP) saindo e voltando ao depósito (aterro).
+
+    deposito pode ser um id ou vários aterros. Com vários, cada viagem sai do
+    aterro mais próximo do seu primeiro ponto e descarrega no mais próximo do
+    último. As rotas são construídas pela heurística das economias de
+    Clarke-Wright, sobre os vizinhos_candidatos clientes mais próximos de cada
+    um, e melhoradas com 2-opt e or-opt. Cada viagem respeita a capacidade do
+    caminhão contando as compactações e, com tempo_maximo, dura no máximo isso
+    (deslocamentos mais coleta); pontos com mais lixo que uma viagem recebem
+    viagens exclusivas para o excedente. Uma viagem de um único ponto pode
+    passar de tempo_maximo se o ponto estiver longe demais do aterro.
+    """
+    lixo = np.asarray(lixo, dtype=np.float64)
+    if tempos_servico is None:
+        tempos_servico = np.zeros(len(lixo))
+    limite = capacidade_efetiva(capacidade, compactacoes)
+
+    grafo = tabela.grafo
+    depositos = como_ids(deposito)
+    saida = InstalacoesProximas(grafo, depositos, chegada=False).distancias
+    chegada = InstalacoesProximas(grafo, depositos).distancias
+    clientes = [p for p in np.flatnonzero(lixo > 0).tolist()
+                if p not in depositos and np.isfinite(saida[p]) and np.isfinite(chegada[p])]
+    rotas = []
+
+    # Viagens exclusivas para o lixo que não cabe numa viagem compartilhada
+    demanda = np.empty(len(clientes))
+    for c, p in enumerate(clientes):
+        cheias, resto = divmod(lixo[p], limite)
+        ida_e_volta = float(saida[p] + chegada[p])
+        for _ in range(int(cheias) - (resto == 0)):
+            rotas.append(Rota([p], limite, ida_e_volta, cargas=[limite]))
+        demanda[c] = resto if resto > 0 else limite
+
+    buscas = BuscasLocais(grafo)
+    saida_c, chegada_c = saida[clientes], chegada[clientes]
+    servico_c = np.asarray(tempos_servico, dtype=np.float64)[clientes]
+    reversas = None if grafo.simetrico() else BuscasLocais(grafo.transposto())
+    pares = _economias(buscas, reversas, clientes, saida_c, chegada_c, vizinhos_candidatos)
+
+    construidas = _clarke_wright(pares, saida_c, chegada_c, demanda, servico_c, limite, tempo_maximo)
+    for (rota, custo), pares_rota in zip(construidas, _pares_por_rota(construidas, pares, len(clientes))):
+        if len(rota) > 1:
+            D, conhecida = _matriz_local(rota, pares_rota, saida_c[rota], chegada_c[rota])
+            melhorada = _or_opt(_dois_opt(list(range(1, len(rota) + 1)), D), D)
+            # Só valem rotas cujos trechos têm distância conhecida, e não apenas o limite pelo depósito
+            novo_custo = _custo(melhorada, D, conhecida)
+            if novo_custo < custo - 1e-9:
+                rota, custo = [rota[c - 1] for c in melhorada], novo_custo
+        rotas.append(Rota([clientes[c] for c in rota], float(demanda[rota].sum()), float(custo),
+                          cargas=demanda[rota].tolist()))
+
+    for rota in rotas:
+        rota.tempo_servico = float(sum(tempos_servico[p] for p in rota.pontos))
+    return rotas
+
+
+def distribuir_rotas(rotas, num_caminhoes):
+    """Reparte as viagens entre os caminhões: a mais longa vai para o caminhão menos ocupado."""
+    viagens = [[] for _ in range(num_caminhoes)]
+    ocupacao = [0.0] * num_caminhoes
+    for rota in sorted(rotas, key=lambda r: r.duracao, reverse=True):
+        caminhao = min(range(num_caminhoes), key=ocupacao.__getitem__)
+        viagens[caminhao].append(rota)
+        ocupacao[caminhao] += rota.duracao
+    return viagens
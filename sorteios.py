@@ -0,0 +1,38 @@
+import os
+import numpy as np
+
+# Um fluxo de números aleatórios por subsistema: sortear mais ou menos num deles não muda os outros
+SUBSISTEMAS = ("animais", "movimento", "lixo", "frota")
+
+
+class Sorteios:
+    """Geradores de uma simulação, um por subsistema, todos derivados de uma única semente.
+
+    animais sorteia a presença inicial dos animais; movimento, os vizinhos para
+    onde eles fogem; lixo, o lixo inicial e o espalhado; frota, os funcionários
+    de cada caminhão. A mesma semente reproduz a simulação bit a bit, e
+    semente=None sorteia uma semente nova.
+    """
+
+    def __init__(self, semente=None):
+        if isinstance(semente, np.random.SeedSequence):
+            # spawn avança o contador da sequência recebida: uma cópia deixa a do chamador intacta,
+            # e a mesma SeedSequence passada de novo produz os mesmos geradores
+            semente = np.random.SeedSequence(semente.entropy, spawn_key=semente.spawn_key,
+                                             pool_size=semente.pool_size)
+        else:
+            semente = np.random.SeedSequence(semente)
+        self.semente = semente
+        for nome, filha in zip(SUBSISTEMAS, semente.spawn(len(SUBSISTEMAS))):
+            setattr(self, nome, np.random.default_rng(filha))
+
+
+def sementes_das_replicas(semente, quantidade):
+    """Sementes independentes para réplicas paralelas: cada uma vira os Sorteios de uma réplica."""
+    return np.random.SeedSequence(semente).spawn(quantidade)
+
+
+def semente_do_ambiente():
+    """Semente da variável de ambiente COLETA_SEMENTE, para repetir uma execução dos scripts (None sem ela)."""
+    valor = os.environ.get("COLETA_SEMENTE")
+    return int(valor) if valor else None
@@ -1,223 +1,230 @@
-import random
-import numpy as np
-import heapq  # Para Dijkstra
-
-
-class PontoDeColeta:
-    def __init__(self, id, latas, conexoes):
-        self.id = id
-        self.latas = latas  # Número de latas cheias de lixo
-        self.conexoes = conexoes  # [(vizinho, custo), ...]
-        self.animais = {"ratos": 0, "gatos": 0, "cachorros": 0}
-
-    def atualizar_animais(self):
-        self.animais["ratos"] = random.random() < 0.5
-        self.animais["gatos"] = random.random() < 0.25
-        self.animais["cachorros"] = random.random() < 0.1
-
-    def mover_animais(self, pontos):
-        """Realiza a movimentação dos animais entre os pontos de coleta."""
-        if sum(self.animais.values()) > 0:
-            print(f"\n=== Movimentação de Animais no Ponto {self.id} ===")
-
-        # Caso haja ao menos um gato, os ratos fogem
-        if self.animais["gatos"] > 0 and self.animais["ratos"] > 0:
-            ratos_fugindo = self.animais["ratos"]
-            self.animais["ratos"] = 0
-            self._redistribuir_animais("ratos", ratos_fugindo, pontos)
-            print(f"{ratos_fugindo} ratos fugiram para os pontos vizinhos devido à presença de gatos.")
-
-        # Caso haja ao menos um cachorro, os gatos fogem
-        if self.animais["cachorros"] > 0 and self.animais["gatos"] > 0:
-            gatos_fugindo = self.animais["gatos"]
-            self.animais["gatos"] = 0
-            self._redistribuir_animais("gatos", gatos_fugindo, pontos)
-            print(f"{gatos_fugindo} gatos fugiram para os pontos vizinhos devido à presença de cachorros.")
-
-        # Caso haja os três animais, os gatos e ratos fogem
-        if self.animais["ratos"] > 0 and self.animais["gatos"] > 0 and self.animais["cachorros"] > 0:
-            ratos_fugindo = self.animais["ratos"]
-            gatos_fugindo = self.animais["gatos"]
-            self.animais["ratos"] = 0
-            self.animais["gatos"] = 0
-            self._redistribuir_animais("ratos", ratos_fugindo, pontos)
-            self._redistribuir_animais("gatos", gatos_fugindo, pontos)
-            print(f"Gatos ({gatos_fugindo}) e ratos ({ratos_fugindo}) fugiram devido à presença de cachorros.")
-
-        # Caso o ponto não tenha lixo, todos os animais migram
-        if self.latas == 0:
-            for animal, quantidade in self.animais.items():
-                if quantidade > 0:
-                    self._redistribuir_animais(animal, quantidade, pontos)
-                    print(f"Animais ({animal}) saíram devido à falta de lixo.")
-            self.animais = {"ratos": 0, "gatos": 0, "cachorros": 0}
-
-    def _redistribuir_animais(self, animal, quantidade, pontos):
-        """Redistribui os animais para pontos vizinhos."""
-        for vizinho, _ in self.conexoes:
-            if quantidade <= 0:
-                break
-            pontos[vizinho].animais[animal] += 1
-            quantidade -= 1
-
-    def espalhar_lixo(self):
-        """Aumenta a quantidade de lixo devido ao espalhamento pelos animais."""
-        if sum(self.animais.values()) > 0:
-            print(f"Ponto {self.id} - Animais espalharam o lixo!")
-            self.latas += random.randint(1, 3)  # Aumenta o lixo devido ao espalhamento
-
-class CaminhaoDeLixo:
-    def __init__(self, id, capacidade, funcionarios):
-        self.id = id
-        self.capacidade = capacidade
-        self.funcionarios = funcionarios
-        self.volume_atual = 0
-        self.compactacoes = 0
-        self.linha_do_tempo = []
-
-    def coletar(self, ponto, tempo_atual):
-        if ponto.latas == 0:
-            return 0
-
-        lixo_a_coletar = ponto.latas * 0.1  # Cada lata representa 0.1 m³ de lixo
-        tempo_base = int(np.ceil(lixo_a_coletar / self.funcionarios))
-
-        if sum(ponto.animais.values()) == 1:  # Apenas um tipo de animal
-            lixo_a_coletar *= 1.5  # Lixo espalhado aumenta o volume
-            tempo_base *= 2  # Dobra o tempo
-
-        if self.volume_atual + lixo_a_coletar > self.capacidade:
-            self.compactar(tempo_atual)
-            if self.volume_atual + lixo_a_coletar > self.capacidade:
-                self.descarregar(tempo_atual)
-
-        coletado = min(lixo_a_coletar, self.capacidade - self.volume_atual)
-        self.volume_atual += coletado
-        ponto.latas -= int(coletado / 0.1)
-
-        self.linha_do_tempo.append(
-            f"[{tempo_atual} min] Caminhão {self.id}: Coletou {coletado:.2f} m³ de lixo no ponto {ponto.id}. "
-            f"Volume atual: {self.volume_atual:.2f} m³."
-        )
-        return tempo_base
-
-    def compactar(self, tempo_atual):
-        if self.compactacoes < 3:
-            self.volume_atual *= (1 / 3)
-            self.compactacoes += 1
-            self.linha_do_tempo.append(
-                f"[{tempo_atual} min] Caminhão {self.id}: Compactação realizada ({self.compactacoes}/3)."
-            )
-
-    def descarregar(self, tempo_atual):
-        self.linha_do_tempo.append(
-            f"[{tempo_atual} min] Caminhão {self.id}: Descarregou no aterro. Volume descarregado: {self.volume_atual:.2f} m³."
-        )
-        self.volume_atual = 0
-        self.compactacoes = 0
-
-
-class Carrocinha:
-    def __init__(self, id, capacidade):
-        self.id = id
-        self.capacidade = capacidade
-        self.animais = 0
-        self.linha_do_tempo = []
-
-    def recolher_animal(self, animal, ponto_id, tempo_atual):
-        if self.animais < self.capacidade:
-            self.animais += 1
-            self.linha_do_tempo.append(
-                f"[{tempo_atual} min] Carrocinha {self.id}: Recolheu um {animal} no ponto {ponto_id}. "
-                f"Total de animais: {self.animais}."
-            )
-
-    def descarregar(self, tempo_atual):
-        self.linha_do_tempo.append(
-            f"[{tempo_atual} min] Carrocinha {self.id}: Descarregou {self.animais} animais no abrigo."
-        )
-        self.animais = 0
-
-
-def dijkstra(pontos, origem):
-    dist = {ponto.id: float('inf') for ponto in pontos}
-    dist[origem] = 0
-    pq = [(0, origem)]  # (distancia, ponto_id)
-    
-    while pq:
-        distancia_atual, ponto_id = heapq.heappop(pq)
-        
-        if distancia_atual > dist[ponto_id]:
-            continue
-        
-        for vizinho, custo in pontos[ponto_id].conexoes:
-            nova_distancia = distancia_atual + custo
-            if nova_distancia < dist[vizinho]:
-                dist[vizinho] = nova_distancia
-                heapq.heappush(pq, (nova_distancia, vizinho))
-
-    return dist
-
-
-def executar_coleta(pontos, caminhoes, carrocinhas, tempo_maximo):
-    tempo_atual = 0
-    caminhões_em_uso = caminhoes.copy()
-
-    distancias = {ponto.id: dijkstra(pontos, ponto.id) for ponto in pontos}
-
-    while tempo_atual < tempo_maximo:
-        if all(ponto.latas == 0 for ponto in pontos):
-            print("Todos os pontos estão limpos. Finalizando...")
-            break
-
-        for caminhao in caminhões_em_uso:
-            for ponto in pontos:
-                if ponto.latas > 0:
-                    tempo_atual += caminhao.coletar(ponto, tempo_atual)
-
-        if any(caminhao.volume_atual >= caminhao.capacidade for caminhao in caminhões_em_uso):
-            caminhões_em_uso.append(CaminhaoDeLixo(len(caminhões_em_uso), 10, random.randint(3, 5)))
-            print("Novo caminhão alocado para coleta!")
-
-        for carrocinha in carrocinhas:
-            for ponto in pontos:
-                for animal, presente in ponto.animais.items():
-                    if presente and animal in ["gatos", "cachorros"]:
-                        carrocinha.recolher_animal(animal, ponto.id, tempo_atual)
-
-        for ponto in pontos:
-            ponto.mover_animais(pontos)
-            ponto.espalhar_lixo()
-
-
-def main():
-    with open("entrada.txt", "r") as f:
-        num_pontos = int(f.readline().strip())
-        pontos = []
-        for i in range(num_pontos):
-            linha = f.readline().strip().split()
-            latas = int(linha[0])
-            conexoes = [(int(linha[j]), int(linha[j + 1])) for j in range(1, len(linha), 2)]
-            pontos.append(PontoDeColeta(i, latas, conexoes))
-
-    for ponto in pontos:
-        ponto.atualizar_animais()
-
-    caminhoes = [CaminhaoDeLixo(i, 10, random.randint(3, 5)) for i in range(3)]
-    carrocinhas = [Carrocinha(i, 5) for i in range(2)]
-
-    executar_coleta(pontos, caminhoes, carrocinhas, 8 * 60)
-
-    for caminhao in caminhoes:
-        print(f"=== Linha do Tempo do Caminhão {caminhao.id} ===")
-        for evento in caminhao.linha_do_tempo:
-            print(evento)
-
-    for carrocinha in carrocinhas:
-        print(f"=== Linha do Tempo da Carrocinha {carrocinha.id} ===")
-        for evento in carrocinha.linha_do_tempo:
-            print(evento)
-
-
-if __name__ == "__main__":
+import math
+import perfil
+from animais import ESPECIES, PopulacaoAnimais
+from leitor import ler_entrada
+from registro import RegistroEventos
+from sorteios import Sorteios, semente_do_ambiente
+
+# Tipos de evento das linhas do tempo de cada veículo e o texto de cada um
+EV_COLETA, EV_COMPACTACAO, EV_DESCARGA_ATERRO, EV_RECOLHA, EV_DESCARGA_ABRIGO = range(5)
+
+MODELOS_EVENTOS = {
+    EV_COLETA: "[{tempo} min] Caminhão {veiculo}: Coletou {valor:.2f} m³ de lixo no ponto {ponto}. "
+               "Volume atual: {valor2:.2f} m³.",
+    EV_COMPACTACAO: "[{tempo} min] Caminhão {veiculo}: Compactação realizada ({valor}/3).",
+    EV_DESCARGA_ATERRO: "[{tempo} min] Caminhão {veiculo}: Descarregou no aterro. Volume descarregado: {valor:.2f} m³.",
+    EV_RECOLHA: "[{tempo} min] Carrocinha {veiculo}: Recolheu um {especie} no ponto {ponto}. Total de animais: {valor}.",
+    EV_DESCARGA_ABRIGO: "[{tempo} min] Carrocinha {veiculo}: Descarregou {valor} animais no abrigo.",
+}
+
+
+class PontoDeColeta:
+    __slots__ = ("id", "latas", "grafo", "populacao")  # Sem __dict__, como as entidades de main.py e projeto.py
+
+    def __init__(self, id, latas, grafo, populacao):
+        self.id = id
+        self.latas = latas  # Número de latas cheias de lixo
+        self.grafo = grafo  # Conexões guardadas no GrafoCSR compartilhado
+        self.populacao = populacao  # Animais guardados nos arrays da PopulacaoAnimais
+
+    @property
+    def conexoes(self):
+        return self.grafo.vizinhos(self.id)  # [(vizinho, custo), ...]
+
+    @property
+    def animais(self):
+        return self.populacao.visao(self.id)
+
+    @animais.setter
+    def animais(self, valores):
+        self.animais.update(valores)
+
+    def atualizar_animais(self, rng=None):
+        self.populacao.sortear(rng, [self.id])
+
+    @perfil.fase("mover_animais")
+    def mover_animais(self, pontos):
+        """Realiza a movimentação dos animais entre os pontos de coleta."""
+        if sum(self.animais.values()) > 0:
+            print(f"\n=== Movimentação de Animais no Ponto {self.id} ===")
+
+        # Caso haja ao menos um gato, os ratos fogem
+        if self.animais["gatos"] > 0 and self.animais["ratos"] > 0:
+            ratos_fugindo = self.animais["ratos"]
+            self.animais["ratos"] = 0
+            self._redistribuir_animais("ratos", ratos_fugindo, pontos)
+            print(f"{ratos_fugindo} ratos fugiram para os pontos vizinhos devido à presença de gatos.")
+
+        # Caso haja ao menos um cachorro, os gatos fogem
+        if self.animais["cachorros"] > 0 and self.animais["gatos"] > 0:
+            gatos_fugindo = self.animais["gatos"]
+            self.animais["gatos"] = 0
+            self._redistribuir_animais("gatos", gatos_fugindo, pontos)
+            print(f"{gatos_fugindo} gatos fugiram para os pontos vizinhos devido à presença de cachorros.")
+
+        # Caso haja os três animais, os gatos e ratos fogem
+        if self.animais["ratos"] > 0 and self.animais["gatos"] > 0 and self.animais["cachorros"] > 0:
+            ratos_fugindo = self.animais["ratos"]
+            gatos_fugindo = self.animais["gatos"]
+            self.animais["ratos"] = 0
+            self.animais["gatos"] = 0
+            self._redistribuir_animais("ratos", ratos_fugindo, pontos)
+            self._redistribuir_animais("gatos", gatos_fugindo, pontos)
+            print(f"Gatos ({gatos_fugindo}) e ratos ({ratos_fugindo}) fugiram devido à presença de cachorros.")
+
+        # Caso o ponto não tenha lixo, todos os animais migram
+        if self.latas == 0:
+            for animal, quantidade in self.animais.items():
+                if quantidade > 0:
+                    self._redistribuir_animais(animal, quantidade, pontos)
+                    print(f"Animais ({animal}) saíram devido à falta de lixo.")
+            self.animais = {"ratos": 0, "gatos": 0, "cachorros": 0}
+
+    def _redistribuir_animais(self, animal, quantidade, pontos):
+        """Redistribui os animais para pontos vizinhos."""
+        inicio, fim = self.grafo.indptr[self.id], self.grafo.indptr[self.id + 1]
+        for vizinho in self.grafo.indices[inicio:fim].tolist():
+            if quantidade <= 0:
+                break
+            pontos[vizinho].animais[animal] += 1
+            quantidade -= 1
+
+class CaminhaoDeLixo:
+    __slots__ = ("id", "capacidade", "funcionarios", "volume_atual", "compactacoes", "linha_do_tempo")
+
+    def __init__(self, id, capacidade, funcionarios):
+        self.id = id
+        self.capacidade = capacidade
+        self.funcionarios = funcionarios
+        self.volume_atual = 0
+        self.compactacoes = 0
+        self.linha_do_tempo = RegistroEventos(MODELOS_EVENTOS, capacidade=64)
+
+    @perfil.fase("coletar")
+    def coletar(self, ponto, tempo_atual):
+        if ponto.latas == 0:
+            return 0
+
+        lixo_a_coletar = ponto.latas * 0.1  # Cada lata representa 0.1 m³ de lixo
+        tempo_base = math.ceil(lixo_a_coletar / self.funcionarios)
+
+        if sum(ponto.animais.values()) == 1:  # Apenas um tipo de animal
+            lixo_a_coletar *= 1.5  # Lixo espalhado aumenta o volume
+            tempo_base *= 2  # Dobra o tempo
+
+        if self.volume_atual + lixo_a_coletar > self.capacidade:
+            self.compactar(tempo_atual)
+            if self.volume_atual + lixo_a_coletar > self.capacidade:
+                self.descarregar(tempo_atual)
+
+        coletado = min(lixo_a_coletar, self.capacidade - self.volume_atual)
+        self.volume_atual += coletado
+        ponto.latas -= int(coletado / 0.1)
+
+        self.linha_do_tempo.registrar(tempo_atual, EV_COLETA, self.id, ponto.id, valor=coletado, valor2=self.volume_atual)
+        return tempo_base
+
+    def compactar(self, tempo_atual):
+        if self.compactacoes < 3:
+            self.volume_atual *= (1 / 3)
+            self.compactacoes += 1
+            self.linha_do_tempo.registrar(tempo_atual, EV_COMPACTACAO, self.id, valor=self.compactacoes)
+
+    def descarregar(self, tempo_atual):
+        self.linha_do_tempo.registrar(tempo_atual, EV_DESCARGA_ATERRO, self.id, valor=self.volume_atual)
+        self.volume_atual = 0
+        self.compactacoes = 0
+
+
+class Carrocinha:
+    __slots__ = ("id", "capacidade", "animais", "linha_do_tempo")
+
+    def __init__(self, id, capacidade):
+        self.id = id
+        self.capacidade = capacidade
+        self.animais = 0
+        self.linha_do_tempo = RegistroEventos(MODELOS_EVENTOS, capacidade=64)
+
+    def recolher_animal(self, animal, ponto_id, tempo_atual):
+        if self.animais < self.capacidade:
+            self.animais += 1
+            self.linha_do_tempo.registrar(tempo_atual, EV_RECOLHA, self.id, ponto_id, valor=self.animais,
+                                          especie=ESPECIES.index(animal))
+
+    def descarregar(self, tempo_atual):
+        self.linha_do_tempo.registrar(tempo_atual, EV_DESCARGA_ABRIGO, self.id, valor=self.animais)
+        self.animais = 0
+
+
+@perfil.fase("espalhar_lixo")
+def espalhar_lixo(pontos, rng=None):
+    """Aumenta o lixo dos pontos onde há animais, que o espalham: um único sorteio para todos os pontos."""
+    afetados, acrescimos = pontos[0].populacao.espalhar_lixo(rng)
+    for ponto_id, acrescimo in zip(afetados.tolist(), acrescimos.tolist()):
+        print(f"Ponto {ponto_id} - Animais espalharam o lixo!")
+        pontos[ponto_id].latas += acrescimo
+
+
+@perfil.fase("simulacao")
+def executar_coleta(grafo, pontos, caminhoes, carrocinhas, tempo_maximo, sorteios=None):
+    sorteios = sorteios if sorteios is not None else Sorteios()
+    tempo_atual = 0
+    caminhões_em_uso = caminhoes.copy()
+
+    while tempo_atual < tempo_maximo:
+        if perfil.ATIVO:
+            perfil.contar("tiques")
+        if all(ponto.latas == 0 for ponto in pontos):
+            print("Todos os pontos estão limpos. Finalizando...")
+            break
+
+        for caminhao in caminhões_em_uso:
+            for ponto in pontos:
+                if ponto.latas > 0:
+                    tempo_atual += caminhao.coletar(ponto, tempo_atual)
+
+        if any(caminhao.volume_atual >= caminhao.capacidade for caminhao in caminhões_em_uso):
+            caminhões_em_uso.append(CaminhaoDeLixo(len(caminhões_em_uso), 10, int(sorteios.frota.integers(3, 6))))
+            print("Novo caminhão alocado para coleta!")
+
+        for carrocinha in carrocinhas:
+            for ponto in pontos:
+                for animal, presente in ponto.animais.items():
+                    if presente and animal in ["gatos", "cachorros"]:
+                        carrocinha.recolher_animal(animal, ponto.id, tempo_atual)
+
+        for ponto in pontos:
+            ponto.mover_animais(pontos)
+        espalhar_lixo(pontos, sorteios.lixo)
+
+
+def main():
+    perfil.iniciar()
+    grafo, latas, _, _ = ler_entrada("entrada.txt", instalacoes=False, exigir_bidirecional=False)
+    populacao = PopulacaoAnimais(grafo.num_pontos)
+    pontos = [PontoDeColeta(i, int(latas[i]), grafo, populacao) for i in range(grafo.num_pontos)]
+
+    # COLETA_SEMENTE repete a mesma execução
+    sorteios = Sorteios(semente_do_ambiente())
+    populacao.sortear(sorteios.animais)
+
+    funcionarios = sorteios.frota.integers(3, 6, size=3).tolist()
+    caminhoes = [CaminhaoDeLixo(i, 10, funcionarios[i]) for i in range(3)]
+    carrocinhas = [Carrocinha(i, 5) for i in range(2)]
+
+    executar_coleta(grafo, pontos, caminhoes, carrocinhas, 8 * 60, sorteios)
+
+    for caminhao in caminhoes:
+        print(f"=== Linha do Tempo do Caminhão {caminhao.id} ===")
+        for evento in caminhao.linha_do_tempo:
+            print(evento)
+
+    for carrocinha in carrocinhas:
+        print(f"=== Linha do Tempo da Carrocinha {carrocinha.id} ===")
+        for evento in carrocinha.linha_do_tempo:
+            print(evento)
+    perfil.finalizar()
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
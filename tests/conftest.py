@@ -0,0 +1,25 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório, sem pacote
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grafo import GrafoCSR  # noqa: E402
+
+
+def _grafo_aleatorio(num_pontos, num_arestas, semente, simetrico=False):
+    """Grafo dirigido com custos inteiros pequenos (empates de propósito) e um ciclo que liga todos."""
+    rng = np.random.default_rng(semente)
+    ciclo = np.arange(num_pontos)
+    origens = np.concatenate([ciclo, rng.integers(num_pontos, size=num_arestas)])
+    destinos = np.concatenate([np.roll(ciclo, -1), rng.integers(num_pontos, size=num_arestas)])
+    pesos = rng.integers(1, 10, size=len(origens)).astype(float)
+    laco = origens == destinos
+    return GrafoCSR.de_arestas(num_pontos, origens[~laco], destinos[~laco], pesos[~laco], simetrico)
+
+
+@pytest.fixture
+def grafo_aleatorio():
+    return _grafo_aleatorio
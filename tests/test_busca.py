@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from busca import Marcos, caminho_alt, caminho_bidirecional
+from grafo import GrafoCSR, dijkstra
+
+
+def custo_do_caminho(grafo, caminho):
+    return sum(grafo.custo(a, b) for a, b in zip(caminho, caminho[1:]))
+
+
+def conferir(grafo, marcos, pares):
+    for origem, destino in pares:
+        esperado = dijkstra(grafo, origem)[destino]
+        for caminho, custo in (caminho_bidirecional(grafo, origem, destino),
+                               caminho_alt(grafo, origem, destino, marcos)):
+            assert custo == esperado
+            if np.isfinite(esperado):
+                assert caminho[0] == origem and caminho[-1] == destino
+                assert custo_do_caminho(grafo, caminho) == esperado
+            else:
+                assert caminho == []
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_consultas_iguais_a_dijkstra(grafo_aleatorio, semente):
+    grafo = grafo_aleatorio(60, 90, semente)
+    marcos = Marcos(grafo, quantidade=4, semente=semente)
+    rng = np.random.default_rng(semente)
+    pares = rng.integers(grafo.num_pontos, size=(25, 2)).tolist()
+    conferir(grafo, marcos, pares)
+
+    # Custos menores invalidariam os limites antigos: os marcos precisam ser refeitos
+    for _ in range(10):
+        u = int(rng.integers(grafo.num_pontos))
+        v = int(grafo.indices[grafo.indptr[u]])
+        grafo.atualizar_custo(u, v, 0.5, simetrico=False)
+    conferir(grafo, marcos, pares)
+
+
+def test_sem_caminho():
+    grafo = GrafoCSR.de_arestas(4, [0, 2], [1, 3], [1.0, 1.0])
+    conferir(grafo, Marcos(grafo, quantidade=2), [(0, 3), (1, 0), (0, 1), (2, 2)])
@@ -0,0 +1,34 @@
+import numpy as np
+from despacho import ServicoDespacho
+from grafo import GrafoCSR
+from main import ArmazemCaminhoes, ArmazemCarrocinhas, criar_pontos
+
+
+def servico(lixo, caminhoes=1):
+    # Ponto 0 entre o aterro (1) e as zoonoses (2)
+    grafo = GrafoCSR.de_arestas(3, [0, 0], [1, 2], [5.0, 5.0], True)
+    return ServicoDespacho(grafo, criar_pontos(grafo, lixo), ArmazemCaminhoes(caminhoes, 10, 4),
+                           ArmazemCarrocinhas(1, 5), 1, 2)
+
+
+def test_ponto_com_mais_de_uma_carga_volta_para_a_espera():
+    despacho = servico([0, 0, 0])
+    despacho.processar_lote([{"ponto": 0, "minuto": 0, "lixo": 25}])
+    assert despacho.pontos.lixo[0] == 15
+    assert list(despacho.aguardando_coleta) == [0]
+
+    # Minutos depois, com o caminhão livre de novo, a espera é atendida até o ponto esvaziar
+    for minuto in range(100, 1000, 100):
+        despacho.processar_lote([{"ponto": 1, "minuto": minuto}])
+    assert despacho.pontos.lixo[0] <= 0
+    assert list(despacho.aguardando_coleta) == []
+    assert not despacho._na_espera[0]
+
+
+def test_dois_caminhoes_dividem_o_ponto():
+    despacho = servico([0, 0, 0], caminhoes=2)
+    despacho.processar_lote([{"ponto": 0, "minuto": 0, "lixo": 18}])
+    assert despacho.pontos.lixo[0] <= 0
+    assert despacho.coletas == 2
+    assert list(despacho.aguardando_coleta) == []
+    assert np.all(despacho.caminhoes.volume_atual <= 10)
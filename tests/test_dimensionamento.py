@@ -0,0 +1,76 @@
+import itertools
+import numpy as np
+import pytest
+from dimensionamento import _limite_inferior, _primeiro_encaixe, frota_minima
+from grafo import GrafoCSR
+from main import calcular_recursos_minimos_vias, criar_pontos
+from roteamento import Rota
+
+
+def rotas_com_duracoes(duracoes):
+    return [Rota([i], 1, float(d)) for i, d in enumerate(duracoes)]
+
+
+def frota_por_forca_bruta(duracoes, limite):
+    for k in range(1, len(duracoes) + 1):
+        for caminhoes in itertools.product(range(k), repeat=len(duracoes)):
+            if max(np.bincount(caminhoes, weights=duracoes, minlength=k)) <= limite:
+                return k
+
+
+def conferir_atribuicao(resultado, rotas, limite):
+    entregues = sorted(id(rota) for caminhao in resultado.atribuicao for rota in caminhao)
+    assert entregues == sorted(id(rota) for rota in rotas)
+    assert len(resultado.atribuicao) == resultado.caminhoes
+    for caminhao in resultado.atribuicao:
+        assert len(caminhao) == 1 or sum(rota.duracao for rota in caminhao) <= limite
+
+
+def test_busca_exata_melhora_o_first_fit():
+    duracoes = [5, 4, 3, 3, 3, 2]
+    assert len(_primeiro_encaixe(duracoes, len(duracoes), 10)) == 3
+    rotas = rotas_com_duracoes(duracoes)
+    resultado = frota_minima(rotas, 10)
+    assert resultado.caminhoes == 2 and resultado.exato and resultado.viavel
+    conferir_atribuicao(resultado, rotas, 10)
+
+
+@pytest.mark.parametrize("semente", range(40))
+def test_frota_minima_igual_a_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    duracoes = rng.integers(1, 10, size=rng.integers(1, 8)).astype(float)
+    rotas = rotas_com_duracoes(duracoes)
+    resultado = frota_minima(rotas, 10)
+    otimo = frota_por_forca_bruta(duracoes, 10)
+    assert _limite_inferior(duracoes, 10) <= otimo
+    assert resultado.exato and resultado.caminhoes == otimo
+    conferir_atribuicao(resultado, rotas, 10)
+
+
+def test_viagem_mais_longa_que_o_turno_nao_interrompe():
+    rotas = rotas_com_duracoes([12, 6, 4, 3])
+    resultado = frota_minima(rotas, 10)
+    assert not resultado.viavel
+    assert [rota.duracao for rota in resultado.inviaveis] == [12]
+    assert resultado.caminhoes == 3  # Uma para a viagem longa e duas para 6 + 4 + 3
+    conferir_atribuicao(resultado, rotas, 10)
+
+
+def test_limite_de_nos_esgotado_fica_com_a_heuristica():
+    rotas = rotas_com_duracoes([5, 4, 3, 3, 3, 2])
+    resultado = frota_minima(rotas, 10, limite_nos=0)
+    assert resultado.caminhoes == 3 and not resultado.exato
+    conferir_atribuicao(resultado, rotas, 10)
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_recursos_sem_aterro_empacotam_as_coletas(semente):
+    rng = np.random.default_rng(semente)
+    lixo = rng.integers(0, 10, size=rng.integers(2, 8)).astype(float)
+    n = len(lixo)
+    grafo = GrafoCSR.de_arestas(n, np.arange(n - 1), np.arange(1, n), np.ones(n - 1), True)
+    # Um funcionário por caminhão: o tempo de coleta de cada ponto é o próprio lixo
+    caminhoes, funcionarios, _ = calcular_recursos_minimos_vias(criar_pontos(grafo, lixo), tempo_maximo=10,
+                                                                 funcionarios_por_caminhao=1)
+    assert caminhoes == max(1, frota_por_forca_bruta(lixo[lixo > 0], 10) or 0)
+    assert funcionarios == caminhoes
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from distancias import TabelaDistancias
+from grafo import dijkstra
+
+
+def conferir(tabela, grafo, origens):
+    for origem in origens:
+        esperado = dijkstra(grafo, origem)
+        np.testing.assert_array_equal(tabela.distancias(origem), esperado)
+        pred = tabela.predecessores(origem)
+        for v in np.flatnonzero(np.isfinite(esperado)).tolist():
+            if v != origem:
+                assert esperado[v] == esperado[pred[v]] + grafo.custo(int(pred[v]), v)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_reparo_igual_a_dijkstra_refeito(grafo_aleatorio, semente):
+    grafo = grafo_aleatorio(40, 80, semente)
+    tabela = TabelaDistancias(grafo)
+    origens = [0, 7, 19, 33]
+    conferir(tabela, grafo, origens)
+
+    rng = np.random.default_rng(semente)
+    for passo in range(30):
+        u = int(rng.integers(grafo.num_pontos))
+        if grafo.grau(u) == 0:
+            continue
+        v = int(rng.choice(grafo.indices[grafo.indptr[u]:grafo.indptr[u + 1]]))
+        if passo % 5 == 4:
+            grafo.remover_aresta(u, v, simetrico=False)
+        elif passo % 5 == 3:
+            grafo.adicionar_aresta(u, int(rng.integers(grafo.num_pontos)), float(rng.integers(1, 10)), simetrico=False)
+        else:
+            grafo.atualizar_custo(u, v, float(rng.integers(1, 20)), simetrico=False)
+        conferir(tabela, grafo, origens)
+
+
+def test_caminho_e_distancia(grafo_aleatorio):
+    grafo = grafo_aleatorio(30, 60, 9, simetrico=True)
+    tabela = TabelaDistancias(grafo)
+    esperado = dijkstra(grafo, 4)
+    for destino in range(grafo.num_pontos):
+        caminho = tabela.caminho(4, destino)
+        assert caminho[0] == 4 and caminho[-1] == destino
+        assert sum(grafo.custo(a, b) for a, b in zip(caminho, caminho[1:])) == esperado[destino]
+        assert tabela.distancia(4, destino) == esperado[destino]
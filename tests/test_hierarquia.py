@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from distancias import TabelaDistancias
+from grafo import dijkstra
+from hierarquia import HierarquiaContracao, carregar_se_existir
+
+
+def apsp(grafo):
+    return np.vstack([dijkstra(grafo, origem) for origem in range(grafo.num_pontos)])
+
+
+@pytest.mark.parametrize("semente,limite_testemunha", [(0, 64), (1, 64), (2, 1), (3, 4)])
+def test_consultas_iguais_a_dijkstra(grafo_aleatorio, semente, limite_testemunha):
+    grafo = grafo_aleatorio(50, 80, semente)
+    hierarquia = HierarquiaContracao.construir(grafo, limite_testemunha)
+    esperado = apsp(grafo)
+
+    np.testing.assert_array_equal(hierarquia.matriz(range(grafo.num_pontos), range(grafo.num_pontos)), esperado)
+    for origem, destino in np.random.default_rng(semente).integers(grafo.num_pontos, size=(40, 2)).tolist():
+        assert hierarquia.distancia(origem, destino) == esperado[origem, destino]
+        caminho = hierarquia.caminho(origem, destino)
+        assert caminho[0] == origem and caminho[-1] == destino
+        assert sum(grafo.custo(a, b) for a, b in zip(caminho, caminho[1:])) == esperado[origem, destino]
+
+
+def test_sem_caminho(grafo_aleatorio):
+    grafo = grafo_aleatorio(20, 0, 5)
+    grafo.remover_aresta(19, 0, simetrico=False)  # O ciclo vira um caminho 0 -> 1 -> ... -> 19
+    hierarquia = HierarquiaContracao.construir(grafo)
+    assert hierarquia.distancia(5, 2) == np.inf and hierarquia.caminho(5, 2) == []
+    assert hierarquia.distancia(2, 5) == dijkstra(grafo, 2)[5]
+
+
+def test_gravar_e_carregar(grafo_aleatorio, tmp_path):
+    grafo = grafo_aleatorio(40, 60, 7, simetrico=True)
+    caminho = tmp_path / "bairro.ch"
+    HierarquiaContracao.construir(grafo).salvar(caminho)
+    hierarquia = carregar_se_existir(caminho, grafo)
+    np.testing.assert_array_equal(hierarquia.matriz(range(40), range(40)), apsp(grafo))
+
+    outro = grafo_aleatorio(40, 60, 8, simetrico=True)
+    assert not hierarquia.vale_para(outro)
+    assert carregar_se_existir(caminho, outro) is None
+    with pytest.raises(ValueError):
+        HierarquiaContracao.carregar(caminho, outro)
+
+
+def test_tabela_larga_a_hierarquia_quando_o_grafo_muda(grafo_aleatorio):
+    grafo = grafo_aleatorio(30, 50, 11)
+    tabela = TabelaDistancias(grafo, hierarquia=HierarquiaContracao.construir(grafo))
+    assert tabela.distancia(3, 17) == dijkstra(grafo, 3)[17]
+    u, v = 3, int(grafo.indices[grafo.indptr[3]])
+    grafo.atualizar_custo(u, v, 0.25, simetrico=False)
+    assert tabela.hierarquia is None
+    assert tabela.distancia(3, 17) == dijkstra(grafo, 3)[17]
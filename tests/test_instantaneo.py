@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+import instantaneo
+from benchmark import escrever_entrada, gerar_bairro
+from main import montar_simulacao
+
+
+@pytest.fixture(scope="module")
+def entrada(tmp_path_factory):
+    caminho = tmp_path_factory.mktemp("bairro") / "entrada.txt"
+    escrever_entrada(str(caminho), *gerar_bairro("grade", 100, 0))
+    return str(caminho)
+
+
+@pytest.mark.parametrize("politica", [None, "otima"])
+@pytest.mark.parametrize("pausa", [0, 45, 200])
+def test_retomada_produz_os_mesmos_eventos(entrada, tmp_path, politica, pausa):
+    inteira = montar_simulacao(entrada, politica=politica, semente=7)
+    esperado = inteira.executar().linhas()
+
+    simulacao = montar_simulacao(entrada, politica=politica, semente=7)
+    simulacao.iniciar()
+    simulacao.avancar(ate=pausa)
+    instantaneo.salvar(simulacao, tmp_path / "turno.npz")
+    retomada = instantaneo.carregar(tmp_path / "turno.npz")
+
+    assert retomada.avancar().linhas() == esperado
+    np.testing.assert_array_equal(retomada.pontos.lixo, inteira.pontos.lixo)
+    np.testing.assert_array_equal(retomada.populacao.total(), inteira.populacao.total())
+    assert retomada.encerrada == inteira.encerrada
@@ -0,0 +1,26 @@
+import numpy as np
+from animais import PopulacaoAnimais
+from benchmark import gerar_bairro
+from particao import sem_pontos_virtuais, subgrafo
+
+
+def test_animais_nao_fogem_para_pontos_virtuais():
+    grafo = gerar_bairro("grade", 100, 0)[0]
+    pontos = np.arange(0, 100, 2)
+    custos = np.full(grafo.num_pontos, 5.0)
+    sub = subgrafo(grafo, pontos, [(custos, custos), (custos, custos)])
+    assert sub.num_pontos == len(pontos) + 2
+    assert sub.grau(len(pontos)) == len(pontos)
+
+    ruas = sem_pontos_virtuais(sub, len(pontos))
+    assert ruas.num_pontos == sub.num_pontos
+    assert ruas.grau(len(pontos)) == ruas.grau(len(pontos) + 1) == 0
+    assert (ruas.indices < len(pontos)).all()
+
+    rng = np.random.default_rng(1)
+    populacao = PopulacaoAnimais(sub.num_pontos)
+    populacao.ratos[:len(pontos)] = 1
+    for _ in range(20):
+        populacao.fugir(ruas, "ratos", np.ones(sub.num_pontos, dtype=bool), rng)
+    assert populacao.ratos[len(pontos):].sum() == 0
+    assert populacao.ratos.sum() == len(pontos)
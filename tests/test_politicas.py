@@ -0,0 +1,27 @@
+import itertools
+import numpy as np
+import pytest
+from politicas import POLITICAS, SEGUIR, Viagem, avaliar, plano_otimo
+
+
+def viagem_aleatoria(semente, paradas):
+    rng = np.random.default_rng(semente)
+    return Viagem(range(paradas), rng.integers(1, 12, size=paradas), rng.integers(1, 15, size=paradas),
+                  rng.integers(5, 40, size=paradas), rng.integers(5, 40, size=paradas),
+                  tempo_compactacao=float(rng.integers(0, 6)))
+
+
+@pytest.mark.parametrize("semente", range(30))
+def test_plano_otimo_igual_a_forca_bruta(semente):
+    viagem = viagem_aleatoria(semente, 2 + semente % 5)
+    melhor = min(avaliar(viagem, (SEGUIR,) + acoes)[0]
+                 for acoes in itertools.product(range(3), repeat=len(viagem) - 1))
+    assert avaliar(viagem, plano_otimo(viagem))[0] == pytest.approx(melhor)
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_nenhuma_regra_bate_o_plano_otimo(semente):
+    viagem = viagem_aleatoria(semente, 8)
+    otimo = avaliar(viagem, plano_otimo(viagem))[0]
+    for politica in POLITICAS.values():
+        assert otimo <= avaliar(viagem, politica(viagem))[0] + 1e-9
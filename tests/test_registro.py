@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from registro import RegistroEventos, ler_registro
+
+MODELOS = {0: "[{tempo} min] Evento no ponto {ponto}."}
+
+
+def test_capacidade_menor_que_um_e_recusada():
+    for anel in (False, True):
+        with pytest.raises(ValueError):
+            RegistroEventos(MODELOS, capacidade=0, anel=anel)
+
+
+def test_anel_guarda_os_ultimos_eventos():
+    registro = RegistroEventos(MODELOS, capacidade=1, anel=True)
+    for ponto in range(3):
+        registro.registrar(ponto, 0, ponto=ponto)
+    assert registro.linhas() == ["[2 min] Evento no ponto 2."]
+    assert registro.total == 3
+
+
+def test_de_eventos_continua_registrando(tmp_path):
+    caminho = tmp_path / "eventos.bin"
+    original = RegistroEventos(MODELOS, capacidade=2, saida=caminho)
+    original.registrar_lote(1, 0, np.arange(5))
+    original.fechar()
+
+    lido = ler_registro(caminho, MODELOS)
+    assert len(lido) == lido.total == 5
+    retomado = RegistroEventos.de_eventos(MODELOS, lido.eventos(), total=7)
+    retomado.registrar(2, 0, ponto=9)
+    assert len(retomado) == 6 and retomado.total == 8
+    assert retomado.linhas()[-1] == "[2 min] Evento no ponto 9."
+    assert lido.linhas() == [f"[1 min] Evento no ponto {p}." for p in range(5)]
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from distancias import TabelaDistancias
+from grafo import dijkstra
+from roteamento import capacidade_efetiva, planejar_rotas
+
+
+def test_simetrico(grafo_aleatorio):
+    assert grafo_aleatorio(30, 40, 0, simetrico=True).simetrico()
+    assert not grafo_aleatorio(30, 40, 0).simetrico()
+
+
+@pytest.mark.parametrize("simetrico", [False, True])
+@pytest.mark.parametrize("semente", range(4))
+def test_rotas_cobrem_o_lixo_com_o_custo_real(grafo_aleatorio, semente, simetrico):
+    grafo = grafo_aleatorio(80, 120, semente, simetrico=simetrico)
+    rng = np.random.default_rng(semente)
+    lixo = rng.integers(0, 20, size=grafo.num_pontos).astype(float)
+    deposito = 0
+    lixo[deposito] = 0
+    servico = 2 * np.ceil(lixo / 5)
+    rotas = planejar_rotas(TabelaDistancias(grafo), deposito, lixo, 10, servico, vizinhos_candidatos=8,
+                           tempo_maximo=120)
+
+    recolhido = np.zeros(grafo.num_pontos)
+    for rota in rotas:
+        np.add.at(recolhido, rota.pontos, rota.cargas)
+        assert rota.carga <= capacidade_efetiva(10) + 1e-9
+        caminho = [deposito] + rota.pontos + [deposito]
+        assert rota.custo_viagem == pytest.approx(sum(dijkstra(grafo, a)[b] for a, b in zip(caminho, caminho[1:])))
+        if len(rota.pontos) > 1:
+            assert rota.duracao <= 120
+    np.testing.assert_allclose(recolhido, lixo)
@@ -0,0 +1,24 @@
+import numpy as np
+from sorteios import SUBSISTEMAS, Sorteios, sementes_das_replicas
+
+
+def primeiros(sorteios):
+    return [getattr(sorteios, nome).random(3).tolist() for nome in SUBSISTEMAS]
+
+
+def test_mesma_seed_sequence_reproduz_os_geradores():
+    semente = sementes_das_replicas(5, 3)[2]
+    assert primeiros(Sorteios(semente)) == primeiros(Sorteios(semente))
+    assert semente.n_children_spawned == 0
+
+
+def test_subsistemas_independentes():
+    valores = primeiros(Sorteios(42))
+    assert len({tuple(v) for v in valores}) == len(SUBSISTEMAS)
+    assert primeiros(Sorteios(42)) == valores
+    assert primeiros(Sorteios(43)) != valores
+
+
+def test_replicas_diferentes():
+    a, b = sementes_das_replicas(0, 2)
+    assert not np.array_equal(Sorteios(a).animais.random(5), Sorteios(b).animais.random(5))
@@ -0,0 +1,348 @@
+import argparse
+import heapq
+import math
+import os
+from collections import OrderedDict
+import numpy as np
+import perfil
+
+# Curva de trânsito usada pela linha de comando quando nenhuma é dada:
+# (minuto do turno, fator sobre o custo da rua), com picos no início e no fim.
+_CURVA_PADRAO = ("0:1.0", "90:1.5", "180:1.0", "330:1.0", "420:1.6", "480:1.2")
+
+
+class PerfisTransito:
+    """Custos das ruas que variam ao longo do turno, como funções lineares por partes.
+
+    O perfil k vale para as arestas origens[k] -> destinos[k] (todas as
+    paralelas) e tem os pontos de quebra instantes[indptr[k]:indptr[k + 1]],
+    com os custos correspondentes na mesma fatia de custos. Entre dois pontos
+    o custo é interpolado; antes do primeiro e depois do último, fica
+    constante. Ruas sem perfil usam o custo fixo do grafo.
+
+    Os perfis precisam ser FIFO: sair mais tarde nunca faz chegar mais cedo,
+    ou seja, em nenhum trecho o custo cai mais rápido que o relógio anda.
+
+    Mudar o custo de uma rua no grafo (atualizar_custo) descarta o perfil
+    dela: o custo informado passa a valer para o turno todo.
+    """
+
+    def __init__(self, grafo, origens, destinos, indptr, instantes, custos):
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        instantes = np.asarray(instantes, dtype=np.float64)
+        custos = np.asarray(custos, dtype=np.float64)
+        chaves = origens * grafo.num_pontos + destinos
+        if np.any(np.diff(chaves) <= 0):
+            # Perfis em ordem de (origem, destino), para localizar o de cada aresta por busca binária
+            ordem = np.argsort(chaves, kind="stable")
+            fatias = [np.arange(indptr[k], indptr[k + 1]) for k in ordem.tolist()]
+            posicoes = np.concatenate(fatias) if fatias else np.zeros(0, dtype=np.int64)
+            indptr = np.concatenate([[0], np.cumsum(np.diff(indptr)[ordem])]).astype(np.int64)
+            origens, destinos, chaves = origens[ordem], destinos[ordem], chaves[ordem]
+            instantes, custos = instantes[posicoes], custos[posicoes]
+        _validar(chaves, indptr, instantes, custos)
+
+        self.grafo = grafo
+        self.origens = origens
+        self.destinos = destinos
+        self.indptr = indptr
+        self.instantes = instantes
+        self.custos = custos
+        self._chaves = chaves
+        self._ativo = np.ones(len(origens), dtype=bool)
+        # Instantes deslocados por perfil, para achar o trecho de muitos perfis com um único searchsorted
+        self._inicio = float(instantes.min()) if len(instantes) else 0.0
+        self._escala = (float(instantes.max()) - self._inicio + 1) if len(instantes) else 1.0
+        dono = np.repeat(np.arange(len(origens)), np.diff(indptr))
+        self._chave_instante = instantes - self._inicio + dono * self._escala
+        # Inclinação do trecho que começa em cada ponto de quebra (zero no último de cada perfil)
+        self._inclinacao = np.zeros(len(instantes))
+        if len(instantes) > 1:
+            mesmo_perfil = dono[1:] == dono[:-1]
+            self._inclinacao[:-1][mesmo_perfil] = (np.diff(custos)[mesmo_perfil] / np.diff(instantes)[mesmo_perfil])
+        self._perfil_da_aresta = None
+        grafo.adicionar_observador(self)
+
+    @property
+    def num_perfis(self):
+        """Perfis ainda em uso (os de ruas com custo alterado no grafo não contam)."""
+        return int(self._ativo.sum())
+
+    @classmethod
+    def de_curva(cls, grafo, instantes, fatores, arestas=None):
+        """Perfis com a mesma curva de fatores sobre o custo de cada rua (todas, ou os pares de arestas)."""
+        instantes = np.asarray(instantes, dtype=np.float64)
+        fatores = np.asarray(fatores, dtype=np.float64)
+        n = grafo.num_pontos
+        origens = np.repeat(np.arange(n), np.diff(grafo.indptr))
+        chaves = origens * n + grafo.indices
+        if arestas is not None:
+            escolhidas = np.array([u * n + v for u, v in arestas], dtype=np.int64)
+            manter = np.isin(chaves, escolhidas)
+            chaves, pesos = chaves[manter], grafo.pesos[manter]
+        else:
+            pesos = grafo.pesos
+        # Arestas paralelas formam uma rua só, com o menor custo
+        ordem = np.argsort(chaves, kind="stable")
+        chaves, pesos = chaves[ordem], pesos[ordem]
+        unicas, primeiras = np.unique(chaves, return_index=True)
+        base = np.minimum.reduceat(pesos, primeiras) if len(pesos) else pesos
+        pontos = len(instantes)
+        return cls(grafo, unicas // n, unicas % n, np.arange(0, pontos * len(unicas) + 1, pontos),
+                   np.tile(instantes, len(unicas)), (base[:, None] * fatores[None, :]).ravel())
+
+    # ---- Consultas ----
+
+    def _perfis_das_arestas(self):
+        """Perfil de cada aresta do grafo (-1 se ela usa o custo fixo), refeito quando o grafo muda.
+
+        Junto ficam, por aresta, o deslocamento das chaves de instante do seu
+        perfil e as chaves do primeiro e do último ponto de quebra, para que
+        avaliar uma fatia de arestas não precise consultar o perfil de cada uma.
+        """
+        if self._perfil_da_aresta is None:
+            grafo = self.grafo
+            origens = np.repeat(np.arange(grafo.num_pontos), np.diff(grafo.indptr))
+            chaves = origens * grafo.num_pontos + grafo.indices
+            if len(self._chaves):
+                k = np.minimum(np.searchsorted(self._chaves, chaves), len(self._chaves) - 1)
+                k = np.where((self._chaves[k] == chaves) & self._ativo[k], k, -1)
+            else:
+                k = np.full(len(chaves), -1, dtype=np.int64)
+            self._deslocamento = k * self._escala - self._inicio
+            if len(self._chaves):
+                self._primeira_chave = self._chave_instante[self.indptr[np.maximum(k, 0)]]
+                self._ultima_chave = self._chave_instante[self.indptr[np.maximum(k, 0) + 1] - 1]
+            else:
+                self._primeira_chave = self._ultima_chave = self._deslocamento
+            self._perfil_da_aresta = k
+        return self._perfil_da_aresta
+
+    def custos_das_arestas(self, inicio, fim, instante):
+        """Custos das arestas inicio:fim do grafo (uma fatia do CSR) para quem entra nelas no instante."""
+        k = self._perfis_das_arestas()[inicio:fim]
+        com_perfil = k >= 0
+        if com_perfil.all():
+            chave = self._deslocamento[inicio:fim] + instante
+            primeira, ultima = self._primeira_chave[inicio:fim], self._ultima_chave[inicio:fim]
+            custos = None
+        elif com_perfil.any():
+            chave = self._deslocamento[inicio:fim][com_perfil] + instante
+            primeira = self._primeira_chave[inicio:fim][com_perfil]
+            ultima = self._ultima_chave[inicio:fim][com_perfil]
+            custos = self.grafo.pesos[inicio:fim].copy()
+        else:
+            return self.grafo.pesos[inicio:fim].copy()
+        # Antes do primeiro ponto vale o custo dele, e depois do último o custo do último
+        chave = np.minimum(np.maximum(chave, primeira), ultima)
+        j = np.searchsorted(self._chave_instante, chave, side="right") - 1
+        valores = self.custos[j] + self._inclinacao[j] * (chave - self._chave_instante[j])
+        if custos is None:
+            return valores
+        custos[com_perfil] = valores
+        return custos
+
+    def custos_no_instante(self, instante):
+        """Custo de todas as arestas do grafo para quem entra nelas no instante."""
+        return self.custos_das_arestas(0, self.grafo.num_arestas, instante)
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """O custo informado substitui o perfil da rua; inclusões e remoções refazem o mapeamento."""
+        chave = u * self.grafo.num_pontos + v
+        k = int(np.searchsorted(self._chaves, chave))
+        if k < len(self._chaves) and self._chaves[k] == chave:
+            self._ativo[k] = False
+        self._perfil_da_aresta = None
+
+    # ---- Persistência ----
+
+    def arrays(self):
+        """Arrays dos perfis ainda em uso, com os nomes dos parâmetros do construtor."""
+        fatias = [np.arange(self.indptr[k], self.indptr[k + 1]) for k in np.flatnonzero(self._ativo).tolist()]
+        posicoes = np.concatenate(fatias) if fatias else np.zeros(0, dtype=np.int64)
+        return {"origens": self.origens[self._ativo], "destinos": self.destinos[self._ativo],
+                "indptr": np.concatenate([[0], np.cumsum([len(p) for p in fatias])]).astype(np.int64),
+                "instantes": self.instantes[posicoes], "custos": self.custos[posicoes]}
+
+    def salvar(self, caminho):
+        """Grava os perfis ainda em uso num .npz."""
+        with open(caminho, "wb") as f:
+            np.savez(f, num_pontos=np.int64(self.grafo.num_pontos), **self.arrays())
+
+    @classmethod
+    def carregar(cls, caminho, grafo):
+        """Abre perfis gravados; recusa os que foram feitos para outro grafo."""
+        with np.load(caminho) as dados:
+            arrays = {nome: dados[nome] for nome in ("origens", "destinos", "indptr", "instantes", "custos")}
+            num_pontos = int(dados["num_pontos"])
+        if num_pontos != grafo.num_pontos or not all(
+                len(grafo._posicoes(u, v)) for u, v in zip(arrays["origens"].tolist(), arrays["destinos"].tolist())):
+            raise ValueError(f"{caminho} foi feito para outro grafo.")
+        return cls(grafo, **arrays)
+
+
+def _validar(chaves, indptr, instantes, custos):
+    if len(indptr) != len(chaves) + 1 or indptr[-1] != len(instantes) or len(custos) != len(instantes):
+        raise ValueError("Arrays de perfis com tamanhos incompatíveis.")
+    if np.any(np.diff(chaves) == 0):
+        raise ValueError("Mais de um perfil para a mesma rua.")
+    if np.any(np.diff(indptr) < 1):
+        raise ValueError("Todo perfil precisa de pelo menos um ponto de quebra.")
+    if not np.all(np.isfinite(custos)) or np.any(custos < 0):
+        raise ValueError("Custos dos perfis precisam ser finitos e não negativos.")
+    mesmo_perfil = np.ones(max(len(instantes) - 1, 0), dtype=bool)
+    mesmo_perfil[indptr[1:-1] - 1] = False
+    dt, dc = np.diff(instantes)[mesmo_perfil], np.diff(custos)[mesmo_perfil]
+    if np.any(dt <= 0):
+        raise ValueError("Os instantes de cada perfil precisam ser crescentes.")
+    if np.any(dc < -dt):
+        raise ValueError("Perfil não FIFO: em algum trecho o custo cai mais rápido que o relógio anda.")
+
+
+@perfil.fase("dijkstra_temporal")
+def dijkstra_temporal(grafo, perfis, inicio, partida, chegada=None, pred=None):
+    """Instante de chegada mais cedo a cada ponto, saindo de inicio no instante partida.
+
+    O custo de cada aresta é o do instante em que se chega à sua origem. Com
+    perfis FIFO, chegar mais cedo a um ponto nunca atrasa a continuação, e o
+    laço do Dijkstra continua exato.
+    """
+    indptr, indices = grafo.indptr, grafo.indices
+    if chegada is None:
+        chegada = np.empty(grafo.num_pontos, dtype=np.float64)
+    chegada.fill(np.inf)
+    if pred is not None:
+        pred.fill(-1)
+    chegada[inicio] = partida
+    pq = [(float(partida), inicio)]
+
+    while pq:
+        instante, ponto_atual = heapq.heappop(pq)
+
+        if instante > chegada[ponto_atual]:
+            continue
+
+        inicio_fatia, fim_fatia = indptr[ponto_atual], indptr[ponto_atual + 1]
+        vizinhos = indices[inicio_fatia:fim_fatia]
+        novas_chegadas = instante + perfis.custos_das_arestas(inicio_fatia, fim_fatia, instante)
+        melhora = novas_chegadas < chegada[vizinhos]
+        if not melhora.any():
+            continue
+
+        vizinhos = vizinhos[melhora]
+        novas_chegadas = novas_chegadas[melhora]
+        np.minimum.at(chegada, vizinhos, novas_chegadas)
+        if pred is not None:
+            pred[vizinhos] = ponto_atual
+        for nova_chegada, vizinho in zip(novas_chegadas.tolist(), vizinhos.tolist()):
+            heapq.heappush(pq, (nova_chegada, vizinho))
+
+    return chegada
+
+
+class TabelaTemporal:
+    """Tempos de viagem que dependem do horário de saída, com a interface de TabelaDistancias.
+
+    O turno é dividido em baldes de largura minutos. Para cada (origem, balde)
+    consultado, um Dijkstra dependente do tempo saindo no início do balde é
+    guardado (as max_linhas linhas usadas mais recentemente). Uma saída no
+    meio do balde interpola as chegadas dos dois extremos: o resultado é
+    exato nos extremos e continua FIFO entre eles.
+    """
+
+    temporal = True
+
+    def __init__(self, grafo, perfis, largura=15, max_linhas=256):
+        self.grafo = grafo
+        self.perfis = perfis
+        self.largura = largura
+        self.max_linhas = max_linhas
+        self._linhas = OrderedDict()  # (origem, balde) -> (durações, predecessores)
+        grafo.adicionar_observador(self)
+
+    def _linha(self, origem, balde):
+        chave = (origem, balde)
+        linha = self._linhas.get(chave)
+        if linha is not None:
+            self._linhas.move_to_end(chave)
+            return linha
+        partida = balde * self.largura
+        chegada = np.empty(self.grafo.num_pontos, dtype=np.float64)
+        pred = np.empty(self.grafo.num_pontos, dtype=np.int32)
+        dijkstra_temporal(self.grafo, self.perfis, origem, partida, chegada, pred)
+        chegada -= partida
+        linha = self._linhas[chave] = (chegada, pred)
+        if len(self._linhas) > self.max_linhas:
+            self._linhas.popitem(last=False)
+        return linha
+
+    def _balde(self, partida):
+        posicao = (partida or 0) / self.largura
+        balde = math.floor(posicao)
+        return balde, posicao - balde
+
+    def duracoes(self, origem, partida=0):
+        """Tempo de viagem da origem a todos os pontos, saindo no instante partida."""
+        balde, fracao = self._balde(partida)
+        antes = self._linha(origem, balde)[0]
+        if fracao == 0:
+            return antes.copy()
+        depois = self._linha(origem, balde + 1)[0]
+        with np.errstate(invalid="ignore"):
+            return np.where(np.isinf(antes), np.inf, antes + fracao * (depois - antes))
+
+    def distancia(self, origem, destino, partida=0):
+        """Tempo de viagem entre dois pontos saindo no instante partida (inf se inalcançável)."""
+        balde, fracao = self._balde(partida)
+        valor = float(self._linha(origem, balde)[0][destino])
+        if fracao and not math.isinf(valor):
+            valor += fracao * (float(self._linha(origem, balde + 1)[0][destino]) - valor)
+        return int(valor) if valor.is_integer() else valor
+
+    def caminho(self, origem, destino, partida=0):
+        """Caminho mais rápido saindo no início do balde de partida (vazio se inalcançável)."""
+        duracoes, pred = self._linha(origem, self._balde(partida)[0])
+        if np.isinf(duracoes[destino]):
+            return []
+        caminho = [destino]
+        while caminho[-1] != origem:
+            caminho.append(int(pred[caminho[-1]]))
+        caminho.reverse()
+        return caminho
+
+    def aresta_alterada(self, u, v, custo_antigo, custo_novo):
+        """Descarta as linhas guardadas; elas são refeitas na próxima consulta."""
+        self._linhas.clear()
+
+
+def carregar_se_existir(caminho, grafo):
+    """Perfis gravados em caminho, se existirem e valerem para o grafo; senão None."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return PerfisTransito.carregar(caminho, grafo)
+    except ValueError:
+        return None
+
+
+def main():
+    from leitor import ler_entrada
+    parser = argparse.ArgumentParser(description="Grava perfis de trânsito (custos ao longo do turno) para as ruas.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("-o", "--saida", default=None, help="padrão: o nome da entrada com extensão .transito.npz")
+    parser.add_argument("--curva", nargs="+", default=list(_CURVA_PADRAO), metavar="MINUTO:FATOR",
+                        help="fator sobre o custo de todas as ruas em cada instante do turno")
+    args = parser.parse_args()
+
+    grafo, _, _, _ = ler_entrada(args.entrada)
+    pares = [item.split(":") for item in args.curva]
+    perfis = PerfisTransito.de_curva(grafo, [float(t) for t, _ in pares], [float(f) for _, f in pares])
+    saida = args.saida or os.path.splitext(args.entrada)[0] + ".transito.npz"
+    perfis.salvar(saida)
+    print(f"Perfis de {perfis.num_perfis} ruas com {len(pares)} pontos de quebra gravados em {saida}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from distancias import InstalacoesProximas, TabelaDistancias
+from grafo import GrafoCSR
+from leitor import ler_entrada
+from main import calcular_carrocinhas, criar_caminhoes, criar_carrocinhas, criar_pontos, dimensionar_frota, \
+    executar_coleta_simultanea
+from particao import arestas_cortadas, particionar, sem_pontos_virtuais, subgrafo
+from sorteios import Sorteios, sementes_das_replicas
+
+METRICAS = ("pontos", "caminhoes", "funcionarios", "carrocinhas", "lixo_restante", "eventos")
+
+
+def preparar_zonas(grafo, lixo, zona, aterro_id, zoonoses_id):
+    """Monta a tarefa de cada zona: subgrafo, lixo e os pontos virtuais do aterro e do abrigo.
+
+    As instalações costumam ficar fora da maior parte das zonas. Cada zona
+    ganha então dois pontos virtuais, o aterro (len(pontos)) e o centro de
+    zoonoses (len(pontos) + 1), ligados a todos os seus pontos com a
+    distância, no grafo inteiro, até a instalação mais próxima e de volta.
+    Os pontos virtuais não têm lixo nem animais, e na simulação os animais
+    só fogem pelas ruas da zona (particao.sem_pontos_virtuais).
+    """
+    ligacoes = [(InstalacoesProximas(grafo, ids).distancias, InstalacoesProximas(grafo, ids, chegada=False).distancias)
+                for ids in (aterro_id, zoonoses_id)]
+    tarefas = []
+    for z in range(int(zona.max()) + 1):
+        pontos = np.flatnonzero(zona == z)
+        sub = subgrafo(grafo, pontos, ligacoes)
+        tarefas.append((sub.indptr, sub.indices, sub.pesos, np.asarray(lixo)[pontos]))
+    return tarefas
+
+
+def simular_zona(tarefa, semente, tempo_maximo=8 * 60):
+    """Dimensiona a frota da zona e simula o turno nela; retorna uma linha de METRICAS."""
+    indptr, indices, pesos, lixo = tarefa
+    grafo = GrafoCSR(indptr, indices, pesos)
+    num_pontos = len(lixo)
+    aterro_id, zoonoses_id = num_pontos, num_pontos + 1
+    lixo = np.concatenate([lixo, [0, 0]])
+
+    sorteios = Sorteios(semente)
+    pontos = criar_pontos(grafo, lixo)
+    pontos.populacao.sortear(sorteios.animais, np.arange(num_pontos))  # Aterro e zoonoses ficam sem animais
+
+    tabela = TabelaDistancias(grafo)
+    dimensionamento = dimensionar_frota(pontos, aterro_id, tempo_maximo, tabela)
+    caminhoes = max(1, dimensionamento.caminhoes)
+    funcionarios, carrocinhas = caminhoes * 5, calcular_carrocinhas(pontos)
+    registro = executar_coleta_simultanea(grafo, pontos, criar_caminhoes(caminhoes, 10, 5), criar_carrocinhas(carrocinhas, 5),
+                                          aterro_id, zoonoses_id, tempo_maximo, tabela,
+                                          atribuicao=dimensionamento.atribuicao, rng=sorteios.movimento,
+                                          grafo_animais=sem_pontos_virtuais(grafo, num_pontos))
+    return num_pontos, caminhoes, funcionarios, carrocinhas, int(pontos.lixo.sum()), registro.total
+
+
+def executar_zonas(grafo, lixo, num_zonas, aterro_id, zoonoses_id, processos=None, semente=0,
+                   tempo_maximo=8 * 60):
+    """Particiona o bairro e simula cada zona num processo; retorna (zona, resultados).
+
+    resultados tem uma linha por zona com as colunas de METRICAS. As zonas
+    mais pesadas são despachadas primeiro para que nenhum processo fique com
+    a última zona grande sozinho.
+    """
+    zona = particionar(grafo, lixo, num_zonas, semente=semente)
+    tarefas = preparar_zonas(grafo, lixo, zona, aterro_id, zoonoses_id)
+    sementes = sementes_das_replicas(semente, len(tarefas))
+    ordem = sorted(range(len(tarefas)), key=lambda z: -len(tarefas[z][3]))
+    processos = processos or os.cpu_count() or 1
+
+    resultados = [None] * len(tarefas)
+    if processos == 1:
+        for z in ordem:
+            resultados[z] = simular_zona(tarefas[z], sementes[z], tempo_maximo)
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = {z: executor.submit(simular_zona, tarefas[z], sementes[z], tempo_maximo) for z in ordem}
+            for z, futuro in futuros.items():
+                resultados[z] = futuro.result()
+    return zona, np.array(resultados, dtype=np.int64).reshape(len(tarefas), len(METRICAS))
+
+
+def formatar_zonas(resultados):
+    linhas = ["Zona".ljust(6) + "".join(m.rjust(15) for m in METRICAS)]
+    for z, linha in enumerate(resultados.tolist()):
+        linhas.append(str(z).ljust(6) + "".join(str(v).rjust(15) for v in linha))
+    linhas.append("Total".ljust(6) + "".join(str(v).rjust(15) for v in resultados.sum(axis=0).tolist()))
+    return "\n".join(linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação do bairro dividido em zonas, uma por processo.")
+    parser.add_argument("entrada", nargs="?", default="entrada.txt")
+    parser.add_argument("-z", "--zonas", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-j", "--processos", type=int, default=None)
+    parser.add_argument("-s", "--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    grafo, lixo, aterro_id, zoonoses_id = ler_entrada(args.entrada)
+    inicio = time.perf_counter()
+    zona, resultados = executar_zonas(grafo, lixo, args.zonas, aterro_id, zoonoses_id, args.processos, args.semente)
+    segundos = time.perf_counter() - inicio
+    print(f"=== {len(resultados)} zonas, {arestas_cortadas(grafo, zona)} arestas cortadas, {segundos:.2f} s ===")
+    print(formatar_zonas(resultados))
+
+
+if __name__ == "__main__":
+    main()